@@ -0,0 +1,63 @@
+"""Measures the time it takes to import streamanalyser in a fresh interpreter.
+
+Exits with status 1 if the median import time exceeds the budget, so it can
+guard the startup time of the CLI:
+
+    python benchmarks/import_time.py [--budget 400] [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def import_times(module) -> dict:
+    """Returns cumulative import times of the modules in microseconds,
+    imported by a fresh interpreter that imports `module`"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "site":
+            # modules imported before are a part of the interpreter startup
+            times.clear()
+            continue
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="streamanalyser", help="module to import")
+    parser.add_argument("--budget", default=400, type=float, help="import time budget in milliseconds")
+    parser.add_argument("--runs", default=5, type=int, help="interpreters to start, the median is reported")
+    parser.add_argument("--top", default=10, type=int, help="slowest top level imports to show")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    total = statistics.median(times[args.module] for times in runs) / 1000
+
+    last_run = runs[-1]
+    print(f"slowest imports of {args.module}:")
+    for name, cumulative in sorted(last_run.items(), key=lambda item: -item[1])[1:args.top + 1]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+    print(f"{args.module}: {total:.1f}ms (budget {args.budget:.0f}ms)")
+    if total > args.budget:
+        print("import time exceeds the budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
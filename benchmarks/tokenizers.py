@@ -0,0 +1,87 @@
+"""Compares speed and output of the keyphrase tokenizers on recorded chat.
+
+Messages are read from the cache, so the streams have to be analysed
+(or collected) once before running the benchmark:
+
+    python benchmarks/tokenizers.py [ids ...] [--limit 10000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+from time import perf_counter
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+# the package doesn't have to be installed to run the benchmark
+sys.path.insert(0, ROOT_PATH)
+
+from streamanalyser.modules.filehandler import FileHandler
+from streamanalyser.modules.keyphrase_finder import KeyphraseFinder, TOKENIZERS
+from streamanalyser.modules.structures import DefaultStoragePath
+
+
+def read_texts(filehandler, sids, limit=None) -> list:
+    texts = []
+    for sid in sids:
+        sid_path = os.path.join(filehandler.cache_path, sid)
+        for message in filehandler.iter_messages(sid_path, touch=False):
+            if limit and len(texts) >= limit:
+                return texts
+            texts.append(message.get("message") or "")
+    return texts
+
+
+def benchmark(tokenizer, texts, repeat) -> tuple:
+    """Returns tokens of the texts and the best time in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        tokens = [tokenizer(text) for text in texts]
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return tokens, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ids", nargs="*", help="cached stream ids. defaults to every cached stream")
+    parser.add_argument("--storage-path", default=DefaultStoragePath.get_path())
+    parser.add_argument("--limit", default=None, type=int, help="message amount to tokenize")
+    parser.add_argument("--repeat", default=3, type=int, help="runs per tokenizer, the best is reported")
+    parser.add_argument("--examples", default=5, type=int, help="differing messages to show")
+    args = parser.parse_args()
+
+    filehandler = FileHandler(args.storage_path)
+    filehandler.logger.disabled = True
+    texts = read_texts(filehandler, args.ids or filehandler.get_cached_ids(), args.limit)
+    if not texts:
+        parser.error("no cached messages found")
+    # downloads NLTK data if it's missing
+    KeyphraseFinder([], tokenizer="nltk")
+
+    results = {}
+    for name, tokenizer in TOKENIZERS.items():
+        results[name] = benchmark(tokenizer, texts, args.repeat)
+        tokens, elapsed = results[name]
+        print(
+            f"{name:>5}: {elapsed:.3f}s, {len(texts) / elapsed:,.0f} messages/s, "
+            f"{sum(map(len, tokens)):,} tokens"
+        )
+
+    nltk_tokens, nltk_time = results["nltk"]
+    rule_tokens, rule_time = results["rule"]
+    same = sum(a == b for a, b in zip(nltk_tokens, rule_tokens))
+    nltk_counts = Counter(token for tokens in nltk_tokens for token in tokens)
+    rule_counts = Counter(token for tokens in rule_tokens for token in tokens)
+    shared = sum((nltk_counts & rule_counts).values())
+    print(f"speedup: {nltk_time / rule_time:.1f}x")
+    print(f"identical output: {same / len(texts):.1%} of {len(texts):,} messages")
+    print(f"shared tokens: {shared / max(sum(nltk_counts.values()), 1):.1%} of nltk tokens")
+
+    differing = [i for i, (a, b) in enumerate(zip(nltk_tokens, rule_tokens)) if a != b]
+    for i in differing[:args.examples]:
+        print(f"\n{texts[i]!r}\n  nltk: {nltk_tokens[i]}\n  rule: {rule_tokens[i]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,2 @@
 from .streamanalyser import StreamAnalyser
+from .batchanalyser import BatchAnalyser
@@ -0,0 +1,217 @@
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+
+from .modules import (
+    loggersetup,
+    filehandler,
+    structures,
+)
+
+DEFAULT_STORAGE_PATH = structures.DefaultStoragePath.get_path()
+
+
+def _call_with_timeout(func, timeout):
+    """Calls the function and raises `TimeoutError` if it takes longer
+    than the timeout. Timeouts can only be enforced on platforms that
+    support `SIGALRM`, otherwise the function runs until it ends."""
+
+    if not timeout or not hasattr(signal, "SIGALRM"):
+        return func()
+
+    def handler(signum, frame):
+        raise TimeoutError(f"Timed out after {timeout} seconds")
+
+    previous_handler = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def _compact_highlight(highlight) -> dict:
+    return {
+        "time": highlight.time,
+        "duration": highlight.duration,
+        "intensity": highlight.intensity.level if highlight.intensity else None,
+        "contexts": sorted(highlight.contexts),
+        "keywords": list(highlight.keywords),
+        "fdelta": highlight.fdelta,
+        "message_amount": len(highlight.messages),
+        "url": highlight.url,
+    }
+
+
+def _analyse_stream(sid, timeout, options) -> dict:
+    """Analyses a single stream in a worker process.
+    Only compact results are returned so that sending them back to
+    the main process stays cheap."""
+
+    # imported here to prevent circular imports
+    from .streamanalyser import StreamAnalyser
+
+    result = {
+        "id": sid,
+        "status": "ok",
+        "error": None,
+        "title": None,
+        "message_amount": 0,
+        "elapsed": 0.0,
+        "highlights": [],
+    }
+    start = time()
+
+    def analyse():
+        with StreamAnalyser(sid, **options) as analyser:
+            analyser.analyse()
+            result["title"] = analyser.metadata.get("title")
+            result["message_amount"] = len(analyser.messages)
+            result["highlights"] = [
+                _compact_highlight(highlight) for highlight in analyser.highlights
+            ]
+
+    try:
+        _call_with_timeout(analyse, timeout)
+    except TimeoutError as e:
+        result["status"] = "timeout"
+        result["error"] = str(e)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{e.__class__.__name__}: {e}"
+    result["elapsed"] = round(time() - start, 3)
+    return result
+
+
+class BatchAnalyser:
+    """A class that analyses multiple streams in parallel processes.
+
+    Args:
+        sids (list[str]|None, optional): Video ids of the streams. Defaults to
+            None, which analyses every cached stream.
+
+        workers (int|None, optional): Process amount to analyse streams with.
+            Defaults to None, which uses the CPU count.
+
+        timeout (float|None, optional): Time limit to analyse a stream in seconds.
+            Streams that exceed the limit are reported with 'timeout' status.
+            Only enforced on platforms that support `SIGALRM`. Defaults to None.
+
+        storage_path (str, optional): Folder to store files related to this
+            module. Defaults to DEFAULT_STORAGE_PATH.
+
+        verbose (bool, optional): Print progress to console. Output of the
+            analysers themselves is always silent. Defaults to False.
+
+        **analyser_options: Options to pass to each `StreamAnalyser`.
+            `keep_cache` defaults to True so that workers don't delete
+            each other's cache.
+    """
+
+    def __init__(
+        self,
+        sids=None,
+        workers=None,
+        timeout=None,
+        storage_path=DEFAULT_STORAGE_PATH,
+        verbose=False,
+        **analyser_options,
+    ):
+        self.filehandler = filehandler.FileHandler(storage_path=storage_path)
+        self.logger = loggersetup.create_logger(__file__, self.filehandler.log_path, sid=None)
+        self.filehandler.create_dir_if_not_exists(self.filehandler.cache_path)
+        self.sids = list(sids) if sids is not None else self.filehandler.get_cached_ids()
+        self.workers = workers or os.cpu_count()
+        self.timeout = timeout
+        self.verbose = verbose
+        self.analyser_options = {
+            "keep_cache": True,
+            **analyser_options,
+            "storage_path": storage_path,
+            "verbose": False,
+        }
+        self.results = []
+
+        if self.workers < 1:
+            raise ValueError("Worker amount must be a natural number")
+        if timeout and not hasattr(signal, "SIGALRM"):
+            self.logger.warning("Timeouts are not supported on this platform")
+
+        self.logger.info("Batch analyser initiated with following parameters:")
+        self.logger.debug(f"sids={self.sids}")
+        self.logger.debug(f"workers={self.workers}")
+        self.logger.debug(f"timeout={timeout}")
+        self.logger.debug(f"storage_path={storage_path}")
+        self.logger.debug(f"analyser_options={analyser_options}")
+
+    def analyse(self) -> list[dict]:
+        """Analyses the streams.
+
+        Returns:
+            list[dict]: Results in the same order with the stream ids. Each
+            result contains the stream id, status ('ok', 'timeout' or 'error'),
+            error message, title, message amount, elapsed time in seconds
+            and compact highlights.
+        """
+
+        self.logger.info(f"Analysing {len(self.sids)} streams")
+        results = {}
+        if self.verbose:
+            print(f"Analysing streams... 0/{len(self.sids)}", end="\r")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(_analyse_stream, sid, self.timeout, self.analyser_options): sid
+                for sid in dict.fromkeys(self.sids)
+            }
+            for counter, future in enumerate(as_completed(futures), start=1):
+                sid = futures[future]
+                try:
+                    results[sid] = future.result()
+                except Exception as e:
+                    # worker process itself failed
+                    results[sid] = {
+                        "id": sid,
+                        "status": "error",
+                        "error": f"{e.__class__.__name__}: {e}",
+                        "title": None,
+                        "message_amount": 0,
+                        "elapsed": 0.0,
+                        "highlights": [],
+                    }
+                if results[sid]["status"] != "ok":
+                    self.logger.error(f"Could not analyse {sid}: {results[sid]['error']}")
+                if self.verbose:
+                    print(f"Analysing streams... {counter}/{len(futures)}", end="\r")
+
+        if self.verbose:
+            print(f"Analysing streams... done")
+
+        self.results = [results[sid] for sid in self.sids]
+        self.logger.info(
+            f"{sum(result['status'] == 'ok' for result in self.results)} of {len(self.results)} streams analysed"
+        )
+        return self.results
+
+    def summary(self) -> str:
+        """Returns a table that summarizes the results"""
+
+        rows = [("ID", "STATUS", "MESSAGES", "HIGHLIGHTS", "TIME", "TITLE")]
+        for result in self.results:
+            rows.append((
+                result["id"],
+                result["status"],
+                str(result["message_amount"]),
+                str(len(result["highlights"])),
+                f"{result['elapsed']:.1f}s",
+                result["title"] or result["error"] or "",
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]) - 1)]
+        return "\n".join(
+            "  ".join(
+                [cell.ljust(width) for cell, width in zip(row, widths)] + [row[-1]]
+            ).rstrip()
+            for row in rows
+        )
@@ -1,4 +1,6 @@
 import streamanalyser as sa
+from streamanalyser.modules.filehandler import FileHandler
+from streamanalyser.modules.structures import DefaultStoragePath
 
 # Find highlights of streams that are cached
 if __name__ == "__main__":
@@ -6,9 +8,10 @@ if __name__ == "__main__":
     # Limited to merely 1000 messages for this example as it'd take way longer to fetch all messages.
     message_limit = 1000
 
-    # Creating an empty analyser object instance to get the cached ids
-    for id in sa.StreamAnalyser("").filehandler.get_cached_ids():
-        with sa.StreamAnalyser(id, msglimit=message_limit) as analyser:
+    # Cached ids can be found without creating an analyser, and
+    # cached streams can be analysed without any network access
+    for id in FileHandler(DefaultStoragePath.get_path()).get_cached_ids():
+        with sa.StreamAnalyser(id, msglimit=message_limit, offline=True) as analyser:
             analyser.analyse()
             analyser.get_highlights(
                 top=len(analyser.highlights), output_mode="detailed"
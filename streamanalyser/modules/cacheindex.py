@@ -0,0 +1,247 @@
+import sqlite3
+from time import time
+
+# orders of the streams to evict first for each deletion algorithm
+EVICTION_ORDERS = {
+    "lru": "last_used ASC",
+    "mru": "last_used DESC",
+    "fifo": "created ASC",
+    "rr": "RANDOM()",
+    "gds": "priority ASC",
+}
+
+
+class CacheIndex:
+    """An SQLite index of the cached streams, so that the cache folder
+    doesn't have to be walked to find streams to evict.
+
+    Columns of the `streams` table:
+        - id (str): Stream id, which is also the cache folder name.
+        - size (int): Total size of the files in the folder in bytes.
+        - created (float): UNIX time the folder is indexed first.
+        - last_used (float): UNIX time the cache is last read or written.
+        - message_count (int|None): Cached message amount. None if
+            messages are not cached.
+        - complete (int|None): If all messages are cached. None if
+            metadata is not cached.
+        - priority (float): GreedyDual-Size priority. Set to
+            `inflation + 1 / size` whenever the stream is used, where
+            inflation is the priority of the last evicted stream. Large
+            streams that haven't been used for a while are evicted first.
+
+    Args:
+        path (str): Path to the database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        with self.connection:
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS streams (
+                    id TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    message_count INTEGER,
+                    complete INTEGER,
+                    priority REAL NOT NULL DEFAULT 0
+                )"""
+            )
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(streams)")]
+            if "priority" not in columns:
+                self.connection.execute(
+                    "ALTER TABLE streams ADD COLUMN priority REAL NOT NULL DEFAULT 0"
+                )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS streams_last_used ON streams (last_used)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS streams_created ON streams (created)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS streams_priority ON streams (priority)"
+            )
+
+    def __repr__(self) -> str:
+        return f"CacheIndex({self.path}, {len(self)} streams)"
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM streams").fetchone()[0]
+
+    def __contains__(self, sid) -> bool:
+        return self.connection.execute(
+            "SELECT 1 FROM streams WHERE id = ?", (sid,)
+        ).fetchone() is not None
+
+    def update(self, sid, touch=True, **values):
+        """Adds the stream if it's not indexed and updates its values.
+
+        Args:
+            sid (str): Stream id.
+            touch (bool, optional): Set last used time to now. Defaults to True.
+            **values: Column values to set. See the class docstring.
+        """
+        now = time()
+        values = dict(values)
+        if "complete" in values and values["complete"] is not None:
+            values["complete"] = int(bool(values["complete"]))
+        if touch:
+            values["last_used"] = now
+        with self.connection:
+            inserted = self.connection.execute(
+                "INSERT OR IGNORE INTO streams (id, created, last_used) VALUES (?, ?, ?)",
+                (sid, values.pop("created", now), values.get("last_used", now)),
+            ).rowcount
+            if values:
+                self.connection.execute(
+                    f"UPDATE streams SET {', '.join(f'{column} = ?' for column in values)} WHERE id = ?",
+                    (*values.values(), sid),
+                )
+            if touch or inserted:
+                self.connection.execute(
+                    "UPDATE streams SET priority = ? + 1.0 / MAX(size, 1) WHERE id = ?",
+                    (self.inflation, sid),
+                )
+
+    def remove(self, *sids, evicted=False):
+        """Removes the streams from the index.
+
+        Args:
+            *sids (str): Stream ids.
+            evicted (bool, optional): The streams are removed by a deletion
+                algorithm, which updates the GreedyDual-Size inflation.
+                Defaults to False.
+        """
+        with self.connection:
+            if evicted and sids:
+                priority = self.connection.execute(
+                    f"SELECT MAX(priority) FROM streams WHERE id IN ({', '.join('?' * len(sids))})",
+                    sids,
+                ).fetchone()[0]
+                if priority is not None and priority > self.inflation:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('inflation', ?)",
+                        (priority,),
+                    )
+            self.connection.executemany(
+                "DELETE FROM streams WHERE id = ?", [(sid,) for sid in sids]
+            )
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM streams")
+            self.connection.execute("DELETE FROM meta")
+
+    @property
+    def inflation(self) -> float:
+        """GreedyDual-Size inflation value, which is the priority
+        of the last evicted stream."""
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'inflation'"
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def total_size(self) -> int:
+        """Returns total size of the indexed streams in bytes"""
+        return self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM streams"
+        ).fetchone()[0]
+
+    def get(self, sid):
+        """Returns the indexed values of the stream as a dict, or None"""
+        cursor = self.connection.execute("SELECT * FROM streams WHERE id = ?", (sid,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip((column[0] for column in cursor.description), row))
+
+    def ids(self, cached_only=False) -> list:
+        """Returns indexed stream ids.
+
+        Args:
+            cached_only (bool, optional): Only return streams that have
+                their messages or metadata cached. Defaults to False.
+        """
+        query = "SELECT id FROM streams"
+        if cached_only:
+            query += " WHERE message_count IS NOT NULL OR complete IS NOT NULL"
+        return [row[0] for row in self.connection.execute(query + " ORDER BY id")]
+
+    def _ordered(self, algorithm, exclude):
+        if algorithm not in EVICTION_ORDERS:
+            raise ValueError(f"Invalid deletion algorithm: {algorithm}")
+        if exclude is None:
+            exclude = ()
+        elif isinstance(exclude, str):
+            exclude = (exclude,)
+        exclude = tuple(exclude)
+        return self.connection.execute(
+            f"SELECT id, size FROM streams WHERE id NOT IN ({', '.join('?' * len(exclude))}) "
+            f"ORDER BY {EVICTION_ORDERS[algorithm]}",
+            exclude,
+        )
+
+    def first(self, algorithm, exclude=None):
+        """Returns id of the stream to evict first according to the
+        deletion algorithm except `exclude`, or None"""
+        row = self._ordered(algorithm, exclude).fetchone()
+        return row[0] if row else None
+
+    def least_recently_used(self, exclude=None):
+        """Returns id of the least recently used stream except `exclude`, or None"""
+        return self.first("lru", exclude)
+
+    def most_recently_used(self, exclude=None):
+        """Returns id of the most recently used stream except `exclude`, or None"""
+        return self.first("mru", exclude)
+
+    def oldest(self, exclude=None):
+        """Returns id of the oldest stream except `exclude`, or None"""
+        return self.first("fifo", exclude)
+
+    def random(self, exclude=None):
+        """Returns id of a random stream except `exclude`, or None"""
+        return self.first("rr", exclude)
+
+    def victims(self, algorithm, max_bytes=None, max_amount=None, exclude=None) -> list:
+        """Returns ids of the streams to evict so that the cache fits
+        in the limits, in a single pass.
+
+        Args:
+            algorithm (str): Deletion algorithm. See `EVICTION_ORDERS`.
+            max_bytes (int|None, optional): Total size limit in bytes.
+                Defaults to None.
+            max_amount (int|None, optional): Stream amount limit.
+                Defaults to None.
+            exclude (str|Iterable[str]|None, optional): Stream ids to
+                never evict. Defaults to None.
+
+        Returns:
+            list[str]: Stream ids in eviction order.
+        """
+        total_size, amount = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM streams"
+        ).fetchone()
+
+        def exceeds():
+            return (max_bytes is not None and total_size > max_bytes) or (
+                max_amount is not None and amount > max_amount
+            )
+
+        victims = []
+        if not exceeds():
+            return victims
+        for sid, size in self._ordered(algorithm, exclude):
+            victims.append(sid)
+            total_size -= size
+            amount -= 1
+            if not exceeds():
+                break
+        return victims
+
+    def close(self):
+        self.connection.close()
@@ -1,11 +1,14 @@
 import os
 import json
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from typing import Optional
+from itertools import product
+from time import perf_counter
 import string
 
 from colorama import Fore
-from matplotlib import collections, pyplot as plt, font_manager as fm, rcParams
 import numpy as np
 
 from .loggersetup import create_logger
@@ -13,7 +16,11 @@ from . import utils
 from .structures import (
     Emote,
     Intensity,
+    TimeSeries,
     Highlight,
+    SweepResult,
+    MessageSlice,
+    MessageTable,
     ContextSourceManager,
     Context,
     Trigger
@@ -27,19 +34,72 @@ from .exceptions import (
     ContextsAllCorruptException,
     PathAlreadyExistsException
 )
-from .keyphrase_finder import KeyphraseFinder
+from .keyphrase_finder import KeyphraseFinder, TOKENIZERS, load_nltk
+from .contextmatcher import ContextMatcher, get_registry
 
 DEFAULT_FONT_PATH = os.path.join(
     os.path.dirname(os.path.realpath(__file__)), "..", "fonts", "NotoSansCJKjp-Bold.ttf"
 )
 
+KEYPHRASE_FIX_PHRASES = [
+    ("let 's", "let's"),
+    ("ca n't", "can't"),
+    ("do n't", "don't"),
+    ("he 's", "he's"),
+    ("they 're", "they're"),
+    ("it 's", "it's"),
+    ("it ’ s", "it’s"),
+    ("i 'm", "i'm"),
+    ("you 're", "you're"),
+]
+KEYPHRASE_PUNCTUATIONS = list(string.punctuation) + ["！","？"]
+
+# messages to send to a keyphrase worker process at once for tokenizing
+KEYPHRASE_TOKENIZE_CHUNKSIZE = 256
+
+# keyphrase finder of a keyphrase worker process
+_worker_finder = None
+
+
+def _create_keyphrase_finder(stop_words_path, tokenizer="nltk") -> KeyphraseFinder:
+    return KeyphraseFinder(
+        chat = [],
+        fix_phrases = KEYPHRASE_FIX_PHRASES,
+        punctuation_list = KEYPHRASE_PUNCTUATIONS,
+        stop_words_path = stop_words_path,
+        tokenizer = tokenizer,
+    )
+
+
+def _find_keyphrases(finder, chat, keyword_limit) -> list:
+    finder.chat = chat
+    ### TODO
+    # pass arguments
+    # implement keyphrase class
+    return [r[0] for r in [tup for tup in finder.ngram_keyphrase_analysis(
+        max_keyphrase_amount=keyword_limit,
+        min_keyphrase_amount=keyword_limit, # to achieve non-dynamic keyphrase amount
+    )]]
+
+
+def _init_keyphrase_worker(stop_words_path, tokenizer):
+    global _worker_finder
+    if tokenizer == "nltk":
+        # messages might be tokenized in the worker before the finder is used
+        load_nltk()
+    _worker_finder = _create_keyphrase_finder(stop_words_path, tokenizer)
+
+
+def _find_keyphrases_in_worker(texts, keyword_limit) -> list:
+    return _find_keyphrases(_worker_finder, texts, keyword_limit)
+
 
 class ChatAnalyser:
     """A class to analyse live chat messages
 
     Args:
-        refined_messages (list[Message]): List of messages of the stream refined by
-            the DataRefiner class.
+        refined_messages (list[Message]|MessageTable): Messages of the stream refined by
+            the DataRefiner class. A `MessageTable` is analysed directly on its arrays.
 
         log_path(str): Path to log folder. Set to None to log without writing to a file.
 
@@ -52,6 +112,9 @@ class ChatAnalyser:
         threshold_constant(int, optional): The value that divides average highlight duration.
             Set higher to get shorter highlights. Defaults to 3.
 
+        smoothing_width(int, optional): Width of the window that smoothens the moving
+            average. Defaults to 40.
+
         keyword_limit(int, optional): Keyword amount to retrieve. Defaults to 4.
 
         keyword_filters(list, optional): Keywords to filter. Defaults to [].
@@ -63,6 +126,22 @@ class ChatAnalyser:
 
         stop_words_path (bool, optional): Default stop word file (.txt) path to exclude in
             keyphrase collocations. Defaults to None.
+
+        keyphrase_workers (int, optional): Process amount to find highlight keyphrases
+            with. Keyphrases are found serially if there are less than two highlights
+            for each process. Defaults to 1, which finds them in this process.
+
+        context_cache_path (str, optional): Path to persist compiled contexts to, so
+            that other processes don't have to compile them again. Defaults to None,
+            which only shares them within the process.
+
+        token_store (TokenStore, optional): Token store of the stream to reuse keyphrase
+            tokens from. Defaults to None, which tokenizes messages every time.
+
+        tokenizer (str, optional): Tokenizer to find keyphrases with. "nltk" uses
+            `nltk.word_tokenize`, "rule" uses a faster rule-based tokenizer that also
+            handles emotes, CJK runs, repeated characters and contractions.
+            Defaults to "nltk".
     """
 
     def __init__(
@@ -77,31 +156,49 @@ class ChatAnalyser:
         keyword_limit=4,
         keyword_filters=[],
         verbose=False,
-        stop_words_path = None
+        stop_words_path = None,
+        smoothing_width=40,
+        keyphrase_workers=1,
+        context_cache_path=None,
+        token_store=None,
+        tokenizer="nltk",
     ):
         self.messages = refined_messages
         self.stream_id = stream_id
         self.min_duration = min_duration
         self.window = window
         self.threshold_constant = threshold_constant
+        self.smoothing_width = smoothing_width
         self.keyword_limit = keyword_limit
         self.keyword_filters = keyword_filters
         self.default_context_path = default_context_path
         self.verbose = verbose
         self.stop_words_path = stop_words_path
+        self.keyphrase_workers = keyphrase_workers
+        self.token_store = token_store
+        self.tokenizer = tokenizer
         self.logger = create_logger(__file__, log_path)
 
         if not self.window > 1:
             self.logger.error("Interval must be bigger than one")
             raise ValueError("Interval must be bigger than one")
-
-        self.frequency = {}
+        if self.keyphrase_workers < 1:
+            self.logger.error("Keyphrase worker amount must be a natural number")
+            raise ValueError("Keyphrase worker amount must be a natural number")
+        if self.tokenizer not in TOKENIZERS:
+            self.logger.error(f"Invalid tokenizer: {self.tokenizer}")
+            raise ValueError(f"Invalid tokenizer: {self.tokenizer}")
+
+        self.frequency = TimeSeries(np.zeros(0, dtype=np.int64))
         self.intensity_list = []
-        self.fre_mov_avg = {}
+        self.fre_mov_avg = TimeSeries(np.zeros(0))
         self.exp_mov_avg = []
         self.highlight_annotation = []
         self.highlights = []
         self.contexts = []
+        self._context_matcher = None
+        self._matched_contexts = None
+        self.context_registry = get_registry(context_cache_path)
 
         self.source = ContextSourceManager() # important
         if self.default_context_path:
@@ -126,7 +223,8 @@ class ChatAnalyser:
         self.logger.debug(f"autofix={autofix}")
         
         # TODO check triggers too (right now it only checks reactions)
-        seen_tuples = set()
+        # reaction -> index in new_contexts, to merge duplicates in O(1)
+        seen_reactions = {}
         new_contexts = []
         for context in self.contexts:
 
@@ -142,19 +240,13 @@ class ChatAnalyser:
                     raise KeyError(err_msg)
 
             # Handle duplicate data error
-            reaction_tuple = tuple({'reaction_to', context.get('reaction_to')})
-            if reaction_tuple not in seen_tuples:
-                seen_tuples.add(reaction_tuple)
+            if context['reaction_to'] not in seen_reactions:
+                seen_reactions[context['reaction_to']] = len(new_contexts)
                 new_contexts.append(context)
             else: 
                 if autofix:
                     self.logger.warning(f"Merging duplicate context: {context['reaction_to']}")
-                    i = next((i for i, nc in enumerate(new_contexts) if nc['reaction_to'] == context['reaction_to']), None)
-                    if i == None:
-                        self.logger.critical(f"Unexpected error: i={i}")
-                        self.logger.critical(f"new_contexts={new_contexts}")
-                        self.logger.critical(f"context={context}")
-                        raise UnexpectedException("You should not be seeing this.")
+                    i = seen_reactions[context['reaction_to']]
                     new_contexts[i].get('triggers').extend(context.get('triggers'))
                 else:
                     err_msg = f"Duplicate context, reaction to '{context.get('reaction_to')}' already exists"
@@ -199,44 +291,55 @@ class ChatAnalyser:
         return parsed_contexts
 
     def get_contexts(self, autofix:bool=False) -> list:
-        """Wrapper function to get the contexts"""
-        self.read_contexts_from_sources()
-        self._check_contexts(autofix=autofix)
-        self.contexts = self.parse_contexts(autofix=autofix)
+        """Wrapper function to get the contexts. Contexts are compiled
+        once and shared through the context registry until a source
+        file changes."""
+
+        def compile():
+            self.read_contexts_from_sources()
+            self._check_contexts(autofix=autofix)
+            contexts = self.parse_contexts(autofix=autofix)
+            return contexts, ContextMatcher(contexts)
+
+        self.contexts, self._context_matcher = self.context_registry.get(
+            self.source.paths, compile, autofix=autofix
+        )
+        self._matched_contexts = self.contexts
         return self.contexts
 
-    def get_frequency(self) -> dict:
+    def _message_times(self) -> np.ndarray:
+        """Returns message times as an integer array"""
+        if isinstance(self.messages, MessageTable):
+            return self.messages.time
+        return np.fromiter(
+            (message.time for message in self.messages),
+            dtype=np.int64,
+            count=len(self.messages),
+        )
+
+    def get_frequency(self) -> TimeSeries:
         """Creates frequency table of messages"""
 
         self.logger.info("Calculating frequency")
-
-        # create frequency table
-        message_frequency = {}
-        for i, message in enumerate(self.messages):
-            if self.verbose:
-                print(
-                    f"Calculating frequency...{round(utils.percentage(i, len(self.messages))/2)}%",
-                    end="\r",
+        if self.verbose:
+            print("Calculating frequency...", end="\r")
+
+        times = self._message_times()
+        if len(times):
+            # messages sent before the stream starts have negative times,
+            # only the negative seconds that have messages are kept
+            start = min(int(times.min()), 0)
+            counts = np.bincount(times - start)
+            if start < 0:
+                seconds = np.concatenate(
+                    (np.flatnonzero(counts[:-start]), np.arange(-start, len(counts)))
                 )
-            if message.time in message_frequency:
-                message_frequency[message.time] += 1
+                self.frequency = TimeSeries(counts[seconds], seconds=seconds + start)
             else:
-                message_frequency[message.time] = 1
+                self.frequency = TimeSeries(counts)
+        else:
+            self.frequency = TimeSeries(np.zeros(0, dtype=np.int64))
 
-        # fill the blank seconds
-        for sec in range(self.messages[-1].time):
-            if self.verbose:
-                print(
-                    f"Calculating frequency...{round(utils.percentage(sec, self.messages[-1].time)/2)+50}%",
-                    end="\r",
-                )
-            if not sec in message_frequency.keys():
-                message_frequency[sec] = 0
-
-        # sort
-        self.frequency = {}
-        for key in sorted(message_frequency.keys()):
-            self.frequency[key] = message_frequency[key]
         if self.verbose:
             print(f"Calculating frequency... done")
 
@@ -287,32 +390,38 @@ class ChatAnalyser:
         ]
         return self.intensity_list
 
-    def calculate_moving_average(self) -> dict:
-        """Returns moving average of a table"""
+    def calculate_moving_average(self) -> TimeSeries:
+        """Returns moving average of a table.
+
+        Sums of the last `window` seconds are taken from the cumulative sum
+        of the frequency table. The first seconds are averaged over the
+        values seen so far, since the window is not filled yet.
+        """
 
         self.logger.info("Calculating moving average")
-        self.fre_mov_avg = {}
-        stack = []  # holds frequency of the last {window} seconds
-        for time, value in self.frequency.items():
-            if self.verbose:
-                print(
-                    f"Calculating moving average...{utils.percentage(time, len(self.frequency))}%",
-                    end="\r",
-                )
-            if len(stack) == self.window:
-                stack.pop(0)
-            stack.append(value)
-            self.fre_mov_avg[time] = sum(stack) / len(stack)
+        if self.verbose:
+            print("Calculating moving average...", end="\r")
+
+        self.fre_mov_avg = self.frequency.with_array(
+            self._moving_average(self.frequency.array, self.window)
+        )
 
         if self.verbose:
             print(f"Calculating moving average... done")
         return self.fre_mov_avg
 
-    def _smoothen(self, dict, w=40) -> list:
-        return list(np.convolve(list(dict.values()), np.ones(w) / w, mode="same"))
+    @staticmethod
+    def _moving_average(values, window) -> np.ndarray:
+        window_sums = np.cumsum(values)
+        window_sums[window:] -= window_sums[:-window].copy()
+        window_sizes = np.minimum(np.arange(1, len(values) + 1), window)
+        return window_sums / window_sizes
+
+    def _smoothen(self, series, w=40) -> np.ndarray:
+        return np.convolve(np.asarray(series, dtype=float), np.ones(w) / w, mode="same")
 
-    def smoothen_mov_avg(self) -> list:
-        self.exp_mov_avg = self._smoothen(self.fre_mov_avg)
+    def smoothen_mov_avg(self) -> np.ndarray:
+        self.exp_mov_avg = self._smoothen(self.fre_mov_avg, self.smoothing_width)
         return self.exp_mov_avg
 
     def create_highlight_annotation(self) -> list:
@@ -320,23 +429,15 @@ class ChatAnalyser:
         Values are either -1, 0 or 1 where 1 means the value increasing."""
 
         self.logger.info("Creating highlight annotation")
-        self.highlight_annotation = []
-        for i in range(len(self.exp_mov_avg)):
-            if i == len(self.exp_mov_avg) - 1:
-                break
-            if self.exp_mov_avg[i] < self.exp_mov_avg[i + 1]:
-                self.highlight_annotation.append(1)
-            elif self.exp_mov_avg[i] > self.exp_mov_avg[i + 1]:
-                self.highlight_annotation.append(-1)
-            else:
-                self.highlight_annotation.append(0)
+        annotation = np.sign(np.diff(np.asarray(self.exp_mov_avg, dtype=float)))
+        self.highlight_annotation = annotation.astype(int).tolist()
 
         for state, notation in {
             "increasing": 1,
             "decreasing": -1,
             "constant": 0,
         }.items():
-            count = self.highlight_annotation.count(notation)
+            count = int(np.count_nonzero(annotation == notation))
             self.logger.debug(f"Total {state} duration: {count}")
 
         return self.highlight_annotation
@@ -356,6 +457,27 @@ class ChatAnalyser:
                 colors.append("gray")
         return colors
 
+    @staticmethod
+    def _increasing_runs(annotation) -> tuple:
+        """Returns start and end seconds of the increasing runs
+        in the highlight annotation. Runs that last until the
+        end of the annotation are not closed, hence excluded."""
+
+        increasing = np.asarray(annotation) == 1
+        edges = np.diff(np.concatenate(([False], increasing, [False])).astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        closed = ends < len(increasing)
+        starts, ends = starts[closed], ends[closed]
+
+        # a run starting at the first second is considered to
+        # start at the next one, as 0 is the "not started" state
+        if len(starts) and starts[0] == 0:
+            starts[0] = 1
+            if ends[0] == 1:
+                starts, ends = starts[1:], ends[1:]
+        return starts, ends
+
     def detect_highlight_times(self) -> list:
         """Detects highlight times and durations according to highlight annotation and
             smoothened moving average.  Also sets frequency delta, which is the change
@@ -367,42 +489,33 @@ class ChatAnalyser:
 
         # TODO improve algorithm
         self.logger.info("Detecting highlight times")
+        if self.verbose:
+            print("Detecting highlight timestamps...", end="\r")
+
+        exp_mov_avg = np.asarray(self.exp_mov_avg, dtype=float)
+        starts, ends = self._increasing_runs(self.highlight_annotation)
+        durations = ends - starts
+        deltas = exp_mov_avg[ends] - exp_mov_avg[starts]
+
+        long_enough = durations >= self.min_duration
+        rising = deltas >= 0
+        self.logger.debug(
+            f"{np.count_nonzero(~long_enough)} highlights were not added, duration was too short"
+        )
+        self.logger.debug(
+            f"{np.count_nonzero(long_enough & ~rising)} highlights were not added, delta was negative"
+        )
 
         self.highlights = []
-        start_time = 0
-        initial_frequency = 0
-        for current_time in range(len(self.highlight_annotation)):
-            if self.verbose:
-                print(
-                    f"Detecting highlight timestamps... {utils.percentage(current_time, len(self.highlight_annotation))}%",
-                    end="\r",
-                )
-            if not start_time and self.highlight_annotation[current_time] == 1:
-                start_time = current_time
-                initial_frequency = self.exp_mov_avg[current_time]
-
-            if start_time and self.highlight_annotation[current_time] != 1:
-                duration = current_time - start_time
-                if duration < self.min_duration:
-                    self.logger.debug(
-                        f"Highlight @{start_time} was not added, duration was {duration}"
-                    )
-                    start_time = 0
-                    continue
-                delta = self.exp_mov_avg[current_time] - initial_frequency
-                if delta < 0:
-                    self.logger.debug(
-                        f"Highlight @{start_time} was not added, delta was {delta}"
-                    )
-                    start_time = 0
-                    continue
-                self.highlights.append(
-                    Highlight(self.stream_id, start_time, duration, fdelta=delta)
-                )
-                self.logger.debug(
-                    f"Highlight found: from {start_time} to {current_time} ({duration}s)"
-                )
-                start_time = 0
+        for start_time, duration, delta in zip(
+            *(arr[long_enough & rising].tolist() for arr in (starts, durations, deltas))
+        ):
+            self.highlights.append(
+                Highlight(self.stream_id, start_time, duration, fdelta=delta)
+            )
+            self.logger.debug(
+                f"Highlight found: from {start_time} to {start_time+duration} ({duration}s)"
+            )
         if self.verbose:
             print("Detecting highlight timestamps... done")
         return self.highlights
@@ -416,28 +529,44 @@ class ChatAnalyser:
         if not self.highlights:
             return []
 
-        if len(self.highlights) != 1:
-            self.highlights.pop(0)
-
-        avg_highlight_duration = sum([hl.duration for hl in self.highlights]) / len(
-            self.highlights
+        keep = self._correction_mask(
+            np.array([hl.duration for hl in self.highlights]), self.threshold_constant
         )
-        for i, highlight in enumerate(self.highlights):
-            if self.verbose:
-                print(
-                    f"Correcting highlights... {utils.percentage(i, len(self.highlights))}",
-                    end="\r",
+        for highlight, kept in zip(self.highlights[1:], keep[1:]):
+            if not kept:
+                self.logger.debug(
+                    f"Removed highlight at {highlight.time}, duration was too short ({highlight.duration}s)"
                 )
-            if highlight.duration <= avg_highlight_duration / self.threshold_constant:
-                self.highlights.remove(highlight)
-                if self.verbose:
-                    self.logger.debug(
-                        f"Removed highlight at {highlight.time}, duration was too short ({highlight.duration}s)"
-                    )
+        self.highlights = [hl for hl, kept in zip(self.highlights, keep) if kept]
         if self.verbose:
             print("Correcting highlights... done")
         return self.highlights
 
+    @staticmethod
+    def _correction_mask(durations, threshold_constant) -> np.ndarray:
+        """Returns which highlights are kept by `correct_highlights`.
+
+        The first highlight is dropped unless it is the only one. Highlights
+        not longer than the average duration divided by the threshold
+        constant are dropped, except the ones right after a dropped
+        highlight, which are kept as they always have been.
+        """
+
+        keep = np.zeros(len(durations), dtype=bool)
+        if not len(durations):
+            return keep
+        first = 0 if len(durations) == 1 else 1
+        candidates = durations[first:]
+        limit = int(candidates.sum()) / len(candidates) / threshold_constant
+        checked = True
+        for i, is_short in enumerate((candidates <= limit).tolist(), start=first):
+            if checked and is_short:
+                checked = False
+            else:
+                keep[i] = True
+                checked = True
+        return keep
+
     def set_highlight_intensities(self) -> list:
         """Sets highlight intensities based on frequency delta"""
 
@@ -463,36 +592,35 @@ class ChatAnalyser:
         return self.highlights
 
     def get_highlight_messages(self) -> list:
-        """Gets messages typed during highlights"""
+        """Gets messages typed during highlights.
+
+        Messages are expected to be sorted by time. Each highlight gets a
+        `MessageSlice` pointing to the messages within its duration, found
+        by binary searching the message times.
+
+        Unlike the sequential scan this replaced, the first message after
+        a highlight ends is assigned to the next highlight too if it's
+        within its duration, instead of only moving on to that highlight.
+        """
 
         self.logger.info("Getting highlight messages")
 
         if not self.highlights:
             return []
 
-        hl_idx = 0
-        for message in self.messages:
-            if self.verbose:
-                print(
-                    f"Getting highlight messages... {utils.percentage(hl_idx, len(self.highlights))}%",
-                    end="\r",
-                )
-
-            if (
-                self.highlights[hl_idx].time
-                < message.time
-                < self.highlights[hl_idx].duration + self.highlights[hl_idx].time
-            ):
-                self.highlights[hl_idx].messages.append(message)
+        if self.verbose:
+            print("Getting highlight messages...", end="\r")
 
-            if (
-                message.time
-                >= self.highlights[hl_idx].duration + self.highlights[hl_idx].time
-            ):
-                hl_idx += 1
+        times = self._message_times()
+        if np.any(times[1:] < times[:-1]):
+            self.logger.warning("Messages are not sorted by time, highlight messages might be incomplete")
 
-            if hl_idx == len(self.highlights):
-                break
+        hl_times = np.array([highlight.time for highlight in self.highlights])
+        hl_ends = hl_times + np.array([highlight.duration for highlight in self.highlights])
+        starts = np.searchsorted(times, hl_times, side="right")
+        stops = np.searchsorted(times, hl_ends, side="left")
+        for highlight, start, stop in zip(self.highlights, starts.tolist(), stops.tolist()):
+            highlight.messages = MessageSlice(self.messages, start, stop)
 
         if self.verbose:
             print("Getting highlight messages... done")
@@ -564,6 +692,30 @@ class ChatAnalyser:
             print("Getting highlight keywords... done")
         return self.highlights
 
+    def _keyphrase_chat(self, messages, map=map) -> list:
+        """Returns the chat to find keyphrases in. Messages are tokenized
+        through the token store if there's one, otherwise they are
+        tokenized by the keyphrase finder.
+
+        Args:
+            messages (Sequence[Message]): Messages of the chat.
+            map (Callable, optional): Map function to tokenize the messages
+                that are not in the token store with. Defaults to `map`.
+
+        Returns:
+            list[str|list[str]]: Message texts or their tokens.
+        """
+        if self.token_store is None:
+            return [message.text for message in messages]
+        messages = list(messages)
+        return self.token_store.tokenize(
+            f"keyphrase-{self.tokenizer}",
+            [str(message.id) for message in messages],
+            [message.text for message in messages],
+            TOKENIZERS[self.tokenizer],
+            map=map,
+        )
+
     def get_highlight_keyphrases(self) -> list:
         """Adds most frequently used phrases to the highlight list."""
 
@@ -572,25 +724,11 @@ class ChatAnalyser:
         if not self.highlights:
             return []
 
-        finder = KeyphraseFinder(
-            chat = [],
-            fix_phrases = [
-                ("let 's", "let's"),
-                ("ca n't", "can't"),
-                ("do n't", "don't"),
-                ("he 's", "he's"),
-                ("they 're", "they're"),
-                ("it 's", "it's"),
-                ("it ’ s", "it’s"),
-                ("i 'm", "i'm"),
-                ("you 're", "you're"),
-            ],
-            punctuation_list = list(string.punctuation) + ["！","？"],
-            stop_words_path = self.stop_words_path
-        )
+        found_keywords = self._find_keyphrases_in_pool()
+        finder = None
 
         for i, highlight in enumerate(self.highlights):
-            if self.verbose:
+            if self.verbose and not found_keywords:
                 print(
                     f"Getting highlight keyphrases... {utils.percentage(i, len(self.highlights))}%",
                     end="\r",
@@ -599,14 +737,14 @@ class ChatAnalyser:
             if not highlight.messages:
                 return self.highlights
 
-            finder.chat = highlight.messages
-            ### TODO
-            # pass arguments
-            # implement keyphrase class
-            keywords = [r[0] for r in [tup for tup in finder.ngram_keyphrase_analysis(
-                max_keyphrase_amount=self.keyword_limit,
-                min_keyphrase_amount=self.keyword_limit, # to achieve non-dynamic keyphrase amount 
-            )]]
+            if id(highlight) in found_keywords:
+                keywords = found_keywords[id(highlight)]
+            else:
+                if finder is None:
+                    finder = _create_keyphrase_finder(self.stop_words_path, self.tokenizer)
+                keywords = _find_keyphrases(
+                    finder, self._keyphrase_chat(highlight.messages), self.keyword_limit
+                )
 
             if keywords:
                 highlight.keywords = keywords
@@ -623,7 +761,70 @@ class ChatAnalyser:
         if self.verbose:
             print("Getting highlight keyphrases... done")
         return self.highlights
+
+    def _find_keyphrases_in_pool(self):
+        """Finds keyphrases of the highlights in a process pool. Only
+        message texts, or their tokens if there's a token store, are sent
+        to the worker processes. Helper function for `get_highlight_keyphrases`.
+
+        Returns:
+            dict[int, list[str]]: Keyphrases of the highlights up to the
+            first one without messages by highlight ids. Empty if there
+            are too few highlights to find them in parallel.
+        """
+
+        highlights = []
+        for highlight in self.highlights:
+            if not highlight.messages:
+                break
+            highlights.append(highlight)
+        if self.keyphrase_workers < 2 or len(highlights) < 2 * self.keyphrase_workers:
+            return {}
+
+        self.logger.debug(
+            f"Finding keyphrases of {len(highlights)} highlights with {self.keyphrase_workers} processes"
+        )
+        found_keywords = {}
+        with ProcessPoolExecutor(
+            max_workers=self.keyphrase_workers,
+            initializer=_init_keyphrase_worker,
+            initargs=(self.stop_words_path, self.tokenizer),
+        ) as executor:
+            if self.token_store is None:
+                chats = [self._keyphrase_chat(highlight.messages) for highlight in highlights]
+            else:
+                # tokenize the messages that are not in the store in one go
+                messages = [message for highlight in highlights for message in highlight.messages]
+                tokens = self._keyphrase_chat(
+                    messages, map=partial(executor.map, chunksize=KEYPHRASE_TOKENIZE_CHUNKSIZE)
+                )
+                chats = []
+                start = 0
+                for highlight in highlights:
+                    chats.append(tokens[start:start + len(highlight.messages)])
+                    start += len(highlight.messages)
+            for i, keywords in enumerate(executor.map(
+                _find_keyphrases_in_worker,
+                chats,
+                [self.keyword_limit] * len(chats),
+            )):
+                if self.verbose:
+                    print(
+                        f"Getting highlight keyphrases... {utils.percentage(i, len(chats))}%",
+                        end="\r",
+                    )
+                found_keywords[id(highlights[i])] = keywords
+        return found_keywords
     
+    @property
+    def context_matcher(self) -> ContextMatcher:
+        """Matcher compiled from the current contexts. Compiled again
+        only when `contexts` is reassigned."""
+        if self._context_matcher is None or self._matched_contexts is not self.contexts:
+            self._context_matcher = ContextMatcher(self.contexts)
+            self._matched_contexts = self.contexts
+        return self._context_matcher
+
     def _is_keyword_emote(self, keyword):
         return keyword.startswith(':') and keyword.endswith(':')
 
@@ -634,6 +835,8 @@ class ChatAnalyser:
         if not self.highlights:
             return
 
+        matcher = self.context_matcher
+
         for i, highlight in enumerate(self.highlights):
             if self.verbose:
                 print(
@@ -641,12 +844,8 @@ class ChatAnalyser:
                     end="\r",
                 )
             for keyword in highlight.keywords:
-                for context in self.contexts:
-                    for trigger in context.triggers:
-                        kw = keyword if self._is_keyword_emote(keyword) else keyword.lower()
-                        if  (trigger.is_exact and trigger.phrase == kw) or \
-                            (not trigger.is_exact and trigger.phrase in kw):
-                                highlight.contexts.add(context.reaction_to)
+                kw = keyword if self._is_keyword_emote(keyword) else keyword.lower()
+                highlight.contexts |= matcher.match(kw)
             if not highlight.contexts:
                 highlight.contexts = set(["None"])
             self.logger.debug(
@@ -670,7 +869,7 @@ class ChatAnalyser:
         self.guess_context()
         return self.highlights
 
-    def draw_graph(self, title=None) -> plt:
+    def draw_graph(self, title=None) -> "matplotlib.pyplot":
         """Draws a basic graph of the analysed data including:
         - Message frequency
         - Moving average of message frequency
@@ -679,6 +878,9 @@ class ChatAnalyser:
 
         # TODO make a better looking graph
 
+        # matplotlib takes long to import and is only needed for graphs
+        from matplotlib import collections, pyplot as plt, font_manager as fm
+
         self.logger.info("Drawing graph")
         if self.verbose:
             print(f"Drawing graph...", end="\r")
@@ -693,12 +895,10 @@ class ChatAnalyser:
         fprop = fm.FontProperties(fname=DEFAULT_FONT_PATH)
         fig.suptitle(title, fontproperties=fprop, fontsize=16)
 
-        xAxis = list(self.frequency)
-        yAxis = self.exp_mov_avg
-        lines = [
-            ((x0, y0), (x1, y1))
-            for x0, y0, x1, y1 in zip(xAxis[:-1], yAxis[:-1], xAxis[1:], yAxis[1:])
-        ]
+        xAxis = self.frequency.seconds
+        yAxis = np.asarray(self.exp_mov_avg, dtype=float)
+        points = np.column_stack((xAxis[: len(yAxis)], yAxis[: len(xAxis)]))
+        lines = np.stack((points[:-1], points[1:]), axis=1)
         colors = self.line_colors()
         colored_lines = collections.LineCollection(
             lines, colors=colors, linewidths=(2,)
@@ -707,10 +907,8 @@ class ChatAnalyser:
         ax[0].autoscale_view()
         ax[0].set_title("Highlights")
 
-        yAxis = list(self.frequency.values())
-        ax[1].bar(xAxis, yAxis)
-        yAxis = list(self.fre_mov_avg.values())
-        ax[1].plot(xAxis, yAxis, "m--")
+        ax[1].bar(xAxis, self.frequency.array)
+        ax[1].plot(xAxis, np.asarray(self.fre_mov_avg, dtype=float), "m--")
         ax[1].set_title("Message frequency")
 
         if self.verbose:
@@ -719,8 +917,103 @@ class ChatAnalyser:
         self.fig = plt
         return plt
 
+    def sweep(self, windows=None, smoothing_widths=None, min_durations=None, threshold_constants=None) -> list:
+        """Detects highlights for each combination of the parameters. The frequency
+            table is only calculated once, and keyphrases and contexts are not
+            searched. Use `analyse_sweep_result` to fully analyse a configuration.
+
+        Args:
+            windows (list[int], optional): Windows to calculate moving averages.
+                Defaults to [self.window].
+            smoothing_widths (list[int], optional): Widths to smoothen moving averages.
+                Defaults to [self.smoothing_width].
+            min_durations (list[int], optional): Minimum highlight durations.
+                Defaults to [self.min_duration].
+            threshold_constants (list[float], optional): Threshold constants.
+                Defaults to [self.threshold_constant].
+
+        Returns:
+            list[SweepResult]: Results for each configuration.
+        """
+
+        windows = windows or [self.window]
+        smoothing_widths = smoothing_widths or [self.smoothing_width]
+        min_durations = np.array(min_durations or [self.min_duration])
+        threshold_constants = threshold_constants or [self.threshold_constant]
+
+        self.logger.info("Sweeping parameters")
+        self.logger.debug(f"windows={windows}")
+        self.logger.debug(f"smoothing_widths={smoothing_widths}")
+        self.logger.debug(f"min_durations={min_durations.tolist()}")
+        self.logger.debug(f"threshold_constants={threshold_constants}")
+
+        if any(not window > 1 for window in windows):
+            self.logger.error("Interval must be bigger than one")
+            raise ValueError("Interval must be bigger than one")
+
+        if not len(self.frequency):
+            self.get_frequency()
+
+        results = []
+        total = len(windows) * len(smoothing_widths)
+        for counter, (window, smoothing_width) in enumerate(product(windows, smoothing_widths)):
+            if self.verbose:
+                print(f"Sweeping parameters... {utils.percentage(counter, total)}%", end="\r")
+
+            started = perf_counter()
+            smoothened = self._smoothen(
+                self._moving_average(self.frequency.array, window), smoothing_width
+            )
+            starts, ends = self._increasing_runs(np.sign(np.diff(smoothened)))
+            durations = ends - starts
+            deltas = smoothened[ends] - smoothened[starts]
+            # one row of candidates for each min duration
+            candidates = (durations >= min_durations[:, None]) & (deltas >= 0)
+            shared_elapsed = perf_counter() - started
+
+            for min_duration, row in zip(min_durations.tolist(), candidates):
+                indices = np.flatnonzero(row)
+                for threshold_constant in threshold_constants:
+                    started = perf_counter()
+                    kept = indices[self._correction_mask(durations[indices], threshold_constant)]
+                    highlights = [
+                        Highlight(self.stream_id, start_time, duration, fdelta=delta)
+                        for start_time, duration, delta in zip(
+                            starts[kept].tolist(), durations[kept].tolist(), deltas[kept].tolist()
+                        )
+                    ]
+                    results.append(SweepResult(
+                        window=window,
+                        smoothing_width=smoothing_width,
+                        min_duration=min_duration,
+                        threshold_constant=threshold_constant,
+                        highlights=highlights,
+                        elapsed=shared_elapsed + perf_counter() - started,
+                    ))
+
+        if self.verbose:
+            print("Sweeping parameters... done")
+        self.logger.debug(f"{len(results)} configurations swept")
+        return results
+
+    def analyse_sweep_result(self, result:SweepResult, levels=None, constants=None, colors=None, autofix_context_collision:bool=False):
+        """Fully analyses the stream with the parameters of a sweep result,
+        reusing the frequency table."""
+
+        self.logger.info("Analysing sweep result")
+        self.window = result.window
+        self.smoothing_width = result.smoothing_width
+        self.min_duration = result.min_duration
+        self.threshold_constant = result.threshold_constant
+        if not len(self.frequency):
+            self.get_frequency()
+        self._analyse_frequency(levels, constants, colors, autofix_context_collision)
+
     def analyse(self, levels=None, constants=None, colors=None, autofix_context_collision:bool=False):
         self.get_frequency()
+        self._analyse_frequency(levels, constants, colors, autofix_context_collision)
+
+    def _analyse_frequency(self, levels, constants, colors, autofix_context_collision):
         self.calculate_moving_average()
         self.smoothen_mov_avg()
         self.create_highlight_annotation()
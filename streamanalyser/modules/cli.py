@@ -9,7 +9,31 @@ import streamanalyser as sa
 
 def parseargs():
     parser = argparse.ArgumentParser()
-    parser.add_argument("id", help="id of the YouTube live stream")
+    parser.add_argument("id", nargs="?", help="id of the YouTube live stream")
+    parser.add_argument(
+        "-b",
+        "--batch",
+        default=None,
+        type=str,
+        help="analyse streams in a file that contains an id per line",
+    )
+    parser.add_argument(
+        "--batch-cached",
+        action="store_true",
+        help="analyse all cached streams in batch mode",
+    )
+    parser.add_argument(
+        "--workers",
+        default=None,
+        type=int,
+        help="process amount to analyse streams with in batch mode",
+    )
+    parser.add_argument(
+        "--timeout",
+        default=None,
+        type=float,
+        help="time limit to analyse a stream in batch mode (in seconds)",
+    )
     parser.add_argument(
         "-s",
         "--silent",
@@ -53,6 +77,18 @@ def parseargs():
         type=int,
         help="keyword amount to get for each highlight",
     )
+    parser.add_argument(
+        "--keyphrase-workers",
+        default=1,
+        type=int,
+        help="process amount to find highlight keyphrases with",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default="nltk",
+        choices=["nltk", "rule"],
+        help="tokenizer to find keyphrases with. rule is faster and doesn't need nltk data",
+    )
     parser.add_argument(
         "-w",
         "--window",
@@ -177,12 +213,47 @@ def parseargs():
     user_info.add_argument(
         "--yt-api-key", default="", type=str, help="youtube api key"
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.batch and args.batch_cached:
+        parser.error("--batch and --batch-cached options can't be used together")
+    if not args.id and not (args.batch or args.batch_cached):
+        parser.error("id is required unless --batch or --batch-cached option is used")
+    return args
+
+
+def run_batch(args):
+    sids = None  # all cached streams
+    if args.batch:
+        with open(args.batch, "r", encoding="utf-8") as f:
+            sids = [line.strip() for line in f if line.strip()]
+
+    batch_analyser = sa.BatchAnalyser(
+        sids,
+        workers=args.workers,
+        timeout=args.timeout,
+        verbose=not args.silent,
+        msglimit=args.limit,
+        yt_api_key=args.yt_api_key,
+        disable_logs=args.disable_logs,
+        log_duration=args.log_duration,
+        window=args.window,
+        min_duration=args.min_duration,
+        keyword_limit=args.keyword_limit,
+        keyphrase_workers=args.keyphrase_workers,
+        tokenizer=args.tokenizer,
+        keyword_filters=args.keyword_filters,
+    )
+    batch_analyser.analyse()
+    print(batch_analyser.summary())
 
 
 def main():
     args = parseargs()
 
+    if args.batch or args.batch_cached:
+        run_batch(args)
+        return
+
     analyser = sa.StreamAnalyser(
         args.id,
         msglimit=args.limit,
@@ -196,6 +267,8 @@ def main():
         window=args.window,
         min_duration=args.min_duration,
         keyword_limit=args.keyword_limit,
+        keyphrase_workers=args.keyphrase_workers,
+        tokenizer=args.tokenizer,
         keyword_filters=args.keyword_filters,
     )
 
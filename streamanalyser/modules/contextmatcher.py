@@ -0,0 +1,182 @@
+import os
+import pickle
+from collections import deque
+
+
+class ContextMatcher:
+    """Matches keywords against context triggers in a single pass.
+
+    Exact triggers are looked up in a dict, and inexact triggers, which
+    match when the phrase is a substring of the keyword, are compiled
+    into an Aho-Corasick automaton. Matching a keyword takes time
+    proportional to its length instead of the total trigger amount.
+
+    Args:
+        contexts (list[Context]): Parsed contexts.
+    """
+
+    def __init__(self, contexts):
+        self.exact = {}
+        # automaton nodes, the root is 0
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+
+        for context in contexts:
+            for trigger in context.triggers:
+                if trigger.is_exact:
+                    self.exact.setdefault(trigger.phrase, set()).add(context.reaction_to)
+                else:
+                    self._add_phrase(trigger.phrase, context.reaction_to)
+        self._build_failure_links()
+
+    def __repr__(self) -> str:
+        return f"ContextMatcher({len(self.exact)} exact phrases, {len(self._goto)} nodes)"
+
+    def _add_phrase(self, phrase, reaction_to):
+        node = 0
+        for char in phrase:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            node = next_node
+        self._output[node].add(reaction_to)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                # contexts of the suffixes match too
+                self._output[child] |= self._output[self._fail[child]]
+
+    def match(self, keyword) -> set:
+        """Returns the contexts that are triggered by the keyword.
+
+        Args:
+            keyword (str): Keyword to match, already normalized.
+
+        Returns:
+            set[str]: Matched contexts.
+        """
+        contexts = set(self.exact.get(keyword, ()))
+        # phrases that are empty match every keyword
+        contexts |= self._output[0]
+        node = 0
+        for char in keyword:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            contexts |= self._output[node]
+        return contexts
+
+
+class ContextRegistry:
+    """Compiled contexts that are shared by analysers in the same
+    process, so that context sources are only read, checked and
+    parsed again when a source file changes.
+
+    Compiled contexts are keyed by the path, modification time and
+    size of each source file, and optionally persisted to a pickle
+    file to share them between processes and runs. Only persist to
+    a trusted location since loading a pickle can run arbitrary code.
+
+    Args:
+        persist_path (str|None, optional): Path to the pickle file.
+            Defaults to None, which keeps compiled contexts in memory.
+    """
+
+    def __init__(self, persist_path=None):
+        self.persist_path = persist_path
+        self._compiled = None
+
+    def __repr__(self) -> str:
+        return f"ContextRegistry({self.persist_path}, {len(self._compiled or {})} entries)"
+
+    @staticmethod
+    def _signature(paths) -> tuple:
+        signature = []
+        for path in paths:
+            stat = os.stat(path)
+            signature.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load(self):
+        self._compiled = {}
+        if not self.persist_path or not os.path.isfile(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                self._compiled = pickle.load(f)
+        except Exception:
+            # corrupt or written by an incompatible version, compile again
+            self._compiled = {}
+
+    def _save(self):
+        if not self.persist_path:
+            return
+        tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(self._compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.persist_path)
+        except OSError:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    def get(self, paths, compile, autofix=False) -> tuple:
+        """Returns compiled contexts of the sources.
+
+        Args:
+            paths (list[str]): Paths to the context source files.
+            compile (Callable[[], tuple[list, ContextMatcher]]): Function
+                that reads and compiles the sources. Only called if they
+                are not compiled yet or changed since.
+            autofix (bool, optional): If the contexts are autofixed, which
+                is a part of the key. Defaults to False.
+
+        Returns:
+            tuple[list[Context], ContextMatcher]: Parsed contexts and
+            their matcher. They are shared and should not be modified.
+        """
+        if self._compiled is None:
+            self._load()
+        key = (autofix, self._signature(paths))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile()
+            # previous versions of the same sources won't be used again
+            sources = [path for path, _, _ in key[1]]
+            for stale_key in [
+                k for k in self._compiled
+                if k[0] == autofix and [path for path, _, _ in k[1]] == sources
+            ]:
+                del self._compiled[stale_key]
+            self._compiled[key] = compiled
+            self._save()
+        return compiled
+
+    def clear(self):
+        """Forgets compiled contexts, including the persisted ones"""
+        self._compiled = {}
+        if self.persist_path and os.path.isfile(self.persist_path):
+            os.remove(self.persist_path)
+
+
+_registries = {}
+
+
+def get_registry(persist_path=None) -> ContextRegistry:
+    """Returns the context registry of the process for the persist path"""
+    if persist_path not in _registries:
+        _registries[persist_path] = ContextRegistry(persist_path)
+    return _registries[persist_path]
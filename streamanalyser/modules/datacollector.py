@@ -1,25 +1,50 @@
 from os import stat
-from urllib import request, parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 
-from yaml.events import DocumentStartEvent
-
-from chat_downloader import ChatDownloader, errors
-from chat_downloader.sites.youtube import YouTubeChatDownloader 
-import isodate
-
 from .structures import ImageResolution
 from .loggersetup import create_logger
 from .utils import percentage
 from .exceptions import StreamIsLiveOrUpcomingError
 
+# chat_downloader, isodate and urllib are only imported when data is fetched
+
 
 class DataCollector:
-    """A class that fetches required data to analyse the stream."""
+    """A class that fetches required data to analyse the stream.
+
+    Args:
+        id (str): Video id of the stream.
+
+        log_path (str): Path to the log folder.
+
+        msglimit (int|None, optional): Message amount to fetch. Defaults to None.
+
+        verbose (bool, optional): Print output to console. Defaults to False.
+
+        yt_api_key (str, optional): YouTube API key. Defaults to None.
+
+        shards (int, optional): Amount of time ranges to fetch messages
+            concurrently. Messages are fetched sequentially if set to 1,
+            if there is a message limit, or if the duration of the stream
+            is unknown. Defaults to 1.
+
+        downloader (Callable, optional): Factory that returns a chat downloader
+            with a `get_chat` method. Defaults to `ChatDownloader`.
+
+        video_info (dict|None, optional): Previously probed video info. See
+            `video_info` property for the format. Defaults to None, which
+            probes the video when needed.
+    """
+
+    def __init__(self, id, log_path, msglimit=None, verbose=False, yt_api_key=None, shards=1, downloader=None, video_info=None) -> None:
+        if downloader is None:
+            from chat_downloader import ChatDownloader as downloader
 
-    def __init__(self, id, log_path, msglimit=None, verbose=False, yt_api_key=None) -> None:
         self.id = id
         self.logger = create_logger(__file__, log_path, sid=id)
+        self.downloader = downloader
+        self._video_info = video_info
         if self._is_live_or_upcoming:
             raise StreamIsLiveOrUpcomingError("Stream needs to be archived first to get its messages")
         self._check_chat_replay()
@@ -27,14 +52,41 @@ class DataCollector:
         self.msglimit = msglimit
         self.verbose = verbose
         self.yt_api_key = yt_api_key
+        if shards < 1:
+            raise ValueError("Shard amount must be a natural number")
+        self.shards = shards
 
         self.iscomplete = False
         self.metadata = {}
 
+    @property
+    def video_info(self) -> dict:
+        """Status, duration and chat replay availability of the video.
+        Probed once with a single request and memoized.
+
+        Returns:
+            dict: Video info with following keys:
+                - status (str): 'live', 'upcoming' or 'past'.
+                - duration (float|None): Duration in seconds.
+                - has_chat_replay (bool): If chat replay is available.
+        """
+        if self._video_info is None:
+            from chat_downloader.sites.youtube import YouTubeChatDownloader
+
+            self.logger.info("Probing video info")
+            video_data = YouTubeChatDownloader().get_video_data(self.id)
+            self._video_info = {
+                "status": video_data.get("status"),
+                "duration": video_data.get("duration"),
+                "has_chat_replay": bool(video_data.get("continuation_info")),
+            }
+            self.logger.debug(f"video_info={self._video_info}")
+        return self._video_info
+
     def _check_chat_replay(self):
-        try:
-            ChatDownloader().get_chat("https://www.youtube.com/watch?v=" + self.id, max_messages=1)
-        except errors.NoChatReplay:
+        if not self.video_info["has_chat_replay"]:
+            from chat_downloader import errors
+
             self.logger.error(f"Chat replay is not available: https://www.youtube.com/watch?v={self.id}")
             raise errors.NoChatReplay("Chat replay is not available")
 
@@ -56,10 +108,13 @@ class DataCollector:
     def _get_video_duration(self) -> int:
         if not self.yt_api_key:
             try:
-                return int(YouTubeChatDownloader().get_video_data(self.id).get("duration"))
+                return int(self.video_info["duration"])
             except Exception as e:
                 self.logger.error(f"Couldn't get video duration, returning -1 instead. ({e.__class__.__name__}: {e})")
                 return -1
+
+        from urllib import request
+
         return self._parse_duration(
             json.load(
                 request.urlopen(
@@ -70,9 +125,13 @@ class DataCollector:
 
     @staticmethod
     def _parse_duration(yt_duration_response) -> int:
+        import isodate
+
         return int(isodate.parse_duration(yt_duration_response).total_seconds())
 
     def _get_oembed_respone(self) -> dict:
+        from urllib import request, parse
+
         params = {
             "format": "json",
             "url": "https://www.youtube.com/watch?v=%s" % self.id,
@@ -116,7 +175,7 @@ class DataCollector:
             if not self.metadata["duration"]:
                 self.logger.warning("Can't check time consistency as duration is not determined yet")
                 return messages, 0
-            while messages[-1]["time_in_seconds"] > self.metadata["duration"]:
+            while messages and messages[-1]["time_in_seconds"] > self.metadata["duration"]:
                 self.logger.warning(f"Deleted message as its time was exceeding the video length: {messages[-1]['time_in_seconds']} ({self.metadata['duration']})")
                 inconsistent_data_amount+=1
                 del messages[-1]
@@ -125,18 +184,26 @@ class DataCollector:
     @property
     def _is_live_or_upcoming(self) -> bool:
         """Returns if the stream is live or upcoming""" # lol
-        return YouTubeChatDownloader().get_video_data(self.id).get("status") != 'past'
+        return self.video_info["status"] != 'past'
 
     def fetch_raw_messages(self) -> list:
         """Fetches live chat messages"""
 
         self.logger.info("Fetching messages")
+        duration = self.metadata.get("duration")
+        if self.shards > 1 and not self.msglimit:
+            if duration is None:
+                duration = self._get_video_duration()
+            if duration > 0:
+                return self._fetch_raw_messages_sharded(duration)
+            self.logger.warning("Fetching messages sequentially as duration is unknown")
+
         raw_messages = []
         yt_url = "https://www.youtube.com/watch?v=" + self.id
         corrupted_data_amount = 0
         try:
             for counter, raw_message in enumerate(
-                ChatDownloader().get_chat(yt_url, start_time=0, message_groups=['messages', 'superchat']), start=1
+                self.downloader().get_chat(yt_url, start_time=0, message_groups=['messages', 'superchat']), start=1
             ):
                 if self.verbose:
                     print(
@@ -170,6 +237,95 @@ class DataCollector:
 
         return raw_messages
 
+    def _get_shard_ranges(self, duration) -> list[tuple]:
+        """Splits the duration into `shards` consecutive time ranges.
+        The last range is left open to catch messages that are
+        written after the stream ends."""
+
+        shards = min(self.shards, max(int(duration), 1))
+        bounds = [round(duration * i / shards) for i in range(shards + 1)]
+        return [
+            (bounds[i], bounds[i + 1] if i < shards - 1 else None)
+            for i in range(shards)
+        ]
+
+    def _fetch_shard(self, start_time, end_time) -> tuple[list, int]:
+        """Fetches messages between the start and end time.
+        Helper function for `_fetch_raw_messages_sharded`."""
+
+        yt_url = "https://www.youtube.com/watch?v=" + self.id
+        raw_messages = []
+        corrupted_data_amount = 0
+        for raw_message in self.downloader().get_chat(
+            yt_url,
+            start_time=start_time,
+            end_time=end_time,
+            message_groups=['messages', 'superchat'],
+        ):
+            try:
+                raw_messages.append(self._reformat_message(raw_message))
+            except KeyError:
+                self.logger.warning(f"Corrupt message data skipped: {raw_message}")
+                corrupted_data_amount += 1
+        return raw_messages, corrupted_data_amount
+
+    def _fetch_raw_messages_sharded(self, duration) -> list:
+        """Fetches live chat messages by splitting the stream into
+        time ranges and fetching them concurrently.
+
+        Args:
+            duration (int): Duration of the stream in seconds.
+
+        Returns:
+            list[dict]: Messages sorted by time without duplicates.
+        """
+
+        shard_ranges = self._get_shard_ranges(duration)
+        self.logger.debug(f"shard_ranges={shard_ranges}")
+
+        shard_messages = [None] * len(shard_ranges)
+        corrupted_data_amount = 0
+        try:
+            with ThreadPoolExecutor(max_workers=len(shard_ranges)) as executor:
+                futures = {
+                    executor.submit(self._fetch_shard, start_time, end_time): i
+                    for i, (start_time, end_time) in enumerate(shard_ranges)
+                }
+                for counter, future in enumerate(as_completed(futures), start=1):
+                    shard_messages[futures[future]], corrupted = future.result()
+                    corrupted_data_amount += corrupted
+                    if self.verbose:
+                        print(
+                            f"Fetching raw messages... {percentage(counter, len(shard_ranges))}%",
+                            end="\r",
+                        )
+        except Exception as e:
+            print(e)
+            self.logger.critical(
+                f"Could not fetch messages: {e.__class__.__name__}:{e}"
+            )
+            raise e
+
+        # shards overlap at their boundaries
+        raw_messages = {}
+        for messages in shard_messages:
+            for message in messages:
+                raw_messages.setdefault(message["message_id"], message)
+        duplicate_amount = sum(len(messages) for messages in shard_messages) - len(raw_messages)
+        raw_messages = sorted(raw_messages.values(), key=lambda msg: msg["time_in_seconds"])
+
+        self.iscomplete = True
+        raw_messages, inconsistent_data_amount = self._enforce_time_consistency(raw_messages)
+
+        if self.verbose:
+            print(f"Fetching raw messages... done")
+
+        self.logger.info(
+            f"{len(raw_messages)} messages fetched from {len(shard_ranges)} shards ({corrupted_data_amount} corrupted, {duplicate_amount} duplicate, {inconsistent_data_amount} inconsistent)"
+        )
+
+        return raw_messages
+
     @staticmethod
     def _reformat_message(message) -> dict:
         """Reformats messages returned from ChatDownloader."""
@@ -246,7 +402,7 @@ class DataCollector:
         limit = current_amount + target_amount - 1 if target_amount else None
 
         for counter, raw_message in enumerate(
-            ChatDownloader().get_chat(yt_url, start_time=start_time),
+            self.downloader().get_chat(yt_url, start_time=start_time),
             start=current_amount,
         ):
             if self.verbose:
@@ -288,10 +444,26 @@ class DataCollector:
         self.logger.info("Getting thumbnail url")
         self.logger.debug(f"res_lvl={res_lvl}")
 
-        res_lvls = ["mqdefault", "hqdefault", "sddefault", "maxresdefault"]
-
         if not 0 <= res_lvl < 4:
             self.logger.warning("res_lvl was out of range, set it to 2")
             res_lvl = 2
 
-        return f"https://i.ytimg.com/vi/{self.id}/{res_lvls[res_lvl]}.jpg"
+        return get_thumbnail_url(self.id, res_lvl)
+
+
+def get_thumbnail_url(id, res_lvl:ImageResolution=ImageResolution.STANDARD) -> str:
+    """Gets URL of the thumbnail image without creating a collector.
+
+    Args:
+        id (str): Video id of the stream.
+        res_lv (ImageResolution, optional): Resolution level of the thumbnail. Defaults to `ImageResolution.STANDARD`.
+
+    Returns:
+        str: URL of the thumbnail image.
+    """
+    res_lvls = ["mqdefault", "hqdefault", "sddefault", "maxresdefault"]
+
+    if not 0 <= res_lvl < 4:
+        res_lvl = 2
+
+    return f"https://i.ytimg.com/vi/{id}/{res_lvls[res_lvl]}.jpg"
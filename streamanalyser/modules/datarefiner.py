@@ -1,52 +1,84 @@
 from . import utils
 from . import loggersetup
-from .structures import Emote, Icon, Membership, Message, Author, Money, Sticker, Superchat, SuperchatColor
+from .structures import Emote, Icon, Membership, Message, MessageTable, Author, Money, Sticker, Superchat, SuperchatColor
 
 
 class DataRefiner:
-    """Refines raw data into a usable form"""
+    """Refines raw data into a usable form.
+
+    Authors and icons are interned: messages from the same author share
+    a single `Author` instance, and icons with the same URL a single `Icon`
+    instance. `saved_object_amount` holds how many objects were reused
+    instead of being created.
+    """
 
     def __init__(self, log_path=None, verbose=False):
         self.verbose = verbose
 
         self.messages = []
         self.authors = []
+        self.saved_object_amount = 0
+        self._interned_authors = {}
+        self._interned_icons = {}
         self.logger = loggersetup.create_logger(__file__, log_path)
 
-    def refine_raw_messages(self, raw_messages, msglimit=None) -> list:
+    def refine_raw_messages(self, raw_messages, msglimit=None, as_table=False):
         """Refines raw messages and shapes them into Message dataclass.
             
             Also gets all unique authors. This behavior was separate as per single responsibility principle
             but now they're merged to improve performance. 
+
+        Args:
+            raw_messages (list[dict]): Raw messages to refine.
+            msglimit (int|None, optional): Message amount to refine. Defaults to None.
+            as_table (bool, optional): Store the messages in a columnar `MessageTable`
+                instead of a list, which takes considerably less memory for long streams.
+                Defaults to False.
+
+        Returns:
+            list[Message]|MessageTable: Refined messages.
         """
 
         self.logger.info("Refining messages")
-        messages = []
         authors = []
         skipped_message_amount = 0
+        initial_saved_object_amount = self.saved_object_amount
         if self.verbose:
             print(f"Refining messagess...0%", end="\r")
-        for count, raw_message in enumerate(raw_messages):
-            if msglimit and count == msglimit:
-                break
-            if self.verbose:
-                print(
-                    f"Refining messages...{utils.percentage(count, msglimit if msglimit else len(raw_messages))}%",
-                    end="\r",
-                )
-            try:
-                convertedMessage = self._convert_message(raw_message)
-                messages.append(convertedMessage)
+
+        def convert_messages():
+            nonlocal skipped_message_amount
+            for count, raw_message in enumerate(raw_messages):
+                if msglimit and count == msglimit:
+                    break
+                if self.verbose:
+                    print(
+                        f"Refining messages...{utils.percentage(count, msglimit if msglimit else len(raw_messages))}%",
+                        end="\r",
+                    )
+                try:
+                    convertedMessage = self._convert_message(raw_message)
+                except ValueError as e:
+                    self.logger.warning(f"{e.__class__.__name__}: {e}")
+                    self.logger.debug(f"Corrupt message was {raw_message}")
+                    skipped_message_amount += 1
+                    continue
+                except Exception as e:
+                    self.logger.error(f"{e.__class__.__name__}:{e}")
+                    skipped_message_amount += 1
+                    continue
                 authors.append(convertedMessage.author)
-            except ValueError as e:
-                self.logger.warning(f"{e.__class__.__name__}: {e}")
-                self.logger.debug(f"Corrupt message was {raw_message}")
-                skipped_message_amount += 1
-            except Exception as e:
-                self.logger.error(f"{e.__class__.__name__}:{e}")
-                skipped_message_amount += 1
+                yield convertedMessage
+
+        if as_table:
+            messages = MessageTable(convert_messages())
+        else:
+            messages = list(convert_messages())
         self.logger.debug(f"{len(messages)} messages has been refined ({skipped_message_amount} skipped)")
         self.logger.debug(f"{len(self.authors)} authors has been found")
+        self.logger.debug(
+            f"Interning saved {self.saved_object_amount-initial_saved_object_amount} objects"
+        )
         if self.verbose:
             print(f"Refining messages... done")
         self.messages = messages
@@ -65,48 +97,12 @@ class DataRefiner:
                 id=emote["id"],
                 name=emote["name"],
                 is_custom_emoji=emote["is_custom_emoji"],
-                images=[Icon(
-                    id=img["id"] if emote["is_custom_emoji"] else "None",
-                    url=img["url"],
-                    height=img["height"] if "height" in img.keys() else 0,
-                    width=img["width"] if "width" in img.keys() else 0,
+                images=[self._intern_icon(
+                    img, id=img["id"] if emote["is_custom_emoji"] else "None"
                 ) for img in emote["images"]],
             ) for emote in raw_message["emotes"]]
 
-        is_member=False
-        membership_info=""
-        membership_icons=[]
-        if "badges" in raw_message["author"].keys():
-            if "icons" in raw_message["author"]["badges"][0].keys():
-                membership_icons = [
-                        Icon(
-                            id=img["id"],
-                            url=img["url"],
-                            height=img["height"] if "height" in img.keys() else 0,
-                            width=img["width"] if "width" in img.keys() else 0,
-                        ) for img in raw_message["author"]["badges"][0]["icons"]]
-            for badge in raw_message["author"]["badges"]:
-                if "member" in badge["title"].lower():
-                    is_member=True
-                    membership_info=badge["title"]
-
-        author=Author(
-            id=raw_message["author"]["id"],
-            name=raw_message["author"]["name"],
-            is_member=is_member,
-            membership_info=membership_info,
-            images={
-                "profile":[
-                    Icon(
-                        id=img["id"],
-                        url=img["url"],
-                        height=img["height"] if "height" in img.keys() else 0,
-                        width=img["width"] if "width" in img.keys() else 0,
-                    ) for img in raw_message["author"]["images"]
-                ],
-                "membership": membership_icons
-            }
-        )
+        author = self._intern_author(raw_message["author"])
         if raw_message.get("message_type") == "text_message":
             return Message(
                 id=raw_message["message_id"],
@@ -164,6 +160,73 @@ class DataRefiner:
         raise ValueError(f"Invalid message type: {raw_message.get('message_type')}")
 
 
+    def _intern_icon(self, img, id=None) -> Icon:
+        """Returns the shared icon of the image url"""
+
+        icon_id = img["id"] if id is None else id
+        key = (img["url"], icon_id)
+        icon = self._interned_icons.get(key)
+        if icon is not None:
+            self.saved_object_amount += 1
+            return icon
+
+        icon = Icon(
+            id=icon_id,
+            url=img["url"],
+            height=img["height"] if "height" in img.keys() else 0,
+            width=img["width"] if "width" in img.keys() else 0,
+        )
+        self._interned_icons[key] = icon
+        return icon
+
+    def _intern_author(self, raw_author) -> Author:
+        """Returns the shared author of the raw author data.
+
+        Authors are keyed by their id along with the fields that
+        might change during a stream (name, images and badges)."""
+
+        badges = raw_author["badges"] if "badges" in raw_author.keys() else []
+        key = (
+            raw_author["id"],
+            raw_author["name"],
+            tuple(img["url"] for img in raw_author["images"]),
+            tuple(badge["title"] for badge in badges),
+        )
+        author = self._interned_authors.get(key)
+        if author is not None:
+            self.saved_object_amount += (
+                1 + len(author.images["profile"]) + len(author.images["membership"])
+            )
+            return author
+
+        is_member=False
+        membership_info=""
+        membership_icons=[]
+        if badges:
+            if "icons" in badges[0].keys():
+                membership_icons = [
+                    self._intern_icon(img) for img in badges[0]["icons"]
+                ]
+            for badge in badges:
+                if "member" in badge["title"].lower():
+                    is_member=True
+                    membership_info=badge["title"]
+
+        author=Author(
+            id=raw_author["id"],
+            name=raw_author["name"],
+            is_member=is_member,
+            membership_info=membership_info,
+            images={
+                "profile":[
+                    self._intern_icon(img) for img in raw_author["images"]
+                ],
+                "membership": membership_icons
+            }
+        )
+        self._interned_authors[key] = author
+        return author
+
     def get_authors(self) -> list:
         """Returns unique list of message authors"""
 
@@ -22,6 +22,12 @@ class StreamIsLiveOrUpcomingError(Exception):
     pass
 
 
+class OfflineModeError(Exception):
+    """Raises when network access is required in offline mode"""
+
+    pass
+
+
 class DuplicateContextException(Exception):
     """Raised when a context is duplicated"""
     def __init__(self, message, encounters:list):
@@ -1,28 +1,69 @@
+import io
 import os
 import json
 import shutil
-import yaml
 import gzip
 import logging
-import requests
 import random
+import numpy as np
+from contextlib import contextmanager
+from itertools import chain
 from shutil import copyfileobj
 from datetime import datetime
 from time import time
 
+from .cacheindex import CacheIndex
+from .filelock import FileLock
+
+# yaml and requests are imported by the methods that use them
+
 FH_DIR_PATH = os.path.dirname(os.path.realpath(__file__))
 CONTEXT_PATH = os.path.join(FH_DIR_PATH, "..", "data", "default_contexts.json")
 
 
+class _LimitedReader(io.RawIOBase):
+    """Reads a binary file up to a byte offset"""
+
+    def __init__(self, file, end):
+        self.file = file
+        self.remaining = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.file.read(min(len(buffer), self.remaining))
+        buffer[: len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
 class FileHandler:
     """A class to manage cache and log files.
 
+    Cache folders of streams can be shared by multiple processes. Every
+    cache file is written to a temporary file and renamed, writers hold
+    an exclusive lock on the `.lock` file of the stream and readers hold
+    a shared one, so readers never see partially written files. Reading
+    never modifies the cache. Lock files are kept outside the cache
+    folders, so that a folder can be deleted while its lock is held.
+
     Folder structure:
     Storage/
         Cache/
+            index.sqlite3
+            contexts.pickle
             Exampleid/
                 messages.json.gz
+                manifest.json
                 metadata.yaml
+                video_info.yaml
+                analysis-<hash>.json
+                tokens.npz
+                ...
+            ...
+        Locks/
+            Exampleid.lock
             ...
         Logs/
         Exports/
@@ -34,21 +75,38 @@ class FileHandler:
         cache_fname="Cache",
         log_fname="Logs",
         export_fname="Exports",
+        locks_fname="Locks",
         message_fname="messages.json",
+        manifest_fname="manifest.json",
         metadata_fname="metadata.yaml",
+        video_info_fname="video_info.yaml",
+        analysis_fname_prefix="analysis-",
         thumbnail_fname="thumbnail.png",
         graph_fname="graph.png",
         wordcloud_fname="wordcloud.jpg",
+        index_fname="index.sqlite3",
+        lock_fname=".lock",
+        contexts_fname="contexts.pickle",
+        tokens_fname="tokens.npz",
     ):
         self.storage_path = storage_path
         self.cache_path = os.path.join(self.storage_path, cache_fname)
         self.log_path = os.path.join(self.storage_path, log_fname)
         self.export_path = os.path.join(self.storage_path, export_fname)
+        self.locks_path = os.path.join(self.storage_path, locks_fname)
         self.message_fname = message_fname
+        self.manifest_fname = manifest_fname
         self.metadata_fname = metadata_fname
+        self.video_info_fname = video_info_fname
+        self.analysis_fname_prefix = analysis_fname_prefix
         self.thumbnail_fname = thumbnail_fname
         self.graph_fname = graph_fname
         self.wordcloud_fname = wordcloud_fname
+        self.index_path = os.path.join(self.cache_path, index_fname)
+        self.contexts_path = os.path.join(self.cache_path, contexts_fname)
+        self._index = None
+        self.lock_fname = lock_fname
+        self.tokens_fname = tokens_fname
 
         # create_logger is seperately implemented to prevent circular imports
         self.logger = self._create_logger(__file__)
@@ -101,6 +159,8 @@ class FileHandler:
             self.logger.critical(f"Could not remove {path} - {e.__class__.__name__}:{e}")
 
     def delete_dir(self, path):
+        if os.path.dirname(os.path.normpath(path)) == os.path.normpath(self.cache_path):
+            self.index.remove(os.path.basename(os.path.normpath(path)))
         try:
             shutil.rmtree(path)
             self.logger.debug(f"{path} folder removed")
@@ -114,7 +174,7 @@ class FileHandler:
     def create_dir_if_not_exists(self, path):
         if not os.path.exists(path):
             try:
-                os.makedirs(path)
+                os.makedirs(path, exist_ok=True)
                 self.logger.debug(f"'{path}' created")
             except PermissionError as e:
                 print(
@@ -125,30 +185,319 @@ class FileHandler:
     def create_cache_dir(self, stream_id):
         self.sid_path = os.path.join(self.cache_path, stream_id)
         self.create_dir_if_not_exists(self.sid_path)
+        self.index.update(stream_id, touch=False)
+
+    def lock(self, sid_path=None, shared=False) -> FileLock:
+        """Returns the lock of a stream's cache folder.
+
+        Args:
+            sid_path (str|None, optional): Path to the cache files
+                of a stream. Defaults to None, which sets the path to
+                the current stream id.
+            shared (bool, optional): Return a shared lock for reading
+                instead of an exclusive lock for writing. Defaults to False.
+        """
+        sid_path = sid_path or self.sid_path
+        if not shared:
+            # the folder might have been evicted by another process
+            self.create_dir_if_not_exists(sid_path)
+        # lock files are never deleted, otherwise a process waiting on a
+        # deleted lock file and a process locking a new one could both
+        # think they hold the lock
+        self.create_dir_if_not_exists(self.locks_path)
+        return FileLock(
+            os.path.join(self.locks_path, os.path.basename(sid_path) + self.lock_fname),
+            shared=shared,
+        )
+
+    @contextmanager
+    def _atomic_open(self, fpath, mode="w", opener=open, **kwargs):
+        """Opens a temporary file to write, which replaces the
+        file only if writing succeeds."""
+        tmp_path = f"{fpath}.{os.getpid()}.tmp"
+        try:
+            with opener(tmp_path, mode, **kwargs) as f:
+                yield f
+            os.replace(tmp_path, fpath)
+        except BaseException:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @property
+    def index(self) -> CacheIndex:
+        """Index of the cached streams. Built from the cache
+        folder if it doesn't exist yet, otherwise reconciled with
+        the cache folders when it's opened."""
+        if self._index is None:
+            self.create_dir_if_not_exists(self.cache_path)
+            is_new = not os.path.isfile(self.index_path)
+            self._index = CacheIndex(self.index_path)
+            if is_new:
+                self.rebuild_index()
+            else:
+                self.reconcile_index()
+        return self._index
+
+    def rebuild_index(self):
+        """Rebuilds the cache index by walking the cache folder"""
+
+        self.logger.info("Rebuilding cache index")
+        self.index.clear()
+        for sid in self.get_foldernames(self.cache_path):
+            self._index_folder(sid)
+        self.logger.debug(f"Indexed {len(self.index)} streams")
+
+    def reconcile_index(self):
+        """Indexes the cache folders that are missing from the cache
+        index, and removes the streams whose folders don't exist,
+        e.g. when folders are copied or deleted by hand."""
+
+        sids = set(self.get_foldernames(self.cache_path))
+        indexed_sids = set(self.index.ids())
+        missing_sids = sids - indexed_sids
+        stale_sids = indexed_sids - sids
+        for sid in missing_sids:
+            self._index_folder(sid)
+        if stale_sids:
+            self.index.remove(*stale_sids)
+        if missing_sids or stale_sids:
+            self.logger.info(
+                f"Reconciled cache index: indexed {len(missing_sids)} streams, "
+                f"removed {len(stale_sids)} streams"
+            )
+
+    def _index_folder(self, sid):
+        """Indexes a cache folder with the values read from the disk"""
+
+        sid_path = os.path.join(self.cache_path, sid)
+        values = self._index_values(sid_path)
+        message_path = os.path.join(sid_path, self.message_fname + ".gz")
+        self.index.update(
+            sid,
+            touch=False,
+            created=os.path.getctime(sid_path),
+            last_used=os.path.getmtime(
+                message_path if os.path.isfile(message_path) else sid_path
+            ),
+            **values,
+        )
+
+    def _folder_size(self, sid_path) -> int:
+        """Returns the total size of the files in a cache folder"""
 
-    def cache_messages(self, message_dict):
+        return sum(
+            entry.stat().st_size for entry in os.scandir(sid_path) if entry.is_file()
+        )
+
+    def _index_values(self, sid_path) -> dict:
+        """Returns the values of a cache folder to index"""
+
+        values = {"size": self._folder_size(sid_path)}
+        if os.path.isfile(os.path.join(sid_path, self.message_fname + ".gz")):
+            manifest = self.read_manifest(sid_path)
+            if manifest is None:
+                manifest = self._get_manifest(sid_path)
+            values["message_count"] = sum(segment["count"] for segment in manifest["segments"])
+        if os.path.isfile(os.path.join(sid_path, self.metadata_fname)):
+            metadata = self.read_metadata(sid_path) or {}
+            values["complete"] = metadata.get("is-complete", False)
+        return values
+
+    def _update_index(self, **values):
+        """Updates the index entry of the current stream"""
+        sid = os.path.basename(self.sid_path)
+        self.index.update(sid, **values)
+
+    def cache_messages(self, messages):
+        """Caches raw messages as gzipped JSON Lines, one message per line.
+        Overwrites the existing message cache.
+
+        Args:
+            messages (Iterable[dict]): Raw messages to cache.
+        """
         self.logger.info("Caching messages")
-        fpath = os.path.join(self.sid_path, self.message_fname)
+        with self.lock():
+            self._write_message_segment(messages, mode="wt", segments=[])
+
+    def append_messages(self, messages):
+        """Appends raw messages to the message cache as a new segment
+        without rewriting the existing messages.
+
+        Args:
+            messages (Iterable[dict]): Raw messages to append.
+        """
+        self.logger.info("Appending messages")
+        with self.lock():
+            manifest = self.read_manifest()
+            if manifest is None:
+                # caches that were written before manifests existed
+                # might be in the legacy format, so they are rewritten once
+                self.logger.debug("Message cache has no manifest, rewriting")
+                self._write_message_segment(
+                    list(self.iter_messages(touch=False)), mode="wt", segments=[]
+                )
+                manifest = self.read_manifest()
+            self._write_message_segment(
+                messages, mode="at", segments=manifest["segments"]
+            )
+
+    def _write_message_segment(self, messages, mode, segments):
+        """Writes messages as a gzip member and records it in the manifest.
+        Helper function for `cache_messages` and `append_messages`, the
+        exclusive lock must be held by the caller.
+
+        The manifest is the commit point of the message cache. Rewrites
+        replace the message file before the manifest, and appends are
+        recorded with the byte size of the file after the segment, so
+        that an interrupted append can be cut off before the next one.
+        """
+
+        fpath = os.path.join(self.sid_path, self.message_fname + ".gz")
+        manifest_path = os.path.join(self.sid_path, self.manifest_fname)
+        count = 0
+        last_time = None
+
+        def write(f):
+            nonlocal count, last_time
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False) + "\n")
+                count += 1
+                last_time = message.get("time_in_seconds", last_time)
+
         try:
-            with open(fpath, "w+", encoding="utf-8") as f:
-                f.write(json.dumps(message_dict, ensure_ascii=False, indent=4))
+            if mode == "wt":
+                with self._atomic_open(fpath, mode, opener=gzip.open, encoding="utf-8") as f:
+                    write(f)
+                    # the old manifest doesn't match the new messages
+                    if os.path.isfile(manifest_path):
+                        os.remove(manifest_path)
+            else:
+                end = segments[-1].get("end") if segments else None
+                if end is not None and os.path.getsize(fpath) > end:
+                    self.logger.warning("Cutting off an interrupted append")
+                    os.truncate(fpath, end)
+                with gzip.open(fpath, mode, encoding="utf-8") as f:
+                    write(f)
         except Exception as e:
-            self.delete_file(fpath)
             raise RuntimeError(f"Could not cache messages: {e.__class__.__name__}:{e}")
 
-        self._compress_file(fpath)
+        segments = segments + [
+            {"count": count, "last_time": last_time, "end": os.path.getsize(fpath)}
+        ]
+        self._write_manifest({"segments": segments})
+        # analysis results and tokens of the previous messages are no longer valid
+        self.clear_analyses()
+        tokens_path = os.path.join(self.sid_path, self.tokens_fname)
+        if os.path.isfile(tokens_path):
+            self.delete_file(tokens_path)
+        self._update_index(
+            size=self._folder_size(self.sid_path),
+            message_count=sum(segment["count"] for segment in segments),
+        )
+        self.logger.debug(f"Cached a segment of {count} messages")
+
+    def _write_manifest(self, manifest, sid_path=None):
+        fpath = os.path.join(sid_path or self.sid_path, self.manifest_fname)
+        with self._atomic_open(fpath, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+    def read_manifest(self, sid_path=None):
+        """Reads the manifest of the message cache.
+
+        Args:
+            sid_path (str|None, optional): Path to the cache files
+                of a stream. Defaults to None, which sets the path to
+                the current stream id.
+
+        Returns:
+            dict|None: Manifest with the message count and the last
+            message time of each cached segment, or None if the
+            cache has no manifest.
+        """
+        fpath = os.path.join(sid_path or self.sid_path, self.manifest_fname)
+        try:
+            with open(fpath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _get_manifest(self, sid_path=None):
+        """Returns the manifest, building it from the messages if the
+        cache does not have one yet. The built manifest is not written,
+        since the cache might be in the legacy format, which has to be
+        rewritten by the next append before a manifest can be used."""
+        with self.lock(sid_path, shared=True):
+            manifest = self.read_manifest(sid_path)
+            if manifest is None:
+                self.logger.debug("Building missing manifest")
+                count = 0
+                last_time = None
+                for message in self.iter_messages(sid_path, touch=False):
+                    count += 1
+                    last_time = message.get("time_in_seconds", last_time)
+                manifest = {"segments": [{"count": count, "last_time": last_time}]}
+        return manifest
+
+    def message_cache_key(self) -> str:
+        """Returns a key that changes whenever the message cache changes.
+
+        Caches without a manifest are keyed by the size and modification
+        time of the message file instead of reading every message. They
+        get a manifest, hence a new key, when they're rewritten by the
+        next append.
+
+        Raises:
+            FileNotFoundError: If messages are not cached.
+        """
+        with self.lock(shared=True):
+            manifest = self.read_manifest()
+            if manifest is not None:
+                return json.dumps(manifest["segments"], sort_keys=True)
+            stat = os.stat(os.path.join(self.sid_path, self.message_fname + ".gz"))
+        return json.dumps({"size": stat.st_size, "mtime": stat.st_mtime_ns})
+
+    def cached_message_amount(self) -> int:
+        """Returns the amount of cached messages without reading them"""
+        return sum(segment["count"] for segment in self._get_manifest()["segments"])
+
+    def last_message_time(self):
+        """Returns time of the last cached message without reading
+        the messages, or None if there are no cached messages"""
+        for segment in reversed(self._get_manifest()["segments"]):
+            if segment["last_time"] is not None:
+                return segment["last_time"]
+        return None
 
     def cache_metadata(self, metadata_dict):
+        import yaml
+
         self.logger.info("Caching metadata")
         fpath = os.path.join(self.sid_path, self.metadata_fname)
         try:
-            with open(fpath, "w+", encoding="utf-8") as file:
+            with self.lock(), self._atomic_open(fpath, "w", encoding="utf-8") as file:
                 yaml.dump(
                     metadata_dict, file, default_flow_style=False, allow_unicode=True
                 )
         except Exception as e:
-            self.delete_file(fpath)
             raise RuntimeError(f"Could not cache metadata: {e.__class__.__name__}:{e}")
+        self._update_index(
+            size=self._folder_size(self.sid_path),
+            complete=metadata_dict.get("is-complete", False),
+        )
+
+    def cache_video_info(self, video_info):
+        import yaml
+
+        self.logger.info("Caching video info")
+        fpath = os.path.join(self.sid_path, self.video_info_fname)
+        try:
+            with self.lock(), self._atomic_open(fpath, "w", encoding="utf-8") as file:
+                yaml.dump(
+                    video_info, file, default_flow_style=False, allow_unicode=True
+                )
+        except Exception as e:
+            raise RuntimeError(f"Could not cache video info: {e.__class__.__name__}:{e}")
 
     def cache_thumbnail(self, url):
         """Alias for `download_thumbnail`"""
@@ -156,43 +505,221 @@ class FileHandler:
 
     def download_thumbnail(self, url, destination):
         self.logger.info("Downloading thumbnail")
+        import requests
+
         try:
             response = requests.get(url)
-            with open(destination, "wb") as f:
+            with self._atomic_open(destination, "wb") as f:
                 f.write(response.content)
         except Exception as e:
-            self.delete_file(destination)
             raise RuntimeError(
                 f"Could not download thumbnail: {e.__class__.__name__}:{e}"
             )
 
+    def iter_messages(self, sid_path=None, touch=True):
+        """Lazily reads cached messages one by one without decompressing
+        the cache to the disk. Caches in the legacy format, which is
+        a single JSON array, are read transparently.
+
+        Args:
+            sid_path (str|None, optional): Path to the cache files
+                of a stream. Defaults to None, which sets the path to
+                the current stream id.
+            touch (bool, optional): Mark the stream as used in the cache
+                index. Defaults to True.
+
+        Yields:
+            dict: Raw message.
+        """
+        sid_path = sid_path or self.sid_path
+        fpath = os.path.join(sid_path, self.message_fname + ".gz")
+        if touch:
+            self.index.update(os.path.basename(sid_path))
+        with self.lock(sid_path, shared=True), self._open_message_cache(sid_path) as f:
+            first_line = f.readline()
+            if first_line.lstrip().startswith("["):
+                self.logger.debug("Reading messages in legacy format")
+                yield from json.loads(first_line + f.read())
+                return
+            if first_line.strip():
+                yield json.loads(first_line)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    @contextmanager
+    def _open_message_cache(self, sid_path=None):
+        """Opens the message cache to read as text. The shared lock must
+        be held by the caller.
+
+        Reading stops at the end of the last segment in the manifest,
+        so the partial segment of an interrupted append, which is only
+        cut off by the next append, is never read.
+        """
+        sid_path = sid_path or self.sid_path
+        manifest = self.read_manifest(sid_path)
+        end = None
+        if manifest and manifest["segments"]:
+            end = manifest["segments"][-1].get("end")
+        with open(os.path.join(sid_path, self.message_fname + ".gz"), "rb") as f:
+            fileobj = f if end is None else _LimitedReader(f, end)
+            with gzip.open(fileobj, "rt", encoding="utf-8") as text:
+                yield text
+
     def read_messages(self):
         """Reads cached messages.
-        Returns a dict."""
-        fpath = os.path.join(self.sid_path, self.message_fname)
-        self._decompress_file(fpath)
-        with open(fpath, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        Returns a list of dicts."""
+        data = list(self.iter_messages())
         self.logger.info("Read messages")
-        self._compress_file(fpath)
         return data
 
-    def read_metadata(self):
-        """Reads cached messages.
+    def export_messages(self, target_path):
+        """Exports the decompressed message cache to the target folder
+        as a JSON array, one message per line.
+
+        Args:
+            target_path (str): Folder to export the messages into.
+        """
+        with self.lock(shared=True), self._open_message_cache() as f_in, open(
+            os.path.join(target_path, self.message_fname), "w", encoding="utf-8"
+        ) as f_out:
+            first_line = f_in.readline()
+            if first_line.lstrip().startswith("["):
+                # legacy caches are already a JSON array
+                f_out.write(first_line)
+                copyfileobj(f_in, f_out)
+            else:
+                # lines are copied as they are instead of being parsed
+                f_out.write("[")
+                separator = "\n"
+                for line in chain((first_line,), f_in):
+                    line = line.strip()
+                    if line:
+                        f_out.write(separator + line)
+                        separator = ",\n"
+                f_out.write("\n]\n")
+        self.logger.info(f"Exported messages to {target_path}")
+
+    def read_metadata(self, sid_path=None):
+        """Reads cached metadata.
         Returns a dict."""
-        fpath = os.path.join(self.sid_path, self.metadata_fname)
+        import yaml
+
+        fpath = os.path.join(sid_path or self.sid_path, self.metadata_fname)
         self.logger.info("Read metadata")
-        return yaml.load(open(fpath, "r", encoding="utf-8"), Loader=yaml.Loader)
+        with self.lock(sid_path, shared=True), open(fpath, "r", encoding="utf-8") as f:
+            return yaml.load(f, Loader=yaml.Loader)
+
+    def _is_analysis_file(self, fname) -> bool:
+        return fname.startswith(self.analysis_fname_prefix) and fname.endswith(".json")
+
+    def _analysis_path(self, key):
+        return os.path.join(self.sid_path, f"{self.analysis_fname_prefix}{key}.json")
+
+    def cache_analysis(self, key, analysis):
+        """Caches analysis results.
+
+        Args:
+            key (str): Hash of everything the analysis depends on.
+            analysis (dict): Analysis results.
+        """
+        self.logger.info("Caching analysis")
+        fpath = self._analysis_path(key)
+        try:
+            with self.lock(), self._atomic_open(fpath, "w", encoding="utf-8") as f:
+                json.dump(analysis, f, ensure_ascii=False)
+        except Exception as e:
+            raise RuntimeError(f"Could not cache analysis: {e.__class__.__name__}:{e}")
+        self._update_index(size=self._folder_size(self.sid_path))
+
+    def read_analysis(self, key):
+        """Reads cached analysis results.
+
+        Args:
+            key (str): Hash of everything the analysis depends on.
+
+        Returns:
+            dict|None: Analysis results, or None if they are not cached.
+        """
+        fpath = self._analysis_path(key)
+        self._update_index()
+        try:
+            with self.lock(shared=True), open(fpath, "r", encoding="utf-8") as f:
+                analysis = json.load(f)
+        except FileNotFoundError:
+            return None
+        self.logger.info("Read analysis")
+        return analysis
+
+    def cache_tokens(self, arrays):
+        """Caches the token store of the stream.
+
+        Args:
+            arrays (dict[str, np.ndarray]): Arrays of the token store.
+        """
+        self.logger.info("Caching tokens")
+        fpath = os.path.join(self.sid_path, self.tokens_fname)
+        try:
+            with self.lock(), self._atomic_open(fpath, "wb") as f:
+                np.savez(f, **arrays)
+        except Exception as e:
+            raise RuntimeError(f"Could not cache tokens: {e.__class__.__name__}:{e}")
+        self._update_index(size=self._folder_size(self.sid_path))
+
+    def read_tokens(self):
+        """Reads the cached token store of the stream.
+
+        Returns:
+            dict[str, np.ndarray]|None: Arrays of the token store, or None
+            if they are not cached.
+        """
+        fpath = os.path.join(self.sid_path, self.tokens_fname)
+        try:
+            with self.lock(shared=True), np.load(fpath) as arrays:
+                arrays = dict(arrays)
+        except FileNotFoundError:
+            return None
+        self.logger.info("Read tokens")
+        return arrays
+
+    def clear_analyses(self, sid_path=None):
+        """Deletes cached analysis results of a stream"""
+        sid_path = sid_path or self.sid_path
+        with self.lock(sid_path):
+            for fname in os.listdir(sid_path):
+                if self._is_analysis_file(fname):
+                    self.delete_file(os.path.join(sid_path, fname))
+
+    def read_video_info(self, sid_path=None):
+        """Reads cached video info.
+
+        Args:
+            sid_path (str|None, optional): Path to the cache files
+                of a stream. Defaults to None, which sets the path to
+                the current stream id.
+
+        Returns:
+            dict|None: Video info, or None if it is not cached.
+        """
+        import yaml
+
+        fpath = os.path.join(sid_path or self.sid_path, self.video_info_fname)
+        try:
+            with self.lock(sid_path, shared=True), open(fpath, "r", encoding="utf-8") as f:
+                video_info = yaml.load(f, Loader=yaml.Loader)
+        except FileNotFoundError:
+            return None
+        self.logger.info("Read video info")
+        return video_info
 
     def _compress_file(self, jsonpath):
         """Compresses a json file with gzip"""
         try:
             with open(jsonpath, "rb") as f_in:
-                with gzip.open(jsonpath + ".gz", "wb") as f_out:
+                with self._atomic_open(jsonpath + ".gz", "wb", opener=gzip.open) as f_out:
                     copyfileobj(f_in, f_out)
             os.remove(jsonpath)
         except Exception as e:
-            os.remove(jsonpath + ".gz")
             self.logger.critical(e)
             raise e
         self.logger.info(f"{jsonpath} compressed")
@@ -224,6 +751,8 @@ class FileHandler:
                         used cache.
                     - fifo: Deletes oldest cache.
                     - rr: Deletes random cache. (uhh...)
+                    - gds (GreedyDual-Size): Deletes cache with the
+                        lowest `recency / size` priority.
                 If set to None, deletes cache of the current session.
                 Defaults to None.
 
@@ -237,23 +766,130 @@ class FileHandler:
 
         if cache_deletion_algorithm:
             dir_to_delete = self._get_cache_dir_to_delete(cache_deletion_algorithm)
+            if dir_to_delete is None:
+                self.logger.warning("There is no cache folder to delete")
+                return
             path = os.path.join(self.cache_path, dir_to_delete)
+            lock = self._try_lock(dir_to_delete)
+            if lock is None:
+                self.logger.warning(f"Cache folder is in use: '{path}'")
+                return
             try:
-                shutil.rmtree(path)
-                self.logger.debug(f"Deleted cache folder: '{self.sid_path}'")
-                if not delete_root_folder:
-                    os.makedirs(path)
-            except Exception as e:
-                self.logger.error("Could not delete cache folder:", e)
+                if self._delete_cache_dir(dir_to_delete, evicted=True):
+                    if not delete_root_folder:
+                        os.makedirs(path)
+                        self.index.update(dir_to_delete, touch=False)
+            finally:
+                lock.release()
         else:
             if self.sid_path:
-                try:
-                    shutil.rmtree(self.sid_path)
-                    self.logger.debug(f"Deleted cache folder: '{self.sid_path}'")
-                    if not delete_root_folder:
+                sid = os.path.basename(self.sid_path)
+                with self.lock():
+                    if self._delete_cache_dir(sid) and not delete_root_folder:
                         os.makedirs(self.sid_path)
-                except Exception as e:
-                    self.logger.error("Could not delete cache folder:", e)
+                        self.index.update(sid, touch=False)
+
+    def _delete_cache_dir(self, sid, evicted=False) -> bool:
+        """Deletes the cache folder of a stream and removes it from
+        the index. The stream stays in the index if the folder could not
+        be deleted. The caller should hold the exclusive lock of the stream.
+
+        Args:
+            sid (str): Stream id.
+            evicted (bool, optional): The stream is deleted by a deletion
+                algorithm. Defaults to False.
+
+        Returns:
+            bool: If the folder is deleted.
+        """
+        path = os.path.join(self.cache_path, sid)
+        try:
+            shutil.rmtree(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.error(f"Could not delete cache folder: {e}")
+            return False
+        self.index.remove(sid, evicted=evicted)
+        self.logger.debug(f"Deleted cache folder: '{path}'")
+        return True
+
+    def enforce_cache_limits(
+        self, max_bytes=None, max_amount=None, cache_deletion_algorithm="lru"
+    ) -> list:
+        """Deletes cached streams until the cache fits in the limits.
+        Cache of the current stream is never deleted, and streams that
+        other processes are using are skipped in favor of the next ones.
+
+        Args:
+            max_bytes (int|None, optional): Total cache size to keep
+                in bytes. Defaults to None.
+            max_amount (int|None, optional): Cached stream amount to
+                keep. Defaults to None.
+            cache_deletion_algorithm (str, optional): Algorithm that
+                decides which streams to delete first. See `clear_cache`
+                for options. Defaults to 'lru'.
+
+        Raises:
+            ValueError: If the cache deletion algorithm is not supported.
+
+        Returns:
+            list[str]: Deleted stream ids.
+        """
+
+        evicted = []
+        skipped = []
+        current_sid = self._current_sid()
+        while True:
+            try:
+                victims = self.index.victims(
+                    cache_deletion_algorithm,
+                    max_bytes=max_bytes,
+                    max_amount=max_amount,
+                    exclude=[sid for sid in [current_sid, *skipped] if sid],
+                )
+            except ValueError as e:
+                self.logger.error(e)
+                raise
+            if not victims:
+                break
+
+            # streams that other processes are using or that could not be
+            # deleted are skipped, the index picks other victims next time
+            deleted = []
+            for sid in victims:
+                lock = self._try_lock(sid)
+                if lock is None:
+                    skipped.append(sid)
+                    continue
+                try:
+                    if self._delete_cache_dir(sid, evicted=True):
+                        deleted.append(sid)
+                    else:
+                        skipped.append(sid)
+                finally:
+                    lock.release()
+            self.logger.debug(f"Evicted ids: {deleted}")
+            evicted.extend(deleted)
+            if len(deleted) == len(victims):
+                break
+
+        if skipped:
+            self.logger.warning(
+                f"Skipped {len(skipped)} cached streams that are in use or could not be deleted"
+            )
+        if self.index.victims(
+            cache_deletion_algorithm, max_bytes=max_bytes, max_amount=max_amount
+        ):
+            self.logger.warning("Cache exceeds the limits since the remaining streams are in use")
+        self.logger.info(f"Evicted {len(evicted)} cached streams")
+        return evicted
+
+    def _try_lock(self, sid):
+        """Acquires the exclusive lock of a cached stream without waiting.
+        Returns the lock, or None if another process holds it."""
+        lock = self.lock(os.path.join(self.cache_path, sid))
+        return lock if lock.acquire(blocking=False) else None
 
     def _get_cache_dir_to_delete(self, cache_deletion_algorithm:str) -> str:
         """Returns the directory to delete according to the cache
@@ -268,23 +904,29 @@ class FileHandler:
                         used cache.
                     - fifo: Deletes oldest cache.
                     - rr: Deletes random cache. (uhh...)
+                    - gds (GreedyDual-Size): Deletes cache with the
+                        lowest `recency / size` priority.
 
         Raises:
             ValueError: If the cache deletion algorithm is not supported.
 
         Returns:
-            str: Path of the directory to delete according to
-            the cache deletion algorithm.
+            str|None: Name of the directory to delete according to
+            the cache deletion algorithm, or None if there is none.
         """
         
         if cache_deletion_algorithm == "mru":
-            return self.most_recently_used_folder(self.cache_path)
+            return self.most_recently_used_folder()
         elif cache_deletion_algorithm == "lru":
-            return self.least_recently_used_folder(self.cache_path)
+            return self.least_recently_used_folder()
         elif cache_deletion_algorithm == "fifo":
-            return self.oldest_folder(self.cache_path)
+            return self.oldest_folder()
         elif cache_deletion_algorithm == "rr":
-            return self.random_folder(self.cache_path)
+            return self.random_folder()
+        elif cache_deletion_algorithm == "gds":
+            sid = self.index.first("gds", self._current_sid())
+            self.logger.debug(f"Lowest priority id: {sid}")
+            return sid
     
         self.logger.error(
             "Invalid deletion algorithm: {}".format(cache_deletion_algorithm)
@@ -296,6 +938,7 @@ class FileHandler:
     def check_integrity(self, cache_path=None, autofix=False) -> tuple[list, list]:
         """Checks integrity of the cached files.
         Note that it detects files by their names, not content.
+        Folders that other processes are using are not fixed.
 
         Args:
             cache_path (str|None, optional): Path to the cache files
@@ -323,33 +966,60 @@ class FileHandler:
             self.message_fname + ".gz",
             self.metadata_fname,
         ]
-        unnecesary_files = list(set(files) - set(necessary_files))
+        optional_files = [
+            self.manifest_fname,
+            self.video_info_fname,
+            # older versions kept the lock file in the cache folder
+            self.lock_fname,
+            self.tokens_fname,
+        ]
+        optional_files.extend(fname for fname in files if self._is_analysis_file(fname))
+        unnecesary_files = list(set(files) - set(necessary_files) - set(optional_files))
         missing_files = list(set(necessary_files) - set(files))
 
         self.logger.debug(f"unnecesary_files={unnecesary_files}")
         self.logger.debug(f"missing_files={missing_files}")
 
         if autofix:
-            for folder in os.listdir(self.cache_path):
+            for folder in self.get_foldernames(self.cache_path):
                 full_path = os.path.join(self.cache_path, folder)
-                try:
-                    for _, _, files in os.walk(full_path):
-                        pass
-                    if os.stat(full_path).st_size == 0 and len(files) == 0:
-                        self.delete_dir(full_path)
-                except AttributeError:
+                if set(os.listdir(full_path)) - {self.lock_fname}:
                     continue
-            for file in unnecesary_files:
-                # it might be a json file that is not compressed
-                if file == self.message_fname:
-                    self._compress_file(os.path.join(cache_path, file))
-                    missing_files.remove(file + ".gz")
+                lock = self._try_lock(folder)
+                if lock is None:
                     continue
-                self.delete_file(os.path.join(cache_path, file))
+                try:
+                    self.delete_dir(full_path)
+                finally:
+                    lock.release()
+
+            lock = self.lock(cache_path)
+            if not lock.acquire(blocking=False):
+                self.logger.warning(f"Could not fix {cache_path} since it is in use")
+                return missing_files, unnecesary_files
+            try:
+                self._fix_files(cache_path, missing_files, unnecesary_files)
+            finally:
+                lock.release()
             unnecesary_files = []
 
         return missing_files, unnecesary_files
 
+    def _fix_files(self, cache_path, missing_files, unnecesary_files):
+        """Deletes unnecessary files and compresses uncompressed messages.
+        Helper function for `check_integrity`."""
+        for file in unnecesary_files:
+            # it might be a json file that is not compressed
+            if file == self.message_fname:
+                self._compress_file(os.path.join(cache_path, file))
+                missing_files.remove(file + ".gz")
+                # the manifest might not match the recovered messages
+                manifest_path = os.path.join(cache_path, self.manifest_fname)
+                if os.path.isfile(manifest_path):
+                    self.delete_file(manifest_path)
+                continue
+            self.delete_file(os.path.join(cache_path, file))
+
     def get_filenames(self, path, show_extension=False):
         """Returns file names in a path"""
 
@@ -402,109 +1072,55 @@ class FileHandler:
         return len(files)
 
     def dir_amount(self, folder_path) -> int:
-        """Returns folder amount in a folder"""
+        """Returns folder amount in a folder. Folders in the cache
+        path are counted from the cache index."""
 
-        _, dirs, _ = next(os.walk(folder_path))
-        self.logger.debug(f"Folder amount in {folder_path} is {len(dirs)}")
-        return len(dirs)
+        if os.path.normpath(folder_path) == os.path.normpath(self.cache_path):
+            amount = len(self.index)
+        else:
+            _, dirs, _ = next(os.walk(folder_path))
+            amount = len(dirs)
+        self.logger.debug(f"Folder amount in {folder_path} is {amount}")
+        return amount
 
-    def least_recently_used_folder(self, fpath) -> str:
-        """Returns least recenty used folder in path
-        by checking last access time of the
-        message file inside the folder"""
+    def _current_sid(self):
+        return os.path.basename(self.sid_path) if self.sid_path else None
 
-        least_recently_used_folder = None
-        last_access_time = time()
+    def least_recently_used_folder(self, fpath=None) -> str:
+        """Returns least recenty used folder in the cache
+        path except the current one. `fpath` is unused and
+        only kept for compatibility."""
 
-        for root, dirs, _ in os.walk(fpath):
-            for dname in dirs:
-                if os.path.join(root, dname) == self.sid_path:
-                    continue
-                try:
-                    path = os.path.join(root, dname, self.message_fname + ".gz")
-                except:
-                    try:
-                        self.check_integrity(
-                            cache_path=os.path.join(root, dname), autofix=True
-                        )
-                        path = os.path.join(root, dname, self.message_fname + ".gz")
-                    except:
-                        msg = "Message cache couldn't be found"
-                        self.logger.error(msg)
-                        raise Exception(msg)
-                if os.path.getatime(path) < last_access_time:
-                    last_access_time = os.path.getatime(path)
-                    least_recently_used_folder = dname
-        self.logger.debug(
-            "Least recently used id: {} ({})".format(
-                least_recently_used_folder, last_access_time
-            )
-        )
+        least_recently_used_folder = self.index.least_recently_used(self._current_sid())
+        self.logger.debug(f"Least recently used id: {least_recently_used_folder}")
         return least_recently_used_folder
 
-    def most_recently_used_folder(self, fpath) -> str:
-        """Returns most recenty used folder in path
-        by checking last access time of the
-        message file inside the folder"""
-
-        most_recently_used_folder = None
-        last_access_time = 0
+    def most_recently_used_folder(self, fpath=None) -> str:
+        """Returns most recenty used folder in the cache
+        path except the current one. `fpath` is unused and
+        only kept for compatibility."""
 
-        for root, dirs, _ in os.walk(fpath):
-            for dname in dirs:
-                if os.path.join(root, dname) == self.sid_path:
-                    continue
-                try:
-                    path = os.path.join(root, dname, self.message_fname + ".gz")
-                except:
-                    try:
-                        self.check_integrity(
-                            cache_path=os.path.join(root, dname), autofix=True
-                        )
-                        path = os.path.join(root, dname, self.message_fname + ".gz")
-                    except:
-                        msg = "Message cache couldn't be found"
-                        self.logger.error(msg)
-                        raise Exception(msg)
-                if os.path.getatime(path) > last_access_time:
-                    last_access_time = os.path.getatime(path)
-                    most_recently_used_folder = dname
-        self.logger.debug(
-            "Most recently used id: {} ({})".format(
-                most_recently_used_folder, last_access_time
-            )
-        )
+        most_recently_used_folder = self.index.most_recently_used(self._current_sid())
+        self.logger.debug(f"Most recently used id: {most_recently_used_folder}")
         return most_recently_used_folder
 
-    def oldest_folder(self, fpath) -> str:
-        """Returns oldest folder in path"""
-
-        oldest_folder = None
-        creation_time = time()
+    def oldest_folder(self, fpath=None) -> str:
+        """Returns oldest folder in the cache path except
+        the current one. `fpath` is unused and only kept
+        for compatibility."""
 
-        for root, dirs, _ in os.walk(fpath):
-            for dname in dirs:
-                if os.path.join(root, dname) == self.sid_path:
-                    continue
-                path = os.path.join(root, dname)
-                if os.path.getctime(path) < creation_time:
-                    creation_time = os.path.getctime(path)
-                    oldest_folder = dname
-
-        self.logger.debug(f"Oldest folder: {oldest_folder} ({creation_time})")
+        oldest_folder = self.index.oldest(self._current_sid())
+        self.logger.debug(f"Oldest folder: {oldest_folder}")
         return oldest_folder
 
-    def random_folder(self, fpath) -> str:
-        """Returns a random folder in cache path"""
-        for root, dirs, _ in os.walk(fpath):
-            if len(dirs) == 1:
-                return dirs[0]
-            while True:
-                choice = random.choice(dirs)
-                if os.path.join(root, choice) != self.sid_path:
-                    break
-            self.logger.debug(f"Random folder: {choice}")
-            return choice
+    def random_folder(self, fpath=None) -> str:
+        """Returns a random folder in cache path except
+        the current one. `fpath` is unused and only kept
+        for compatibility."""
+
+        choice = self.index.random(self._current_sid())
+        self.logger.debug(f"Random folder: {choice}")
+        return choice
 
     def is_cached(self, sid=None) -> bool:
         """Returns False if all necessary files are absent"""
@@ -529,7 +1145,7 @@ class FileHandler:
 
     def get_cached_ids(self) -> list:
         """Returns list of cached ids"""
-        return [f for f in self.get_foldernames(self.cache_path) if self.is_cached(f)]
+        return self.index.ids(cached_only=True)
 
     def add_context(self, reaction_to, phrases):
         """Add new context. Note that it does not check
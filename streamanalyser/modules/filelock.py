@@ -0,0 +1,143 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # windows
+    fcntl = None
+    import msvcrt
+
+# locks held by this process, so that they can be acquired again
+# without deadlocking on the lock the process already holds. file locks
+# don't exclude threads of the same process, so each path also has a
+# reentrant thread lock that the holding thread owns.
+_held_locks = {}
+_held_locks_guard = threading.Lock()
+
+
+def _lock_file(file, shared, blocking) -> bool:
+    if fcntl:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(file.fileno(), flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    # msvcrt doesn't support shared locks, so every lock is exclusive
+    file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(
+                file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1
+            )
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            # LK_LOCK gives up after 10 seconds, keep trying instead
+
+
+def _unlock_file(file):
+    if fcntl:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """An advisory lock on a file that is shared between processes.
+
+    Locks are reentrant within a thread: acquiring a lock the thread
+    already holds succeeds immediately and keeps the mode of the outer
+    lock, so a shared lock must not wrap code that needs an exclusive one.
+    Other threads of the same process wait until the lock is released,
+    even if both locks are shared.
+
+    Args:
+        path (str): Path to the lock file. Created if it doesn't exist.
+        shared (bool, optional): Acquire a shared (read) lock instead of
+            an exclusive (write) lock. Defaults to False.
+    """
+
+    def __init__(self, path, shared=False):
+        self.path = os.path.abspath(path)
+        self.shared = shared
+        self._acquired = False
+
+    def __repr__(self) -> str:
+        mode = "shared" if self.shared else "exclusive"
+        return f"FileLock({self.path}, {mode})"
+
+    def acquire(self, blocking=True) -> bool:
+        """Acquires the lock.
+
+        Args:
+            blocking (bool, optional): Wait until the lock is released
+                by other processes and threads. Defaults to True.
+
+        Returns:
+            bool: If the lock is acquired. Always True when blocking.
+        """
+        if self._acquired:
+            return True
+        with _held_locks_guard:
+            held = _held_locks.setdefault(
+                self.path,
+                {"thread_lock": threading.RLock(), "file": None, "count": 0, "users": 0},
+            )
+            held["users"] += 1
+        if not held["thread_lock"].acquire(blocking):
+            self._forget(held)
+            return False
+
+        if held["count"] == 0:
+            file = open(self.path, "a+b")
+            locked = False
+            try:
+                locked = _lock_file(file, self.shared, blocking)
+            finally:
+                if not locked:
+                    file.close()
+                    held["thread_lock"].release()
+                    self._forget(held)
+            if not locked:
+                return False
+            held["file"] = file
+        held["count"] += 1
+        self._acquired = True
+        return True
+
+    def release(self):
+        if not self._acquired:
+            return
+        self._acquired = False
+        held = _held_locks[self.path]
+        held["count"] -= 1
+        try:
+            if held["count"] == 0:
+                file, held["file"] = held["file"], None
+                try:
+                    _unlock_file(file)
+                finally:
+                    file.close()
+        finally:
+            held["thread_lock"].release()
+            self._forget(held)
+
+    def _forget(self, held):
+        with _held_locks_guard:
+            held["users"] -= 1
+            if held["users"] == 0:
+                del _held_locks[self.path]
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.release()
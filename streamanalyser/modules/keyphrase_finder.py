@@ -1,7 +1,9 @@
-import nltk
 import re
 import string
 import os
+from functools import lru_cache
+
+import numpy as np
 
 PHRASE_END_DELIMITER = "%phrase_end%" # to not mix continous chat messages
 
@@ -15,6 +17,135 @@ MONOGRAM_STOP_WORDS_PATH = os.path.join(
     os.path.dirname(os.path.realpath(__file__)), "..", "data", "monogram_stop_words.txt"
 )
 
+# hiragana, katakana, CJK ideographs, hangul and halfwidth katakana
+_CJK_CHARACTERS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af\uff66-\uff9f"
+EMOTE_PATTERN = re.compile(r"(:[^:\s]+:)")
+CHAT_TOKEN_PATTERN = re.compile(
+    rf"[{_CJK_CHARACTERS}]+"
+    # words, including contractions such as "don't" or "it’s"
+    rf"|[^\W_{_CJK_CHARACTERS}]+(?:['’][^\W_{_CJK_CHARACTERS}]+)*"
+    r"|[^\w\s]+"
+)
+# characters repeated more than three times, e.g. "wwww" or "草草草草"
+REPEATED_CHARACTERS_PATTERN = re.compile(r"(.)\1{3,}")
+
+
+@lru_cache(maxsize=None)
+def load_nltk():
+    """Imports NLTK and downloads the tokenizer data if it's missing.
+    Only done once per process, since importing NLTK is slow and
+    checking the data might need network access.
+
+    Returns:
+        module: The `nltk` module.
+    """
+    import nltk
+
+    nltk.download('punkt', download_dir=NLTK_DATA_PATH, quiet=True)
+    nltk.data.path = [NLTK_DATA_PATH]
+    return nltk
+
+
+@lru_cache(maxsize=None)
+def read_word_list(path) -> frozenset:
+    """Reads a word list file once per process. Each line is a word
+    and every line is expected to end with a newline.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        frozenset[str]: Words in the file.
+    """
+    with open(path, 'r', encoding="utf-8") as file:
+        return frozenset(r[:-1] for r in file.readlines())
+
+
+def tokenize_chat_message(string) -> list:
+    """Tokenizes a chat message in a single pass with precompiled patterns.
+
+    Emotes (`:emote:`) are kept as they are. Other tokens are lowercased
+    and are either CJK runs, words, where contractions stay in one token,
+    or punctuation runs. Characters repeated more than three times are
+    shortened to three, so "wwwww" and "wwww" count as the same token.
+
+    Args:
+        string (str): Message text.
+
+    Returns:
+        list[str]: Tokens of the message.
+    """
+    if ":" not in string:
+        return CHAT_TOKEN_PATTERN.findall(REPEATED_CHARACTERS_PATTERN.sub(r"\1\1\1", string.lower()))
+    tokens = []
+    # split keeps the emotes at odd indices
+    for i, part in enumerate(EMOTE_PATTERN.split(string)):
+        if i % 2:
+            tokens.append(part)
+        elif part:
+            tokens.extend(CHAT_TOKEN_PATTERN.findall(
+                REPEATED_CHARACTERS_PATTERN.sub(r"\1\1\1", part.lower())
+            ))
+    return tokens
+
+
+def count_ngrams(tokens, max_ngram_size, amount, min_ngram_size=1, delimiter=PHRASE_END_DELIMITER) -> dict:
+    """Counts n-grams of every size in a single sweep and returns the most
+    common ones, ranked the same as `nltk.FreqDist(nltk.ngrams(tokens, n)).most_common(amount)`.
+
+    Tokens are interned to integer ids, and each n-gram gets the id of its
+    (n-1)-gram prefix combined with its last token, which makes the n-grams
+    nodes of a trie that is built one level at a time on integer arrays.
+    N-grams that cross the delimiter are never built into phrases, but they
+    keep their ranks so that the other n-grams rank as before.
+
+    Args:
+        tokens (list[str]): Tokens to count.
+        max_ngram_size (int): Largest n-gram size to count.
+        amount (int): Most common n-gram amount to rank per size.
+        min_ngram_size (int, optional): Smallest n-gram size to return. Defaults to 1.
+        delimiter (str, optional): Token that ends phrases. Defaults to PHRASE_END_DELIMITER.
+
+    Returns:
+        dict[int, list[tuple[tuple[str], int]]]: Most common n-grams and their
+        frequencies for each size, most common first.
+    """
+
+    vocabulary = {}
+    ids = np.fromiter(
+        (vocabulary.setdefault(token, len(vocabulary)) for token in tokens),
+        dtype=np.int64,
+        count=len(tokens),
+    )
+    if delimiter in vocabulary:
+        is_delimiter = ids == vocabulary[delimiter]
+    else:
+        is_delimiter = np.zeros(len(ids), dtype=bool)
+
+    result = {n: [] for n in range(max(min_ngram_size, 1), max_ngram_size + 1)}
+    gram_ids = crosses = None
+    for n in range(1, max_ngram_size + 1):
+        length = len(ids) - n + 1
+        if length <= 0:
+            break
+        if n == 1:
+            keys, crosses = ids, is_delimiter
+        else:
+            keys = gram_ids[:length] * len(vocabulary) + ids[n - 1:]
+            crosses = crosses[:length] | is_delimiter[n - 1:]
+        _, first, gram_ids, counts = np.unique(
+            keys, return_index=True, return_inverse=True, return_counts=True
+        )
+        gram_ids = gram_ids.reshape(-1)
+        if n < min_ngram_size:
+            continue
+        # most frequent first, ties are broken by first occurrence like `Counter`
+        for i in np.lexsort((first, -counts))[:amount]:
+            start = first[i]
+            if not crosses[start]:
+                result[n].append((tuple(tokens[start:start + n]), int(counts[i])))
+    return result
+
 
 class KeyphraseFinder:
     """A class that finds keyphrases from a live chat using natural language processing
@@ -23,18 +154,23 @@ class KeyphraseFinder:
 
     def __init__(
             self,
-            chat,
+            chat,  # messages or message texts
             monogram_stop_words_path = MONOGRAM_STOP_WORDS_PATH,
             monogram_stop_punctuations_path = MONOGRAM_STOP_PUNCTUATIONS_PATH,
             stop_words_path = None,  # your custom stop words to exclude in collocations
             fix_phrases = [],
             punctuation_list=list(string.punctuation),
+            tokenizer = "nltk",  # "nltk" or "rule", see `TOKENIZERS`
         ):
 
-        nltk.download('punkt', download_dir=NLTK_DATA_PATH, quiet=True) 
-        nltk.data.path = [NLTK_DATA_PATH]
-        
+        if tokenizer not in TOKENIZERS:
+            raise ValueError(f"Invalid tokenizer: {tokenizer}")
+        if tokenizer == "nltk":
+            load_nltk()
+
         self.chat = chat
+        self.tokenizer = tokenizer
+        self.tokenize_message = TOKENIZERS[tokenizer]
         self.fix_phrases = fix_phrases
         self.punctuation_list = punctuation_list
         self.stop_words_path = stop_words_path
@@ -45,19 +181,16 @@ class KeyphraseFinder:
 
         try:
             # always left an empty whitespace at the end of the txt file
-            # get text data line by line
-            with open(monogram_stop_words_path, 'r', encoding="utf-8") as file:
-                self.monogram_stop_punctuations = [r[:-1] for r in file.readlines()]
-            with open(monogram_stop_punctuations_path, 'r', encoding="utf-8") as file:
-                self.monogram_stop_words = [r[:-1] for r in file.readlines()]
+            # word lists are shared between instances, so they're read once
+            self.monogram_stop_punctuations = read_word_list(monogram_stop_words_path)
+            self.monogram_stop_words = read_word_list(monogram_stop_punctuations_path)
             if stop_words_path:
-                with open(stop_words_path, 'r', encoding="utf-8") as file:
-                    self.stop_words = [r[:-1] for r in file.readlines()]
+                self.stop_words = read_word_list(stop_words_path)
         except FileNotFoundError as e:
             # log
             raise e
 
-        self.monogram_stop_words_all = self.monogram_stop_words + self.monogram_stop_punctuations
+        self.monogram_stop_words_all = self.monogram_stop_words | self.monogram_stop_punctuations
 
     @staticmethod
     def _regex_partition(string, regex):
@@ -84,6 +217,7 @@ class KeyphraseFinder:
     def _tokenize_yt_chat_message(string):
         first, sub_string, last = KeyphraseFinder._regex_partition(string, ":.+:")
 
+        nltk = load_nltk()
         if sub_string:
             tokens = KeyphraseFinder._tokenize_yt_chat_message(last)
             return nltk.word_tokenize(first) + [sub_string] + tokens
@@ -114,9 +248,15 @@ class KeyphraseFinder:
             if len(token) == 1 and all([1 if ch in self.punctuation_list else 0 for ch in token]):
                 del self.tokens[i]
 
+    def _chat_message_tokens(self, msg) -> list:
+        # messages can be already tokenized, e.g. by a token store
+        if isinstance(msg, (list, tuple)):
+            return msg
+        return self.tokenize_message(getattr(msg, "text", msg))
+
     def _tokenize_yt_chat(self):
         self.tokens=[]
-        for yt_tokens in [KeyphraseFinder._tokenize_yt_chat_message(msg.text) for msg in self.chat]:
+        for yt_tokens in [self._chat_message_tokens(msg) for msg in self.chat]:
             self._merge_punctuations()
             self._adjust_tokens()
             self.tokens.extend(
@@ -188,10 +328,12 @@ class KeyphraseFinder:
             max_keyphrase_amount, min_keyphrase_amount, len(self.chat), stoppers
         )
 
+        most_common_ngrams = count_ngrams(
+            self.tokens, max_ngram_size, keyphrase_per_ngram, min_ngram_size
+        )
         seen_tuples = []
         for ngram_size in range(max_ngram_size, min_ngram_size-1, -1):
-            fre_dist_list = nltk.FreqDist(nltk.ngrams(self.tokens, ngram_size)).most_common(keyphrase_per_ngram)
-            for fre_tup in fre_dist_list:
+            for fre_tup in most_common_ngrams.get(ngram_size, []):
                 message = self._fix_token(' '.join(fre_tup[0]))
                 frequency = fre_tup[1]
                 weighted_score = frequency*ngram_size
@@ -229,3 +371,12 @@ class KeyphraseFinder:
                 if len(seen_tuples) == max_keyphrase_amount or ngram_size == min_ngram_size:
                     return sorted(seen_tuples, key=lambda x: x[3], reverse=True)
         return sorted(seen_tuples, key=lambda x: x[3], reverse=True)
+
+
+# message tokenizers by name
+#   nltk: `nltk.word_tokenize` on the text around emotes
+#   rule: `tokenize_chat_message`, which doesn't need NLTK data
+TOKENIZERS = {
+    "nltk": KeyphraseFinder._tokenize_yt_chat_message,
+    "rule": tokenize_chat_message,
+}
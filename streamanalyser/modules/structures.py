@@ -1,15 +1,27 @@
-from dataclasses import dataclass, field
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field, fields
 import datetime
 from typing import Optional
 import webbrowser
 import platform
-from colorama import init, Fore, Style
+from colorama import init as colorama_init, Fore, Style
 from colorama.ansi import AnsiFore
 from enum import IntEnum
+import numpy as np
 #from .chatanalyser import DEFAULT_CONTEXT_SOURCE_PATH  # circular import
 from .exceptions import PathAlreadyExistsException
 
-init()
+_colors_initialized = False
+
+
+def init_colors():
+    """Initializes colorama so that colored output works on every
+    platform. Done once per process, when colored output is needed."""
+    global _colors_initialized
+    if not _colors_initialized:
+        colorama_init()
+        _colors_initialized = True
+
 
 class ImageResolution(IntEnum):
     MEDIUM = 0
@@ -47,6 +59,155 @@ class DefaultStoragePath:
         else:
             raise ValueError("Invalid OS name: %s" % platform.system)
 
+class TimeSeries(Mapping):
+    """Read-only per-second table backed by a NumPy array.
+
+    Behaves like the `{second: value}` dicts the analyser used to build,
+    while the underlying values stay in `array` for vectorized consumers.
+
+    Args:
+        array (array_like): Values of each second.
+        start (int, optional): Second of the first value. Defaults to 0.
+        seconds (array_like|None, optional): Ascending seconds of the values
+            if they are not consecutive. Overrides `start`. Defaults to None.
+    """
+
+    def __init__(self, array, start=0, seconds=None):
+        self.array = np.asarray(array)
+        self._seconds = None
+        if seconds is not None:
+            self._seconds = np.asarray(seconds, dtype=np.int64)
+            if len(self._seconds):
+                start = self._seconds[0]
+        self.start = int(start)
+
+    def __getitem__(self, second):
+        if not isinstance(second, (int, np.integer)):
+            raise KeyError(second)
+        if self._seconds is None:
+            idx = second - self.start
+        else:
+            idx = int(np.searchsorted(self._seconds, second))
+            if idx < len(self._seconds) and self._seconds[idx] != second:
+                idx = -1
+        if not 0 <= idx < len(self.array):
+            raise KeyError(second)
+        return self.array[idx].item()
+
+    def __iter__(self):
+        if self._seconds is not None:
+            return iter(self._seconds.tolist())
+        return iter(range(self.start, self.start + len(self.array)))
+
+    def __len__(self):
+        return len(self.array)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.array, dtype=dtype)
+
+    def __repr__(self):
+        return f"TimeSeries(start={self.start}, length={len(self.array)})"
+
+    @property
+    def seconds(self):
+        """Returns the keys as an array"""
+        if self._seconds is not None:
+            return self._seconds
+        return np.arange(self.start, self.start + len(self.array))
+
+    def with_array(self, array):
+        """Returns a table of other values for the same seconds"""
+        return TimeSeries(array, start=self.start, seconds=self._seconds)
+
+class MessageSlice(Sequence):
+    """Lazy view of consecutive messages in a message store.
+
+    Messages are read from the store when accessed, so no list
+    is copied for each highlight.
+
+    Args:
+        store (Sequence): Messages to point into.
+        start (int): Index of the first message.
+        stop (int): Index after the last message.
+    """
+
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = int(start)
+        self.stop = max(int(stop), self.start)
+
+    @property
+    def range(self) -> tuple:
+        """Returns the (start, stop) index range in the store"""
+        return self.start, self.stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, idx):
+        indices = range(self.start, self.stop)[idx]
+        if isinstance(idx, slice):
+            if indices.step == 1:
+                return MessageSlice(self.store, indices.start, indices.stop)
+            return [self.store[i] for i in indices]
+        return self.store[indices]
+
+    def __iter__(self):
+        for i in range(self.start, self.stop):
+            yield self.store[i]
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return f"MessageSlice(start={self.start}, stop={self.stop})"
+
+
+class LazyMessages(Sequence):
+    """Messages that are only loaded when they are first accessed.
+
+    Args:
+        loader (Callable): Function that returns the messages.
+        length (int|None, optional): Known message amount, so that the
+            messages are not loaded just to be counted. Defaults to None.
+    """
+
+    def __init__(self, loader, length=None):
+        self._loader = loader
+        self._length = length
+        self._messages = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._messages is not None
+
+    @property
+    def messages(self):
+        if self._messages is None:
+            self._messages = self._loader()
+        return self._messages
+
+    def __len__(self):
+        if self._messages is None and self._length is not None:
+            return self._length
+        return len(self.messages)
+
+    def __getitem__(self, idx):
+        return self.messages[idx]
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __add__(self, other):
+        return self.messages + other
+
+    def __repr__(self):
+        if self.loaded:
+            return f"LazyMessages({len(self._messages)} messages)"
+        return "LazyMessages(not loaded)"
+
 @dataclass
 class Icon:
     id: str  # title
@@ -174,6 +335,172 @@ class Sticker(Superchat):
     def __repr__(self):
         return f"[{self.time_in_hms}] {Fore.RED+self.author.name+Style.RESET_ALL} sent a Sticker ({self.money.text})"
 
+class StringColumn:
+    """Column of strings kept in a single buffer.
+
+    The string at index i is `buffer[offsets[i]:offsets[i+1]]`.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return self.buffer[int(self.offsets[idx]):int(self.offsets[idx + 1])]
+
+    def __iter__(self):
+        buffer, offsets = self.buffer, self.offsets.tolist()
+        for start, stop in zip(offsets[:-1], offsets[1:]):
+            yield buffer[start:stop]
+
+    def extend(self, strings):
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        self.offsets = np.concatenate(
+            (self.offsets, self.offsets[-1] + np.cumsum(lengths))
+        )
+        self.buffer += "".join(strings)
+
+    def copy(self):
+        column = StringColumn()
+        column.buffer = self.buffer
+        column.offsets = self.offsets.copy()
+        return column
+
+
+class MessageTable(Sequence):
+    """Columnar storage of chat messages.
+
+    Times, message types and author indices are kept in NumPy arrays,
+    texts and ids in string columns. Authors are stored once and
+    referenced by index. Emotes and type specific fields (money, colors
+    etc.) are only stored for the rows that have them.
+
+    `Message`, `Superchat`, `Membership` and `Sticker` objects are
+    materialized on access, so the table can be used in place of a
+    message list. Note that message ids are stored as strings.
+
+    Args:
+        messages (Iterable[ChatItem], optional): Messages to fill the
+            table with. Defaults to ().
+    """
+
+    MESSAGE_TYPES = (Message, Superchat, Membership, Sticker)
+    _COMMON_FIELDS = ("id", "time", "author", "text", "emotes")
+
+    def __init__(self, messages=()):
+        self.time = np.zeros(0, dtype=np.int64)
+        self.type_code = np.zeros(0, dtype=np.int8)
+        self.author_index = np.zeros(0, dtype=np.int32)
+        self.text = StringColumn()
+        self.ids = StringColumn()
+        self.authors = []
+        self.emotes = {}  # row -> emotes
+        self.extras = {}  # row -> type specific fields
+        self._author_indices = {}
+        self.extend(messages)
+
+    @classmethod
+    def _type_code(cls, message_type) -> int:
+        return cls.MESSAGE_TYPES.index(message_type)
+
+    @classmethod
+    def _extra_fields(cls, message_type) -> tuple:
+        return tuple(
+            f.name for f in fields(message_type) if f.name not in cls._COMMON_FIELDS
+        )
+
+    def extend(self, messages):
+        """Appends messages to the table"""
+
+        times, codes, author_indices, texts, ids = [], [], [], [], []
+        type_info = {}
+        for row, message in enumerate(messages, start=len(self)):
+            message_type = type(message)
+            if message_type not in type_info:
+                type_info[message_type] = (
+                    self._type_code(message_type),
+                    self._extra_fields(message_type),
+                )
+            code, extra_fields = type_info[message_type]
+
+            author_index = self._author_indices.get(message.author)
+            if author_index is None:
+                author_index = len(self.authors)
+                self.authors.append(message.author)
+                self._author_indices[message.author] = author_index
+
+            times.append(message.time)
+            codes.append(code)
+            author_indices.append(author_index)
+            texts.append(message.text)
+            ids.append(str(message.id))
+            if message.emotes:
+                self.emotes[row] = message.emotes
+            if extra_fields:
+                self.extras[row] = {
+                    name: getattr(message, name) for name in extra_fields
+                }
+
+        self.time = np.concatenate((self.time, np.array(times, dtype=np.int64)))
+        self.type_code = np.concatenate((self.type_code, np.array(codes, dtype=np.int8)))
+        self.author_index = np.concatenate(
+            (self.author_index, np.array(author_indices, dtype=np.int32))
+        )
+        self.text.extend(texts)
+        self.ids.extend(ids)
+
+    def copy(self):
+        table = MessageTable()
+        table.time = self.time.copy()
+        table.type_code = self.type_code.copy()
+        table.author_index = self.author_index.copy()
+        table.text = self.text.copy()
+        table.ids = self.ids.copy()
+        table.authors = list(self.authors)
+        table.emotes = dict(self.emotes)
+        table.extras = dict(self.extras)
+        table._author_indices = dict(self._author_indices)
+        return table
+
+    def texts(self):
+        """Iterates over message texts without creating message objects"""
+        return iter(self.text)
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            indices = range(len(self))[idx]
+            if indices.step == 1:
+                return MessageSlice(self, indices.start, indices.stop)
+            return [self[i] for i in indices]
+        row = range(len(self))[idx]
+        message_type = self.MESSAGE_TYPES[self.type_code[row]]
+        return message_type(
+            id=self.ids[row],
+            time=int(self.time[row]),
+            author=self.authors[self.author_index[row]],
+            text=self.text[row],
+            emotes=self.emotes.get(row, []),
+            **self.extras.get(row, {}),
+        )
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def __add__(self, messages):
+        table = self.copy()
+        table.extend(messages)
+        return table
+
+    def __repr__(self):
+        return f"MessageTable({len(self)} messages, {len(self.authors)} authors)"
+
 @dataclass
 class Intensity:
     level: str
@@ -283,6 +610,32 @@ class Highlight:
         return datetime.timedelta(seconds=int(self.time))
 
 
+@dataclass
+class SweepResult:
+    """Highlights detected with a parameter configuration in a sweep.
+    Highlights only have their time, duration and frequency delta set."""
+
+    window: int
+    smoothing_width: int
+    min_duration: int
+    threshold_constant: float
+    highlights: list = field(default_factory=list)
+    elapsed: float = 0.0  # seconds, including the smoothing shared with other configurations
+
+    @property
+    def highlight_amount(self) -> int:
+        return len(self.highlights)
+
+    @property
+    def params(self) -> dict:
+        return {
+            "window": self.window,
+            "smoothing_width": self.smoothing_width,
+            "min_duration": self.min_duration,
+            "threshold_constant": self.threshold_constant,
+        }
+
+
 @dataclass
 class ContextSourceManager():
     """Dataclass to manage source paths for context files
@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+
+
+def _encode(obj) -> np.ndarray:
+    return np.frombuffer(json.dumps(obj, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+
+def _decode(array):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+class TokenStore:
+    """Tokens of the messages of a stream, so that each message is only
+    tokenized once per tokenization kind. Tokens are interned to integer
+    ids and stored as flat arrays with an offset per message.
+
+    Args:
+        key (str, optional): Identity of the message cache the tokens
+            belong to. Defaults to None.
+    """
+
+    def __init__(self, key=None):
+        self.key = key
+        self.vocabulary = []
+        self._token_ids = {}
+        # kind -> {"rows": message id -> row, "offsets": list[int], "tokens": list[int]}
+        self._kinds = {}
+        self.dirty = False
+
+    def __repr__(self) -> str:
+        kinds = ", ".join(f"{kind}: {len(store['rows'])}" for kind, store in self._kinds.items())
+        return f"TokenStore({len(self.vocabulary)} tokens, {{{kinds}}})"
+
+    def _intern(self, token) -> int:
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            token_id = self._token_ids[token] = len(self.vocabulary)
+            self.vocabulary.append(token)
+        return token_id
+
+    def tokenize(self, kind, ids, texts, tokenizer, map=map) -> list:
+        """Returns tokens of the messages, tokenizing only the messages
+        that are not in the store yet.
+
+        Args:
+            kind (str): Name of the tokenization, e.g. 'keyphrase-nltk'.
+            ids (Iterable[str]): Message ids.
+            texts (Iterable[str]): Message texts in the same order.
+            tokenizer (Callable[[str], list[str]]): Function that tokenizes
+                a text. Should always be the same for a kind.
+            map (Callable, optional): Map function to tokenize missing texts
+                with, such as `Executor.map`. Defaults to `map`.
+
+        Returns:
+            list[list[str]]: Tokens of each message.
+        """
+        store = self._kinds.setdefault(kind, {"rows": {}, "offsets": [0], "tokens": []})
+        rows, offsets, tokens = store["rows"], store["offsets"], store["tokens"]
+        ids = list(ids)
+
+        missing = [i for i, message_id in enumerate(ids) if message_id not in rows]
+        if missing:
+            texts = list(texts)
+            for i, message_tokens in zip(missing, map(tokenizer, [texts[i] for i in missing])):
+                if ids[i] in rows:
+                    continue
+                rows[ids[i]] = len(offsets) - 1
+                tokens.extend(self._intern(token) for token in message_tokens)
+                offsets.append(len(tokens))
+            self.dirty = True
+
+        vocabulary = self.vocabulary
+        return [
+            [vocabulary[token_id] for token_id in tokens[offsets[row]:offsets[row + 1]]]
+            for row in (rows[message_id] for message_id in ids)
+        ]
+
+    def to_arrays(self) -> dict:
+        """Returns the store as a dict of arrays to save with `numpy.savez`"""
+        arrays = {
+            "key": _encode(self.key),
+            "vocabulary": _encode(self.vocabulary),
+            "kinds": _encode(list(self._kinds)),
+        }
+        for kind, store in self._kinds.items():
+            message_ids = sorted(store["rows"], key=store["rows"].get)
+            arrays[f"{kind}.ids"] = _encode(message_ids)
+            arrays[f"{kind}.offsets"] = np.array(store["offsets"], dtype=np.int64)
+            arrays[f"{kind}.tokens"] = np.array(store["tokens"], dtype=np.int32)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, key=None) -> "TokenStore":
+        """Creates a store from saved arrays. Returns an empty store
+        if the arrays belong to another message cache.
+
+        Args:
+            arrays (Mapping[str, np.ndarray]|None): Saved arrays.
+            key (str, optional): Identity of the current message cache.
+                Defaults to None.
+        """
+        store = cls(key)
+        if arrays is None or _decode(arrays["key"]) != key:
+            return store
+        store.vocabulary = _decode(arrays["vocabulary"])
+        store._token_ids = {token: i for i, token in enumerate(store.vocabulary)}
+        for kind in _decode(arrays["kinds"]):
+            message_ids = _decode(arrays[f"{kind}.ids"])
+            store._kinds[kind] = {
+                "rows": {message_id: row for row, message_id in enumerate(message_ids)},
+                "offsets": arrays[f"{kind}.offsets"].tolist(),
+                "tokens": arrays[f"{kind}.tokens"].tolist(),
+            }
+        return store
@@ -1,13 +1,16 @@
 from collections import Counter
+from dataclasses import asdict
 from datetime import timedelta
+import hashlib
+import json
 import os
 import random
 import traceback
 from shutil import copyfile
+from functools import lru_cache
 from time import time
 from colorama.ansi import Back, Style
-
-from wordcloud import WordCloud
+import numpy as np
 
 from .modules import (
     loggersetup,
@@ -16,17 +19,33 @@ from .modules import (
     datarefiner,
     chatanalyser,
     structures,
+    tokenstore,
     utils,
     cli,
+    exceptions,
 )
 
 DIR_PATH = os.path.dirname(os.path.realpath(__file__))
 DEFAULT_CONTEXT_SOURCE_PATH = os.path.join(DIR_PATH, "data", "default_contexts.json")
 DEFAULT_FONT_PATH = os.path.join(DIR_PATH, "fonts", "NotoSansCJKjp-Bold.ttf")
-with open(rf"{DIR_PATH}/data/keyword_filters.txt", "r", encoding="utf-8") as f:
-    DEFAULT_KEYWORD_FILTERS = [kw.strip("\n") for kw in f.readlines()]
+DEFAULT_KEYWORD_FILTERS_PATH = os.path.join(DIR_PATH, "data", "keyword_filters.txt")
 DEFAULT_STORAGE_PATH = structures.DefaultStoragePath.get_path()
 
+
+@lru_cache(maxsize=None)
+def read_default_keyword_filters() -> tuple:
+    """Reads the default keyword filters once per process"""
+    with open(DEFAULT_KEYWORD_FILTERS_PATH, "r", encoding="utf-8") as f:
+        return tuple(kw.strip("\n") for kw in f.readlines())
+
+
+def __getattr__(name):
+    # default keyword filters are only read when they're used
+    if name == "DEFAULT_KEYWORD_FILTERS":
+        return list(read_default_keyword_filters())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 class StreamAnalyser:
     """A class that analyses live streams.
 
@@ -87,12 +106,19 @@ class StreamAnalyser:
                     used cache.
                 - fifo (First in first out): Deletes oldest cache.
                 - rr (Random replacement): Deletes random cache. (uhh...)
+                - gds (GreedyDual-Size): Deletes large caches that
+                    haven't been used for a while first.
             Defaults to 'lru'.
 
         cache_limit (int, optional): Cache file amount to keep. Cached
             files will be deleted if file amount exceeds this value
             according to `cache_deletion_algorithm` option. Defaults to 50.
 
+        cache_max_bytes (int|None, optional): Total cache size to keep
+            in bytes. Cached files will be deleted if the cache grows
+            larger according to `cache_deletion_algorithm` option.
+            Defaults to None, which only limits the file amount.
+
         min_duration (int): Minimum highlight duration (in seconds) to detect.
             Defaults to 5
 
@@ -125,6 +151,42 @@ class StreamAnalyser:
 
         stop_words_path (bool, optional): Default stop word file (.txt) path to exclude in
             keyphrase collocations. Defaults to None.
+
+        use_message_table (bool, optional): Store refined messages in a columnar
+            `MessageTable` instead of a list of message objects. Takes considerably
+            less memory for long streams while still behaving like a list.
+            Defaults to False.
+
+        fetch_shards (int, optional): Amount of time ranges to fetch messages
+            concurrently. Speeds up fetching messages of long streams.
+            See `DataCollector` for more. Defaults to 1.
+
+        offline (bool, optional): Work only with cached data. Raises
+            `OfflineModeError` if data has to be fetched, while missing
+            messages of incomplete caches are skipped. Note that the data
+            collector is only created when data has to be fetched even if
+            this option is False. Defaults to False.
+
+        use_analysis_cache (bool, optional): Cache highlights after analysing, and
+            load them on later runs instead of analysing again if the messages,
+            analysis options and context files are unchanged. Messages and authors
+            are only read when the messages are first accessed in that case.
+            Defaults to True.
+
+        persist_contexts (bool, optional): Save compiled contexts into the cache
+            folder so that other processes and later runs don't compile them
+            again. Contexts are always shared within the process. Defaults to False.
+
+        keyphrase_workers (int, optional): Process amount to find highlight
+            keyphrases with. Keyphrases are found serially if there are less
+            than two highlights for each process. Defaults to 1.
+
+        use_token_store (bool, optional): Tokenize each message once for keyphrases
+            and cache the tokens, so that later analyses reuse them. Cached tokens
+            are discarded when the message cache changes. Defaults to True.
+
+        tokenizer (str, optional): Tokenizer to find keyphrases with, either "nltk"
+            or the faster rule-based "rule". Defaults to "nltk".
     """
 
     def __init__(
@@ -143,6 +205,7 @@ class StreamAnalyser:
         keep_cache=False,
         cache_deletion_algorithm="lru",
         cache_limit=50,
+        cache_max_bytes=None,
         min_duration=15,
         window=30,
         threshold_constant=3,
@@ -153,7 +216,15 @@ class StreamAnalyser:
         intensity_colors=[],
         keep_analysis_data=True,
         default_context_path=DEFAULT_CONTEXT_SOURCE_PATH,
-        stop_words_path = None
+        stop_words_path = None,
+        use_message_table=False,
+        fetch_shards=1,
+        offline=False,
+        use_analysis_cache=True,
+        persist_contexts=False,
+        keyphrase_workers=1,
+        use_token_store=True,
+        tokenizer="nltk",
     ):
 
         self.sid = sid
@@ -165,17 +236,27 @@ class StreamAnalyser:
         self.not_cache = not_cache
         self.keep_cache = keep_cache
         self.cache_limit = cache_limit
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_deletion_algorithm = cache_deletion_algorithm
         self.min_duration = min_duration
         self.window = window
         self.threshold_constant = threshold_constant
         self.keyword_limit = keyword_limit
-        self.keyword_filters = keyword_filters + DEFAULT_KEYWORD_FILTERS
+        self.keyword_filters = keyword_filters + list(read_default_keyword_filters())
         self.intensity_levels = intensity_levels
         self.intensity_constants = intensity_constants
         self.intensity_colors = intensity_colors
         self.keep_analysis_data = keep_analysis_data
         self.default_context_path = default_context_path
         self.stop_words_path = stop_words_path
+        self.use_message_table = use_message_table
+        self.fetch_shards = fetch_shards
+        self.offline = offline
+        self.use_analysis_cache = use_analysis_cache
+        self.persist_contexts = persist_contexts
+        self.keyphrase_workers = keyphrase_workers
+        self.use_token_store = use_token_store
+        self.tokenizer = tokenizer
 
         self._raw_messages = {}
         self.messages = []
@@ -185,10 +266,13 @@ class StreamAnalyser:
         self.fig = None
         self.metadata = {}
         self.context_source = structures.ContextSourceManager([])
+        # highlights and messages are printed in color
+        structures.init_colors()
 
         self.filehandler = filehandler.FileHandler(storage_path=storage_path)
         self.logger = loggersetup.create_logger(__file__, self.filehandler.log_path, sid=sid)
-        self.collector = datacollector.DataCollector(sid, log_path=self.filehandler.log_path, msglimit=msglimit, verbose=verbose, yt_api_key=yt_api_key)
+        self._collector = None  # created when data has to be fetched, see `collector`
+        self._token_store = None  # read when tokens are first needed, see `token_store`
         self.refiner = datarefiner.DataRefiner(log_path=self.filehandler.log_path, verbose=verbose)
         self.canalyser = None  # It's recommended to empty this variable by hand to conserve memory after using the analysis data. See `keep_analysis_data` option for more.
 
@@ -215,6 +299,7 @@ class StreamAnalyser:
         self.logger.debug(f"keep_cache={keep_cache}")
         self.logger.debug(f"cache_deletion_algorithm={cache_deletion_algorithm}")
         self.logger.debug(f"cache_limit={cache_limit}")
+        self.logger.debug(f"cache_max_bytes={cache_max_bytes}")
         self.logger.debug(f"min_duration={min_duration}")
         self.logger.debug(f"window={window}")
         self.logger.debug(f"threshold_constant={threshold_constant}")
@@ -226,6 +311,14 @@ class StreamAnalyser:
         self.logger.debug(f"keep_analysis_data={keep_analysis_data}")
         self.logger.debug(f"default_context_path={default_context_path}")
         self.logger.debug(f"stop_words_path={stop_words_path}")
+        self.logger.debug(f"use_message_table={use_message_table}")
+        self.logger.debug(f"fetch_shards={fetch_shards}")
+        self.logger.debug(f"offline={offline}")
+        self.logger.debug(f"use_analysis_cache={use_analysis_cache}")
+        self.logger.debug(f"persist_contexts={persist_contexts}")
+        self.logger.debug(f"keyphrase_workers={keyphrase_workers}")
+        self.logger.debug(f"use_token_store={use_token_store}")
+        self.logger.debug(f"tokenizer={tokenizer}")
 
 
         self.filehandler.create_cache_dir(self.sid)
@@ -233,16 +326,78 @@ class StreamAnalyser:
             self.clear_cache(delete_root_folder=False)
 
         if not keep_cache:
-            famount = self.filehandler.dir_amount(self.filehandler.cache_path)
             if cache_limit < 1:
                 raise ValueError("Cache limit must be a natural number")
-            if famount > cache_limit:
-                self.logger.warning(
-                    f"Cache limit has been exceeded by {famount-cache_limit}"
-                )
-            while famount > cache_limit:
-                self.clear_cache(cache_deletion_algorithm)
-                famount -= 1
+            if cache_max_bytes is not None and cache_max_bytes < 0:
+                raise ValueError("Cache size limit can't be negative")
+            self.enforce_cache_limits()
+
+    @property
+    def collector(self) -> datacollector.DataCollector:
+        """Data collector of the stream. Created on first access since
+        creating it requires network access.
+
+        Raises:
+            OfflineModeError: If `offline` option is True.
+        """
+        if self._collector is None:
+            if self.offline:
+                msg = f"Data of {self.sid} has to be fetched in offline mode"
+                self.logger.error(msg)
+                raise exceptions.OfflineModeError(msg)
+            cached_video_info = self.filehandler.read_video_info()
+            self._collector = datacollector.DataCollector(
+                self.sid,
+                log_path=self.filehandler.log_path,
+                msglimit=self.msglimit,
+                verbose=self.verbose,
+                yt_api_key=self.yt_api_key,
+                shards=self.fetch_shards,
+                video_info=cached_video_info,
+            )
+            if self.disable_logs:
+                self._collector.logger.disabled = True
+            # only archived streams get this far, so their info won't change
+            if not cached_video_info:
+                self.filehandler.cache_video_info(self._collector.video_info)
+        return self._collector
+
+    @property
+    def authors(self) -> list:
+        """Authors of the messages. Messages that are loaded lazily
+        are loaded first, since authors are read with them."""
+        if isinstance(self.messages, structures.LazyMessages) and not self.messages.loaded:
+            self.messages.messages  # sets authors through `refine_data`
+        return self._authors
+
+    @authors.setter
+    def authors(self, authors):
+        self._authors = authors
+
+    @property
+    def token_store(self):
+        """Token store of the stream, or None if `use_token_store` is False.
+        Read from the cache on first access. Tokens cached for another
+        version of the message cache are discarded."""
+        if not self.use_token_store:
+            return None
+        if self._token_store is None:
+            try:
+                key = self.filehandler.message_cache_key()
+            except FileNotFoundError:
+                # messages are not cached, so there's nothing to key tokens by
+                return None
+            self._token_store = tokenstore.TokenStore.from_arrays(
+                self.filehandler.read_tokens(), key
+            )
+        return self._token_store
+
+    def _cache_tokens(self):
+        """Caches the token store if new messages are tokenized"""
+        if self._token_store is None or not self._token_store.dirty:
+            return
+        self.filehandler.cache_tokens(self._token_store.to_arrays())
+        self._token_store.dirty = False
 
     def __enter__(self):
         return self
@@ -256,7 +411,8 @@ class StreamAnalyser:
     def _disable_logs(self):
         self.logger.disabled = True
         self.filehandler.logger.disabled = True
-        self.collector.logger.disabled = True
+        if self._collector:
+            self._collector.logger.disabled = True
         self.refiner.logger.disabled = True
 
     def _cache_metadata(self, metadata):
@@ -268,6 +424,21 @@ class StreamAnalyser:
     def clear_cache(self, cache_deletion_algorithm=None, delete_root_folder=True):
         self.filehandler.clear_cache(cache_deletion_algorithm, delete_root_folder)
 
+    def enforce_cache_limits(self):
+        """Deletes other cached streams if the cache exceeds `cache_limit`
+        or `cache_max_bytes`. Does nothing if `keep_cache` is True."""
+        if self.keep_cache:
+            return
+        deleted = self.filehandler.enforce_cache_limits(
+            max_bytes=self.cache_max_bytes,
+            max_amount=self.cache_limit,
+            cache_deletion_algorithm=self.cache_deletion_algorithm,
+        )
+        if deleted:
+            self.logger.warning(
+                f"Cache limit has been exceeded, deleted {len(deleted)} cached streams"
+            )
+
     def collect_data(self):
         """Collects and caches stream data:
         - messages
@@ -280,6 +451,8 @@ class StreamAnalyser:
         # cache data
         self._cache_metadata(metadata)
         self._cache_messages(raw_messages)
+        # size of the current stream is only known now
+        self.enforce_cache_limits()
 
     def read_data(self):
         """Reads cached data"""
@@ -289,11 +462,13 @@ class StreamAnalyser:
         self._raw_messages = self.filehandler.read_messages()
         self.update_metadata(self.filehandler.read_metadata())
 
+        # messages can only be complete if they're fetched in this session
+        iscomplete = self._collector.iscomplete if self._collector else False
         if "is-complete" in self.metadata.keys():
             if not self.metadata["is-complete"]:
-                self.update_metadata({"is-complete": self.collector.iscomplete})
+                self.update_metadata({"is-complete": iscomplete})
         else:
-            self.update_metadata({"is-complete": self.collector.iscomplete})
+            self.update_metadata({"is-complete": iscomplete})
 
         if self.verbose:
             print("Reading messages... done")
@@ -301,16 +476,15 @@ class StreamAnalyser:
     def refine_data(self):
         """Refines read data"""
         self.messages = self.refiner.refine_raw_messages(
-            self._raw_messages, self.msglimit
+            self._raw_messages, self.msglimit, as_table=self.use_message_table
         )
         # we don't need raw messages anymore
         # empty them so they don't take up space
         self._raw_messages = None
         self.authors = self.refiner.get_authors()
 
-    def analyse_data(self):
-        """Analyses refined data and detects highligths"""
-        self.canalyser = chatanalyser.ChatAnalyser(
+    def _create_chat_analyser(self) -> chatanalyser.ChatAnalyser:
+        canalyser = chatanalyser.ChatAnalyser(
             log_path=self.filehandler.log_path,
             refined_messages=self.messages,
             default_context_path=self.default_context_path,
@@ -321,12 +495,22 @@ class StreamAnalyser:
             min_duration=self.min_duration,
             threshold_constant=self.threshold_constant,
             window=self.window,
-            stop_words_path=self.stop_words_path
+            stop_words_path=self.stop_words_path,
+            keyphrase_workers=self.keyphrase_workers,
+            token_store=self.token_store,
+            tokenizer=self.tokenizer,
+            context_cache_path=(
+                self.filehandler.contexts_path if self.persist_contexts else None
+            ),
         )
         if self.disable_logs:
-            self.canalyser.logger.disabled = True
-        self.canalyser.source.paths.extend(self.context_source.paths)
+            canalyser.logger.disabled = True
+        canalyser.source.paths.extend(self.context_source.paths)
+        return canalyser
 
+    def analyse_data(self):
+        """Analyses refined data and detects highligths"""
+        self.canalyser = self._create_chat_analyser()
         self.canalyser.analyse(
             levels=self.intensity_levels,
             constants=self.intensity_constants,
@@ -334,6 +518,7 @@ class StreamAnalyser:
             autofix_context_collision=True
         )
         self.highlights = self.canalyser.highlights
+        self._cache_tokens()
 
         if not self.keep_analysis_data:
             self.canalyser = None
@@ -341,11 +526,132 @@ class StreamAnalyser:
     def analyse(self):
         if not self.is_cached:
             self.collect_data()
+        if self.use_analysis_cache and self._read_cached_analysis():
+            return
         self.read_data()
         self.refine_data()
         self.enforce_integrity()
         self.fetch_missing_messages()
         self.analyse_data()
+        if self.use_analysis_cache:
+            self._cache_analysis()
+
+    def _analysis_key(self) -> str:
+        """Returns a hash of everything the analysis depends on: analysis
+        options, the message cache and the context files."""
+
+        context_paths = [self.default_context_path] if self.default_context_path else []
+        context_paths += self.context_source.paths
+        if self.stop_words_path:
+            context_paths.append(self.stop_words_path)
+        file_hashes = []
+        for path in context_paths:
+            with open(path, "rb") as f:
+                file_hashes.append([path, hashlib.sha1(f.read()).hexdigest()])
+
+        dependencies = {
+            "version": 1,
+            "msglimit": self.msglimit,
+            "min_duration": self.min_duration,
+            "window": self.window,
+            "threshold_constant": self.threshold_constant,
+            "keyword_limit": self.keyword_limit,
+            "tokenizer": self.tokenizer,
+            "keyword_filters": self.keyword_filters,
+            "intensity_levels": self.intensity_levels,
+            "intensity_constants": self.intensity_constants,
+            "intensity_colors": self.intensity_colors,
+            "messages": self.filehandler.message_cache_key(),
+            "files": file_hashes,
+        }
+        return hashlib.sha1(
+            json.dumps(dependencies, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _read_cached_analysis(self) -> bool:
+        """Loads cached highlights if the cache is intact and up to date.
+        Messages are loaded lazily.
+
+        Returns:
+            bool: If the cached highlights are loaded.
+        """
+
+        missing_files, _ = self._check_integrity()
+        if missing_files:
+            return False
+
+        metadata = self.filehandler.read_metadata() or {}
+        if not metadata.get("is-complete") and not self.offline:
+            # missing messages would be fetched otherwise
+            if not self.msglimit or self.filehandler.cached_message_amount() < self.msglimit:
+                return False
+
+        key = self._analysis_key()
+        analysis = self.filehandler.read_analysis(key)
+        if analysis is None:
+            self.logger.debug(f"No cached analysis found for {key}")
+            return False
+
+        self.metadata = {**self.metadata, **metadata}
+        self.messages = structures.LazyMessages(
+            self._load_messages, length=analysis["message_amount"]
+        )
+        self.highlights = [
+            self._load_highlight(highlight) for highlight in analysis["highlights"]
+        ]
+        self.logger.info(f"Loaded cached analysis {key}")
+        if self.verbose:
+            print("Loaded cached analysis")
+        return True
+
+    def _load_messages(self):
+        self._raw_messages = self.filehandler.read_messages()
+        self.refine_data()
+        return self.messages
+
+    def _cache_analysis(self):
+        self.filehandler.cache_analysis(self._analysis_key(), {
+            "message_amount": len(self.messages),
+            "highlights": [self._dump_highlight(highlight) for highlight in self.highlights]
+        })
+
+    @staticmethod
+    def _dump_highlight(highlight) -> dict:
+        intensity = highlight.intensity
+        return {
+            "time": highlight.time,
+            "duration": highlight.duration,
+            "fdelta": highlight.fdelta,
+            "intensity": {
+                "level": intensity.level,
+                "constant": intensity.constant,
+                "color": intensity.color,
+            } if intensity else None,
+            "keywords": highlight.keywords,
+            "kw_emotes": [asdict(emote) for emote in highlight.kw_emotes],
+            "contexts": sorted(highlight.contexts),
+            "messages": list(highlight.messages.range)
+                if isinstance(highlight.messages, structures.MessageSlice) else None,
+        }
+
+    def _load_highlight(self, data) -> structures.Highlight:
+        return structures.Highlight(
+            stream_id=self.sid,
+            time=data["time"],
+            duration=data["duration"],
+            fdelta=data["fdelta"],
+            intensity=structures.Intensity(**data["intensity"])
+                if data["intensity"] else None,
+            keywords=data["keywords"],
+            kw_emotes=[
+                structures.Emote(**{
+                    **emote, "images": [structures.Icon(**img) for img in emote["images"]]
+                }) for emote in data["kw_emotes"]
+            ],
+            contexts=set(data["contexts"]),
+            messages=structures.MessageSlice(self.messages, *data["messages"])
+                if data["messages"] else [],
+        )
 
     def _check_integrity(self, autofix=False) -> tuple[list, list]:
         return self.filehandler.check_integrity(autofix=autofix)
@@ -380,9 +686,8 @@ class StreamAnalyser:
         if self.verbose:
             print("Checking missing messages...", end="\r")
 
-        raw_messages = self.filehandler.read_messages()
-        last_time = raw_messages[-1]["time_in_seconds"]
-        current_amount = len(raw_messages)
+        last_time = self.filehandler.last_message_time() or 0
+        current_amount = self.filehandler.cached_message_amount()
 
         if not self.metadata["is-complete"] and not self.msglimit:
             target_amount = None
@@ -397,17 +702,24 @@ class StreamAnalyser:
         if self.verbose:
             print("Checking missing messages... done")
 
+        if self.offline:
+            self.logger.warning("Skipped fetching missing messages in offline mode")
+            return
+
         missing_messages = self.collector.fetch_missing_messages(
             start_time=last_time,
             current_amount=current_amount,
             target_amount=target_amount,
         )
-        self.filehandler.cache_messages(raw_messages + missing_messages)
+        self.filehandler.append_messages(missing_messages)
+        # tokens of the previous message cache are deleted
+        self._token_store = None
         self.messages = self.messages + self.refiner.refine_raw_messages(
             missing_messages
         )
         self.authors = self.authors + self.refiner.get_authors()
         self.update_metadata({"is-complete": self.collector.iscomplete})
+        self.enforce_cache_limits()
 
     def update_metadata(self, new_dict):
         """Updates both metadata file and variable"""
@@ -437,6 +749,12 @@ class StreamAnalyser:
         except Exception as e:
             self.logger.error(e.__class__.__name__ + e)
 
+    def _message_texts(self):
+        """Iterates over message texts"""
+        if isinstance(self.messages, structures.MessageTable):
+            return self.messages.texts()
+        return (msg.text for msg in self.messages)
+
     def generate_wordcloud(self, font_path=None, scale=3, background="aliceblue"):
         """Returns a basic word cloud
 
@@ -458,8 +776,11 @@ class StreamAnalyser:
         if not font_path:
             font_path = DEFAULT_FONT_PATH
 
+        # wordcloud pulls in matplotlib, so it's only imported here
+        from wordcloud import WordCloud
+
         # get all words from the chat
-        wordlist = [msg.text.replace("_", "") for msg in self.messages]
+        wordlist = [text.replace("_", "") for text in self._message_texts()]
 
         # shuffle word list to minimize the issue where repeating
         # consecutive messages merge together in the word cloud
@@ -506,14 +827,13 @@ class StreamAnalyser:
             search_phrase = search_phrase.lower()
 
         tmp_message = None
-        for original_message in self.messages:
-            tmp_message = original_message.text
+        for i, tmp_message in enumerate(self._message_texts()):
             if ignore_case:
                 tmp_message = tmp_message.lower()
             if (exact and search_phrase == tmp_message) or (
                 not exact and search_phrase in tmp_message
             ):
-                messages_to_return.append(original_message)
+                messages_to_return.append(self.messages[i])
         return messages_to_return
 
     def find_user_messages(self, username=None, id=None) -> list:
@@ -544,6 +864,14 @@ class StreamAnalyser:
             self.logger.warning("Should only provide one argument. Moving on with id.")
             username = None
 
+        if isinstance(self.messages, structures.MessageTable):
+            author_indices = [
+                i for i, author in enumerate(self.messages.authors)
+                if (id and author.id == id) or (username and author.name == username)
+            ]
+            rows = np.flatnonzero(np.isin(self.messages.author_index, author_indices))
+            return [self.messages[row] for row in rows]
+
         messages_to_return = []
         for message in self.messages:
             if (id and message.author.id == id) or (
@@ -577,8 +905,8 @@ class StreamAnalyser:
             exclude = list(exclude)
 
         words = []
-        for message in self.messages:
-            words.extend(message.text.split(" "))
+        for text in self._message_texts():
+            words.extend(text.split(" "))
 
         if normalize:
             words = [utils.normalize(word) for word in words]
@@ -648,16 +976,7 @@ class StreamAnalyser:
         self.filehandler.create_dir_if_not_exists(target_path)
 
         # export messages
-        self.filehandler._decompress_file(
-            os.path.join(self.filehandler.sid_path, self.filehandler.message_fname)
-        )
-        copyfile(
-            src=os.path.join(self.filehandler.sid_path, self.filehandler.message_fname),
-            dst=os.path.join(target_path, self.filehandler.message_fname),
-        )
-        self.filehandler._compress_file(
-            os.path.join(self.filehandler.sid_path, self.filehandler.message_fname)
-        )
+        self.filehandler.export_messages(target_path)
         self.logger.info("Exported messages")
 
         # export metadata
@@ -671,7 +990,7 @@ class StreamAnalyser:
 
         # export thumbnail
         self.filehandler.download_thumbnail(
-            self.collector.get_thumbnail_url(self.thumb_res_lvl),
+            datacollector.get_thumbnail_url(self.sid, self.thumb_res_lvl),
             os.path.join(target_path, self.filehandler.thumbnail_fname),
         )
         self.logger.info("Exported thumbnail")
@@ -826,6 +1145,14 @@ class StreamAnalyser:
         self.filehandler.open_cache_folder(self.sid)
 
     def show_graph(self):
+        if self.canalyser is None:
+            # highlights might be loaded from the cache, or the analysis
+            # data might not be kept. Only the graph data is calculated.
+            self.canalyser = self._create_chat_analyser()
+            self.canalyser.get_frequency()
+            self.canalyser.calculate_moving_average()
+            self.canalyser.smoothen_mov_avg()
+            self.canalyser.create_highlight_annotation()
         self.canalyser.draw_graph(self.metadata["title"])
         self.fig = self.canalyser.fig
         self.fig.show()
@@ -0,0 +1,136 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+from contextlib import redirect_stdout
+from functools import partial
+from unittest import mock
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamanalyser.batchanalyser import BatchAnalyser, _call_with_timeout
+from streamanalyser.modules import cli
+from streamanalyser.modules.filehandler import FileHandler
+
+
+class TestBatchAnalyser(unittest.TestCase):
+    def setUp(self):
+        warnings.simplefilter("ignore", category=ResourceWarning)
+        self.storage_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_path, ignore_errors=True)
+
+    def cache_stream(self, sid):
+        """Caches a complete stream with a burst of messages"""
+        filehandler = FileHandler(self.storage_path)
+        filehandler.logger.disabled = True
+        filehandler.create_cache_dir(sid)
+        messages = []
+        for second in range(60):
+            amount = 12 if 20 <= second < 30 else 1
+            for _ in range(amount):
+                messages.append({
+                    "message_id": str(len(messages)),
+                    "message_type": "text_message",
+                    "message": "lol www" if amount > 1 else "hello",
+                    "time_in_seconds": second,
+                    "author": {"id": str(second), "name": "name" + str(second), "images": []},
+                })
+        filehandler.cache_messages(messages)
+        filehandler.cache_metadata({"title": "cached stream", "is-complete": True})
+        filehandler.cache_video_info(
+            {"status": "past", "duration": 60.0, "has_chat_replay": True}
+        )
+        filehandler.index.close()
+        return messages
+
+    def test_analyse(self):
+        batch_analyser = BatchAnalyser(
+            ["testid1", "testid2", "testid1"],
+            workers=2,
+            storage_path=self.storage_path,
+            disable_logs=True,
+            offline=True,
+        )
+        batch_analyser.logger.disabled = True
+        results = batch_analyser.analyse()
+
+        # streams are not cached, so they can't be analysed offline
+        self.assertEqual([result["id"] for result in results], ["testid1", "testid2", "testid1"])
+        self.assertTrue(all(result["status"] == "error" for result in results))
+        self.assertTrue(results[0]["error"].startswith("OfflineModeError"))
+
+        summary = batch_analyser.summary().splitlines()
+        self.assertEqual(len(summary), 4)
+        self.assertTrue(summary[0].startswith("ID"))
+        self.assertTrue(summary[1].startswith("testid1  error"))
+
+    def test_analyse_cached(self):
+        messages = self.cache_stream("cachedid")
+        batch_analyser = BatchAnalyser(
+            workers=1,
+            storage_path=self.storage_path,
+            disable_logs=True,
+            offline=True,
+            tokenizer="rule",
+        )
+        batch_analyser.logger.disabled = True
+        self.assertEqual(batch_analyser.sids, ["cachedid"])
+        results = batch_analyser.analyse()
+
+        self.assertEqual(len(results), 1)
+        result = results[0]
+        self.assertEqual(result["status"], "ok", result["error"])
+        self.assertEqual(result["title"], "cached stream")
+        self.assertEqual(result["message_amount"], len(messages))
+        self.assertGreaterEqual(len(result["highlights"]), 1)
+        # the burst of messages should be in a highlight
+        self.assertTrue(any(
+            hl["time"] <= 20 and hl["time"] + hl["duration"] >= 30
+            for hl in result["highlights"]
+        ))
+        self.assertTrue(all(hl["message_amount"] for hl in result["highlights"]))
+
+        summary = batch_analyser.summary().splitlines()
+        self.assertEqual(len(summary), 2)
+        self.assertEqual(
+            summary[1].split()[:4],
+            ["cachedid", "ok", str(len(messages)), str(len(result["highlights"]))],
+        )
+        self.assertTrue(summary[1].endswith("cached stream"))
+
+    def test_cli_batch_cached(self):
+        self.cache_stream("cachedid")
+        argv = ["streamanalyser", "--batch-cached", "--workers", "1", "--tokenizer", "rule", "-s"]
+        # the CLI always uses the default storage path
+        batch_analyser = partial(BatchAnalyser, storage_path=self.storage_path, offline=True)
+        output = io.StringIO()
+        with mock.patch.object(sys, "argv", argv), mock.patch.object(
+            cli.sa, "BatchAnalyser", batch_analyser
+        ), redirect_stdout(output):
+            cli.main()
+        summary = output.getvalue().splitlines()
+        self.assertTrue(summary[0].startswith("ID"))
+        self.assertEqual(summary[1].split()[:2], ["cachedid", "ok"])
+
+    def test_cached_ids(self):
+        batch_analyser = BatchAnalyser(storage_path=self.storage_path)
+        batch_analyser.logger.disabled = True
+        self.assertEqual(batch_analyser.sids, [])
+        self.assertEqual(batch_analyser.analyse(), [])
+
+    @unittest.skipIf(sys.platform == "win32", "Timeouts are not supported on Windows")
+    def test_call_with_timeout(self):
+        self.assertEqual(_call_with_timeout(lambda: 1, 1), 1)
+        with self.assertRaises(TimeoutError):
+            _call_with_timeout(lambda: time.sleep(2), 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,19 @@ import json
 import os
 import unittest
 import random
+import shutil
+import tempfile
 import warnings
 
 from modules.chatanalyser import ChatAnalyser, Fore
+from modules.contextmatcher import ContextMatcher, ContextRegistry
+from modules.tokenstore import TokenStore
+from modules.keyphrase_finder import TOKENIZERS, load_nltk
 from modules.structures import (
+    Highlight,
     Intensity,
     Message,
+    MessageTable,
     Author,
     Context,
     Trigger
@@ -23,6 +30,14 @@ from modules.exceptions import (
 )
 
 
+def punkt_available() -> bool:
+    try:
+        load_nltk().word_tokenize("test")
+    except LookupError:
+        return False
+    return True
+
+
 def generate_random_chat(size, seed, density=0):
     random.seed(seed)
     sample_messages = []
@@ -153,6 +168,22 @@ class TestChatAnalyser(unittest.TestCase):
         }
         self.assertEqual(result, expected)
 
+    def test_get_frequency_negative_times(self):
+        self.canalyser = ChatAnalyser(
+            [
+                Message(id=str(i), text="msg", time=time, author=Author(id="u", name="usr"))
+                for i, time in enumerate([-10, -10, -3, 1, 3, 3])
+            ],
+            log_path=None,
+            default_context_path=None,
+        )
+        # only negative seconds that have messages are kept
+        result = self.canalyser.get_frequency()
+        self.assertEqual(result, {-10: 2, -3: 1, 0: 0, 1: 1, 2: 0, 3: 2})
+        self.assertEqual(result.seconds.tolist(), [-10, -3, 0, 1, 2, 3])
+        self.assertNotIn(-5, result)
+        self.assertEqual(list(self.canalyser.calculate_moving_average()), list(result))
+
     def test_init_intesity(self):
         result = self.canalyser.init_intensity(
             ["low", "medium", "high", "very high"],
@@ -372,6 +403,75 @@ class TestChatAnalyser(unittest.TestCase):
 
         self.assertEqual(result, expected)
 
+    def test_get_highlight_messages_boundary(self):
+        messages = [
+            Message(id=str(time), text="msg", time=time, author=Author(id="u", name="usr"))
+            for time in (0, 1, 2, 3, 6, 7, 9)
+        ]
+        self.canalyser = ChatAnalyser(messages, log_path=None, default_context_path=None)
+        self.canalyser.highlights = [Highlight("testid", 1, 3), Highlight("testid", 5, 3)]
+        highlights = self.canalyser.get_highlight_messages()
+
+        # the message that comes after the first highlight ends
+        # is in the second highlight
+        self.assertEqual([msg.time for msg in highlights[0].messages], [2, 3])
+        self.assertEqual([msg.time for msg in highlights[1].messages], [6, 7])
+
+    def test_analyse_message_table(self):
+        messages = generate_random_chat(100, 101, 10)
+        for message in messages:
+            message.id = str(message.id)
+        self.canalyser = ChatAnalyser(messages, log_path=None, window=5, default_context_path=None)
+        table_analyser = ChatAnalyser(MessageTable(messages), log_path=None, window=5, default_context_path=None)
+        for analyser in (self.canalyser, table_analyser):
+            analyser.get_frequency()
+            analyser.calculate_moving_average()
+            analyser.smoothen_mov_avg()
+            analyser.create_highlight_annotation()
+            analyser.detect_highlight_times()
+            analyser.correct_highlights()
+            analyser.get_highlight_messages()
+
+        self.assertEqual(table_analyser.frequency, self.canalyser.frequency)
+        self.assertEqual(
+            [(hl.time, hl.duration, hl.messages.range) for hl in table_analyser.highlights],
+            [(hl.time, hl.duration, hl.messages.range) for hl in self.canalyser.highlights],
+        )
+        self.assertEqual(
+            [list(hl.messages) for hl in table_analyser.highlights],
+            [list(hl.messages) for hl in self.canalyser.highlights],
+        )
+
+    def test_sweep(self):
+        chat = generate_random_chat(300, 101, 10)
+        self.canalyser = ChatAnalyser(chat, log_path=None, default_context_path=None)
+        results = self.canalyser.sweep(
+            windows=[5, 30],
+            smoothing_widths=[10, 40],
+            min_durations=[0, 5],
+            threshold_constants=[2, 3],
+        )
+        self.assertEqual(len(results), 16)
+
+        for result in results:
+            canalyser = ChatAnalyser(
+                chat, log_path=None, default_context_path=None, **result.params
+            )
+            canalyser.get_frequency()
+            canalyser.calculate_moving_average()
+            canalyser.smoothen_mov_avg()
+            canalyser.create_highlight_annotation()
+            canalyser.detect_highlight_times()
+            canalyser.correct_highlights()
+            self.assertEqual(
+                [(hl.time, hl.duration, hl.fdelta) for hl in result.highlights],
+                [(hl.time, hl.duration, hl.fdelta) for hl in canalyser.highlights],
+            )
+            self.assertEqual(result.highlight_amount, len(canalyser.highlights))
+
+        with self.assertRaises(ValueError):
+            self.canalyser.sweep(windows=[1])
+
     def test_get_highlight_keywords(self):
         self.canalyser = ChatAnalyser(generate_random_chat(100, 101, 10), log_path=None, window=5, default_context_path=None)
         self.canalyser.get_frequency()
@@ -395,6 +495,47 @@ class TestChatAnalyser(unittest.TestCase):
         
         self.assertEqual(result, expected)
 
+    def test_get_highlight_keyphrases_in_pool(self):
+        for tokenizer in TOKENIZERS:
+            with self.subTest(tokenizer=tokenizer):
+                if tokenizer == "nltk" and not punkt_available():
+                    self.skipTest("NLTK punkt tokenizer data is not available")
+                self._test_get_highlight_keyphrases_in_pool(tokenizer)
+
+    def _test_get_highlight_keyphrases_in_pool(self, tokenizer):
+        results = []
+        token_store = TokenStore()
+        for keyphrase_workers, store in ((1, None), (2, None), (2, token_store), (1, token_store)):
+            self.canalyser = ChatAnalyser(
+                generate_random_chat(300, 101, 10),
+                log_path=None,
+                window=5,
+                default_context_path=None,
+                keyphrase_workers=keyphrase_workers,
+                token_store=store,
+                tokenizer=tokenizer,
+            )
+            self.canalyser.get_frequency()
+            self.canalyser.calculate_moving_average()
+            self.canalyser.smoothen_mov_avg()
+            self.canalyser.create_highlight_annotation()
+            self.canalyser.detect_highlight_times()
+            self.canalyser.correct_highlights()
+            self.canalyser.init_intensity()
+            self.canalyser.set_highlight_intensities()
+            self.canalyser.get_highlight_messages()
+            self.canalyser.get_highlight_keyphrases()
+            results.append([(hl.time, hl.keywords, hl.kw_emotes) for hl in self.canalyser.highlights])
+        self.assertGreaterEqual(len(results[0]), 4)
+        for result in results[1:]:
+            self.assertEqual(results[0], result)
+        self.assertIn(f"keyphrase-{tokenizer}", token_store._kinds)
+
+        with self.assertRaises(ValueError):
+            ChatAnalyser([], log_path=None, default_context_path=None, keyphrase_workers=0)
+        with self.assertRaises(ValueError):
+            ChatAnalyser([], log_path=None, default_context_path=None, tokenizer="invalid")
+
     def test_guess_context(self):
         self.canalyser = ChatAnalyser(
             generate_random_chat(100, 101, 10),
@@ -438,6 +579,65 @@ class TestChatAnalyser(unittest.TestCase):
         except:
             self.assertEqual(result, expected2)
 
+    def test_context_matcher(self):
+        contexts = [
+            Context("funny", [Trigger("lol", False), Trigger("w", True)]),
+            Context("cute", [Trigger("kawaii", False), Trigger("かわいい", False)]),
+            Context("scary", [Trigger("ah", False), Trigger("ahh", False)]),
+            Context("emote", [Trigger(":_hello:", True)]),
+        ]
+        matcher = ContextMatcher(contexts)
+        self.assertEqual(matcher.match("lolol"), {"funny"})
+        self.assertEqual(matcher.match("w"), {"funny"})
+        self.assertEqual(matcher.match("ww"), set())
+        self.assertEqual(matcher.match("kawaiiiiahh"), {"cute", "scary"})
+        self.assertEqual(matcher.match("めっちゃかわいい"), {"cute"})
+        self.assertEqual(matcher.match(":_hello:"), {"emote"})
+        self.assertEqual(matcher.match("hello"), set())
+
+        # empty phrases match every keyword
+        matcher = ContextMatcher([Context("any", [Trigger("", False)])])
+        self.assertEqual(matcher.match(""), {"any"})
+        self.assertEqual(matcher.match("anything"), {"any"})
+
+    def test_context_registry(self):
+        tmp_path = tempfile.mkdtemp()
+        try:
+            context_path = os.path.join(tmp_path, "contexts.json")
+            shutil.copyfile(SAMPLE_CONTEXT_PATH, context_path)
+            persist_path = os.path.join(tmp_path, "contexts.pickle")
+            calls = []
+
+            def compile():
+                calls.append(1)
+                canalyser = ChatAnalyser([], log_path=None, default_context_path=context_path)
+                canalyser.read_contexts_from_sources()
+                contexts = canalyser.parse_contexts()
+                return contexts, ContextMatcher(contexts)
+
+            registry = ContextRegistry(persist_path)
+            contexts, _ = registry.get([context_path], compile)
+            self.assertIs(registry.get([context_path], compile)[0], contexts)
+            self.assertEqual(len(calls), 1)
+
+            # other processes load the persisted contexts
+            contexts, matcher = ContextRegistry(persist_path).get([context_path], compile)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(
+                [context.reaction_to for context in contexts],
+                [context["reaction_to"] for context in sample_contexts],
+            )
+            self.assertEqual(matcher.match("msg6"), {"reaction1"})
+
+            # changed sources are compiled again
+            with open(context_path, "w", encoding="utf-8") as f:
+                json.dump(sample_contexts[:1], f)
+            contexts, _ = registry.get([context_path], compile)
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(len(contexts), 1)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
     def test_get_highlights(self):
         self.canalyser = ChatAnalyser(
             generate_random_chat(100, 101, 10),
@@ -1,7 +1,11 @@
 import unittest
 import warnings
+from threading import Lock
+
+from chat_downloader import errors
 
 from modules.datacollector import DataCollector
+from modules.exceptions import StreamIsLiveOrUpcomingError
 
 
 # TODO Fix:
@@ -47,5 +51,100 @@ class TestDataCollector(unittest.TestCase):
         del self.collector
 
 
+class FakeChatDownloader:
+    """Serves canned messages like `ChatDownloader` does."""
+
+    calls = []
+    lock = Lock()
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    def get_chat(self, url, start_time=None, end_time=None, max_messages=None, **kwargs):
+        with self.lock:
+            self.calls.append((start_time, end_time))
+        for message in self.messages:
+            if start_time is not None and message["time_in_seconds"] < start_time:
+                continue
+            if end_time is not None and message["time_in_seconds"] > end_time:
+                break
+            yield message
+
+
+class TestOfflineDataCollector(unittest.TestCase):
+    def test_fetch_raw_messages_sharded(self):
+        collector = self._create_collector(shards=4)
+        raw_messages = collector.fetch_raw_messages()
+
+        self.assertEqual(len(FakeChatDownloader.calls), 4)
+        self.assertEqual(
+            sorted(FakeChatDownloader.calls, key=lambda r: r[0]),
+            [(0, 25), (25, 50), (50, 75), (75, None)],
+        )
+        self.assertEqual(
+            [msg["message_id"] for msg in raw_messages],
+            [msg["message_id"] for msg in self.sample_raw_messages[:-1]],
+        )
+        self.assertTrue(collector.iscomplete)
+
+    def test_fetch_raw_messages_sequential(self):
+        # should not shard when there's a message limit
+        collector = self._create_collector(shards=4, msglimit=10)
+        raw_messages = collector.fetch_raw_messages()
+        self.assertEqual(FakeChatDownloader.calls, [(0, None)])
+        self.assertEqual(raw_messages[-1]["message_id"], "9")
+        self.assertFalse(collector.iscomplete)
+
+    def test_get_shard_ranges(self):
+        collector = self._create_collector(shards=3)
+        self.assertEqual(collector._get_shard_ranges(10), [(0, 3), (3, 7), (7, None)])
+        self.assertEqual(collector._get_shard_ranges(1), [(0, None)])
+
+    def test_video_info(self):
+        collector = self._create_collector(shards=1)
+        self.assertEqual(collector._get_video_duration(), 100)
+
+        self.sample_video_info["has_chat_replay"] = False
+        with self.assertRaises(errors.NoChatReplay):
+            self._create_collector(shards=1)
+
+        self.sample_video_info["status"] = "upcoming"
+        with self.assertRaises(StreamIsLiveOrUpcomingError):
+            self._create_collector(shards=1)
+
+    def _create_collector(self, shards, msglimit=None):
+        collector = DataCollector(
+            "testid",
+            log_path=None,
+            msglimit=msglimit,
+            shards=shards,
+            downloader=lambda: FakeChatDownloader(self.sample_raw_messages),
+            video_info=self.sample_video_info,
+        )
+        collector.logger.disabled = True
+        collector.metadata = {"duration": 100}
+        FakeChatDownloader.calls = []
+        return collector
+
+    def setUp(self):
+        self.sample_video_info = {
+            "status": "past",
+            "duration": 100.0,
+            "has_chat_replay": True,
+        }
+        # two messages per second, and one that is
+        # written after the stream ends
+        self.sample_raw_messages = [{
+            "message_id": str(i),
+            "message_type": "text_message",
+            "message": "msg" + str(i),
+            "time_in_seconds": i // 2,
+            "author": {"id": str(i), "name": "name" + str(i), "images": []},
+        } for i in range(200)]
+        self.sample_raw_messages.append(
+            dict(self.sample_raw_messages[-1], message_id="200", time_in_seconds=500)
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,7 @@ import unittest
 import warnings
 
 from modules.datarefiner import DataRefiner
-from modules.structures import Icon, Message, Author
+from modules.structures import Icon, Message, MessageTable, Author
 
 
 class TestDataRefiner(unittest.TestCase):
@@ -24,6 +24,53 @@ class TestDataRefiner(unittest.TestCase):
         )
         self.assertEqual(result_messages, [])
 
+    def test_refine_raw_messages_as_table(self):
+        result_messages = self.refiner.refine_raw_messages(
+            self.sample_raw_messages, as_table=True
+        )
+        self.assertIsInstance(result_messages, MessageTable)
+        self.assertEqual(list(result_messages), self.expected_messages)
+        self.assertEqual(result_messages.time.tolist(), list(range(6)))
+        self.assertEqual(result_messages.authors, self.expected_authors)
+
+        # w/ limit
+        result_messages = self.refiner.refine_raw_messages(
+            self.sample_raw_messages, msglimit=3, as_table=True
+        )
+        self.assertEqual(result_messages[:], self.expected_messages[:3])
+        self.assertEqual(result_messages[-1], self.expected_messages[2])
+
+        # extending the table should keep the order
+        extended = result_messages + self.expected_messages[3:]
+        self.assertEqual(list(extended), self.expected_messages)
+        self.assertEqual(len(result_messages), 3)
+
+    def test_refine_raw_messages_interning(self):
+        raw_messages = [
+            dict(raw_message, author=dict(self.sample_raw_messages[0]["author"]))
+            for raw_message in self.sample_raw_messages
+        ]
+        # author changes their name mid-stream
+        raw_messages[-1]["author"]["name"] = "new name"
+
+        result_messages = self.refiner.refine_raw_messages(raw_messages)
+        self.assertIs(result_messages[0].author, result_messages[4].author)
+        self.assertIsNot(result_messages[0].author, result_messages[5].author)
+        self.assertEqual(result_messages[5].author.name, "new name")
+        self.assertIs(
+            result_messages[0].author.images["profile"][0],
+            result_messages[5].author.images["profile"][0],
+        )
+        self.assertEqual(len(self.refiner.get_authors()), 2)
+        # 4 authors with their icons + 1 icon of the renamed author
+        self.assertEqual(self.refiner.saved_object_amount, 4*2 + 1)
+
+        # interned objects persist across calls
+        self.assertIs(
+            self.refiner.refine_raw_messages(raw_messages[:1])[0].author,
+            result_messages[0].author
+        )
+
     def test_get_authors(self):
         result_authors = self.refiner.get_authors()
         self.assertEqual(result_authors, [])
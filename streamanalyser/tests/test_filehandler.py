@@ -0,0 +1,395 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+import threading
+import warnings
+from unittest import mock
+
+import numpy as np
+
+from modules.filehandler import FileHandler
+
+
+def _hold_lock(storage_path, sid, ready, release):
+    filehandler = FileHandler(storage_path)
+    filehandler.logger.disabled = True
+    with filehandler.lock(os.path.join(filehandler.cache_path, sid), shared=True):
+        ready.set()
+        release.wait(10)
+
+
+class TestFileHandler(unittest.TestCase):
+    def setUp(self):
+        warnings.simplefilter("ignore", category=ResourceWarning)
+        self.storage_path = tempfile.mkdtemp()
+        self.filehandler = FileHandler(self.storage_path)
+        self.filehandler.logger.disabled = True
+        self.filehandler.create_cache_dir("testid")
+
+        self.sample_raw_messages = [{
+            "message_id": str(i),
+            "message_type": "text_message",
+            "message": "msg" + str(i) + " テスト\nnew line",
+            "time_in_seconds": i,
+            "author": {"id": str(i), "name": "name" + str(i), "images": []},
+        } for i in range(5)]
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_path, ignore_errors=True)
+
+    def _message_path(self):
+        return os.path.join(
+            self.filehandler.sid_path, self.filehandler.message_fname + ".gz"
+        )
+
+    def test_cache_messages(self):
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.assertTrue(os.path.isfile(self._message_path()))
+        self.assertFalse(os.path.isfile(self._message_path()[:-3]))
+
+        # one message per line
+        with gzip.open(self._message_path(), "rt", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0]), self.sample_raw_messages[0])
+
+    def test_read_messages(self):
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        fnames = sorted(os.listdir(self.filehandler.sid_path))
+        self.assertEqual(self.filehandler.read_messages(), self.sample_raw_messages)
+
+        # reading should not touch the cache
+        self.assertEqual(fnames, ["manifest.json", "messages.json.gz"])
+        self.assertEqual(sorted(os.listdir(self.filehandler.sid_path)), fnames)
+
+        # generator input
+        self.filehandler.cache_messages(msg for msg in self.sample_raw_messages[:2])
+        self.assertEqual(
+            list(self.filehandler.iter_messages()), self.sample_raw_messages[:2]
+        )
+
+        # empty cache
+        self.filehandler.cache_messages([])
+        self.assertEqual(self.filehandler.read_messages(), [])
+
+    def test_read_legacy_messages(self):
+        with gzip.open(self._message_path(), "wt", encoding="utf-8") as f:
+            f.write(json.dumps(self.sample_raw_messages, ensure_ascii=False, indent=4))
+        self.assertEqual(self.filehandler.read_messages(), self.sample_raw_messages)
+
+    def test_append_messages(self):
+        self.filehandler.cache_messages(self.sample_raw_messages[:3])
+        size = os.path.getsize(self._message_path())
+        self.filehandler.append_messages(self.sample_raw_messages[3:])
+        self.filehandler.append_messages([])
+
+        # existing data should stay as is
+        self.assertGreater(os.path.getsize(self._message_path()), size)
+        self.assertEqual(self.filehandler.read_messages(), self.sample_raw_messages)
+        segments = self.filehandler.read_manifest()["segments"]
+        self.assertEqual(
+            [(segment["count"], segment["last_time"]) for segment in segments],
+            [(3, 2), (2, 4), (0, None)],
+        )
+        self.assertEqual(segments[-1]["end"], os.path.getsize(self._message_path()))
+        self.assertEqual(self.filehandler.cached_message_amount(), 5)
+        self.assertEqual(self.filehandler.last_message_time(), 4)
+
+        # overwriting should reset the manifest
+        self.filehandler.cache_messages(self.sample_raw_messages[:1])
+        self.assertEqual(self.filehandler.cached_message_amount(), 1)
+        self.assertEqual(self.filehandler.last_message_time(), 0)
+
+    def test_append_messages_legacy(self):
+        with gzip.open(self._message_path(), "wt", encoding="utf-8") as f:
+            f.write(json.dumps(self.sample_raw_messages[:3], indent=4))
+        self.assertEqual(self.filehandler.cached_message_amount(), 3)
+        self.assertEqual(self.filehandler.last_message_time(), 2)
+
+        # legacy caches are keyed without reading the messages
+        with mock.patch.object(
+            self.filehandler, "iter_messages", side_effect=AssertionError
+        ):
+            key = self.filehandler.message_cache_key()
+            self.assertEqual(self.filehandler.message_cache_key(), key)
+
+        # manifest is only written by appends
+        manifest_path = os.path.join(self.filehandler.sid_path, self.filehandler.manifest_fname)
+        self.assertFalse(os.path.isfile(manifest_path))
+        self.filehandler.append_messages(self.sample_raw_messages[3:])
+        self.assertEqual(self.filehandler.read_messages(), self.sample_raw_messages)
+        self.assertEqual(self.filehandler.cached_message_amount(), 5)
+        self.assertTrue(os.path.isfile(manifest_path))
+        self.assertNotEqual(self.filehandler.message_cache_key(), key)
+
+    def test_interrupted_append(self):
+        self.filehandler.cache_messages(self.sample_raw_messages[:3])
+        member = gzip.compress(
+            "".join(json.dumps(msg) + "\n" for msg in self.sample_raw_messages[3:]).encode()
+        )
+        with open(self._message_path(), "ab") as f:
+            f.write(member[: len(member) // 2])
+
+        # readers should stop at the last committed segment
+        self.assertEqual(self.filehandler.read_messages(), self.sample_raw_messages[:3])
+        target_path = os.path.join(self.storage_path, "export")
+        os.makedirs(target_path)
+        self.filehandler.export_messages(target_path)
+        with open(
+            os.path.join(target_path, self.filehandler.message_fname), encoding="utf-8"
+        ) as f:
+            self.assertEqual(json.load(f), self.sample_raw_messages[:3])
+
+        # a segment that is written but not recorded in the manifest
+        with open(self._message_path(), "ab") as f:
+            f.write(member[len(member) // 2 :] + member)
+        self.assertEqual(self.filehandler.read_messages(), self.sample_raw_messages[:3])
+        self.filehandler.append_messages(self.sample_raw_messages[3:])
+        self.assertEqual(self.filehandler.read_messages(), self.sample_raw_messages)
+
+    def test_tokens(self):
+        self.assertIsNone(self.filehandler.read_tokens())
+        self.filehandler.cache_messages(self.sample_raw_messages[:3])
+        key = self.filehandler.message_cache_key()
+        self.filehandler.cache_tokens({"tokens": np.arange(3)})
+        self.assertEqual(self.filehandler.read_tokens()["tokens"].tolist(), [0, 1, 2])
+        self.assertEqual(self.filehandler.message_cache_key(), key)
+
+        # tokens are deleted when the message cache changes
+        self.filehandler.append_messages(self.sample_raw_messages[3:])
+        self.assertIsNone(self.filehandler.read_tokens())
+        self.assertNotEqual(self.filehandler.message_cache_key(), key)
+
+    def test_lock(self):
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.create_cache_dir("other")
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.create_cache_dir("third")
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.create_cache_dir("testid")
+        other_path = os.path.join(self.filehandler.cache_path, "other")
+        third_path = os.path.join(self.filehandler.cache_path, "third")
+
+        # another process is using the stream
+        ready, release = multiprocessing.Event(), multiprocessing.Event()
+        process = multiprocessing.Process(
+            target=_hold_lock, args=(self.storage_path, "other", ready, release)
+        )
+        process.start()
+        try:
+            self.assertTrue(ready.wait(10))
+            lock = self.filehandler.lock(other_path)
+            self.assertFalse(lock.acquire(blocking=False))
+            # the next stream is evicted instead of the one in use
+            self.assertEqual(self.filehandler.enforce_cache_limits(max_amount=2), ["third"])
+            self.assertTrue(os.path.isdir(other_path))
+            self.assertFalse(os.path.isdir(third_path))
+            self.assertEqual(self.filehandler.enforce_cache_limits(max_amount=1), [])
+            self.assertTrue(os.path.isdir(other_path))
+            # shared locks don't block each other
+            with self.filehandler.lock(other_path, shared=True):
+                self.assertEqual(
+                    list(self.filehandler.iter_messages(other_path)),
+                    self.sample_raw_messages,
+                )
+        finally:
+            release.set()
+            process.join(10)
+        self.assertEqual(self.filehandler.enforce_cache_limits(max_amount=1), ["other"])
+        self.assertFalse(os.path.isdir(other_path))
+
+    def test_lock_threads(self):
+        other_path = os.path.join(self.filehandler.cache_path, "other")
+        self.filehandler.create_dir_if_not_exists(other_path)
+        ready, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with self.filehandler.lock(other_path, shared=True):
+                ready.set()
+                release.wait(10)
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            self.assertTrue(ready.wait(10))
+            lock = self.filehandler.lock(other_path, shared=True)
+            self.assertFalse(lock.acquire(blocking=False))
+        finally:
+            release.set()
+            thread.join(10)
+        # locks are reentrant within a thread
+        with self.filehandler.lock(other_path):
+            lock = self.filehandler.lock(other_path)
+            self.assertTrue(lock.acquire(blocking=False))
+            lock.release()
+
+    def test_video_info(self):
+        self.assertIsNone(self.filehandler.read_video_info())
+        video_info = {"status": "past", "duration": 100.0, "has_chat_replay": True}
+        self.filehandler.cache_video_info(video_info)
+        self.assertEqual(self.filehandler.read_video_info(), video_info)
+
+    def test_check_integrity(self):
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.cache_metadata({})
+        self.filehandler.cache_video_info({})
+        with open(os.path.join(self.filehandler.sid_path, "dummy.txt"), "w"):
+            pass
+        missing_files, unnecessary_files = self.filehandler.check_integrity()
+        self.assertEqual(missing_files, [])
+        self.assertEqual(unnecessary_files, ["dummy.txt"])
+
+    def test_export_messages(self):
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        target_path = os.path.join(self.storage_path, "export")
+        os.makedirs(target_path)
+        self.filehandler.export_messages(target_path)
+        with open(
+            os.path.join(target_path, self.filehandler.message_fname), encoding="utf-8"
+        ) as f:
+            self.assertEqual(json.load(f), self.sample_raw_messages)
+        self.assertTrue(os.path.isfile(self._message_path()))
+
+        # empty caches are exported as an empty array
+        self.filehandler.cache_messages([])
+        self.filehandler.export_messages(target_path)
+        with open(
+            os.path.join(target_path, self.filehandler.message_fname), encoding="utf-8"
+        ) as f:
+            self.assertEqual(json.load(f), [])
+
+    def test_index(self):
+        index = self.filehandler.index
+        self.assertIn("testid", index)
+        self.assertIsNone(index.get("testid")["message_count"])
+        self.assertEqual(self.filehandler.get_cached_ids(), [])
+
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.cache_metadata({"is-complete": True})
+        entry = index.get("testid")
+        self.assertEqual(entry["message_count"], 5)
+        self.assertEqual(entry["complete"], 1)
+        self.assertEqual(entry["size"], sum(
+            os.path.getsize(os.path.join(self.filehandler.sid_path, fname))
+            for fname in os.listdir(self.filehandler.sid_path)
+        ))
+        self.assertEqual(self.filehandler.get_cached_ids(), ["testid"])
+        self.assertEqual(self.filehandler.dir_amount(self.filehandler.cache_path), 1)
+
+    def test_index_eviction(self):
+        for sid in ("first", "second", "third"):
+            self.filehandler.create_cache_dir(sid)
+            self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.create_cache_dir("first")
+        self.filehandler.read_messages()
+        self.filehandler.create_cache_dir("testid")
+
+        self.assertEqual(self.filehandler.least_recently_used_folder(), "second")
+        self.assertEqual(self.filehandler.most_recently_used_folder(), "first")
+        self.assertEqual(self.filehandler.oldest_folder(), "first")
+        self.assertNotEqual(self.filehandler.random_folder(), "testid")
+
+        self.filehandler.clear_cache("lru")
+        self.assertFalse(os.path.isdir(os.path.join(self.filehandler.cache_path, "second")))
+        self.assertNotIn("second", self.filehandler.index)
+        self.assertEqual(self.filehandler.get_cached_ids(), ["first", "third"])
+
+    def test_rebuild_index(self):
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.index.close()
+        os.remove(self.filehandler.index_path)
+
+        filehandler = FileHandler(self.storage_path)
+        filehandler.logger.disabled = True
+        self.assertEqual(filehandler.get_cached_ids(), ["testid"])
+        self.assertEqual(filehandler.index.get("testid")["message_count"], 5)
+
+    def test_reconcile_index(self):
+        self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.create_cache_dir("deleted")
+        self.filehandler.index.close()
+        # folders are copied and deleted by hand
+        cache_path = self.filehandler.cache_path
+        shutil.copytree(
+            os.path.join(cache_path, "testid"), os.path.join(cache_path, "copied")
+        )
+        shutil.rmtree(os.path.join(cache_path, "deleted"))
+
+        filehandler = FileHandler(self.storage_path)
+        filehandler.logger.disabled = True
+        self.assertEqual(filehandler.index.ids(), ["copied", "testid"])
+        self.assertEqual(filehandler.index.get("copied")["message_count"], 5)
+        self.assertEqual(
+            filehandler.index.get("copied")["size"],
+            filehandler.index.get("testid")["size"],
+        )
+
+    def test_enforce_cache_limits(self):
+        sizes = {}
+        for sid, amount in (("small", 1), ("large", 1000), ("medium", 100)):
+            self.filehandler.create_cache_dir(sid)
+            self.filehandler.cache_messages(self.sample_raw_messages * amount)
+            sizes[sid] = self.filehandler.index.get(sid)["size"]
+        self.filehandler.create_cache_dir("testid")
+        self.assertEqual(
+            self.filehandler.index.total_size(), sum(sizes.values())
+        )
+
+        self.assertEqual(self.filehandler.enforce_cache_limits(max_amount=4), [])
+        self.assertEqual(
+            self.filehandler.enforce_cache_limits(
+                max_bytes=sizes["large"] + sizes["medium"]
+            ),
+            ["small"],
+        )
+        self.assertFalse(os.path.isdir(os.path.join(self.filehandler.cache_path, "small")))
+        self.assertEqual(
+            self.filehandler.enforce_cache_limits(
+                max_bytes=sizes["medium"], cache_deletion_algorithm="gds"
+            ),
+            ["large"],
+        )
+        self.assertGreater(self.filehandler.index.inflation, 0)
+        self.assertEqual(
+            self.filehandler.enforce_cache_limits(max_amount=1), ["medium"]
+        )
+        self.assertEqual(self.filehandler.index.ids(), ["testid"])
+        with self.assertRaises(ValueError):
+            self.filehandler.enforce_cache_limits(max_amount=0, cache_deletion_algorithm="x")
+
+    def test_enforce_cache_limits_delete_error(self):
+        for sid in ("undeletable", "other"):
+            self.filehandler.create_cache_dir(sid)
+            self.filehandler.cache_messages(self.sample_raw_messages)
+        self.filehandler.create_cache_dir("testid")
+        rmtree = shutil.rmtree
+
+        def failing_rmtree(path, *args, **kwargs):
+            if os.path.basename(path) == "undeletable":
+                raise PermissionError(path)
+            return rmtree(path, *args, **kwargs)
+
+        # streams that could not be deleted stay in the index
+        # and the next ones are deleted instead
+        with mock.patch("modules.filehandler.shutil.rmtree", failing_rmtree):
+            self.assertEqual(self.filehandler.enforce_cache_limits(max_amount=2), ["other"])
+            self.assertEqual(self.filehandler.enforce_cache_limits(max_amount=1), [])
+            self.filehandler.clear_cache("lru")
+        self.assertEqual(self.filehandler.index.ids(), ["testid", "undeletable"])
+        self.assertTrue(
+            os.path.isdir(os.path.join(self.filehandler.cache_path, "undeletable"))
+        )
+
+        # cache folders are deleted while their locks are held
+        self.assertEqual(self.filehandler.enforce_cache_limits(max_amount=1), ["undeletable"])
+        self.assertEqual(
+            sorted(os.listdir(self.filehandler.cache_path)), ["index.sqlite3", "testid"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
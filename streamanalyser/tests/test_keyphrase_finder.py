@@ -0,0 +1,65 @@
+import random
+import unittest
+
+import nltk
+
+from modules.keyphrase_finder import (
+    KeyphraseFinder,
+    count_ngrams,
+    tokenize_chat_message,
+    PHRASE_END_DELIMITER,
+)
+
+
+class TestKeyphraseFinder(unittest.TestCase):
+    def test_count_ngrams(self):
+        random.seed(0)
+        words = ["lol", "草", "w", ":_hello:", "!", PHRASE_END_DELIMITER]
+        tokens = [random.choice(words) for _ in range(500)]
+
+        result = count_ngrams(tokens, max_ngram_size=7, amount=20)
+        for n in range(1, 8):
+            expected = [
+                (ngram, frequency)
+                for ngram, frequency in nltk.FreqDist(nltk.ngrams(tokens, n)).most_common(20)
+                if PHRASE_END_DELIMITER not in ngram
+            ]
+            self.assertEqual(result[n], expected)
+
+        # sizes larger than the token amount
+        self.assertEqual(count_ngrams(["a", "a"], 3, 5), {1: [(("a",), 2)], 2: [(("a", "a"), 1)], 3: []})
+        self.assertEqual(count_ngrams([], 2, 5), {1: [], 2: []})
+        self.assertEqual(list(count_ngrams(tokens, 4, 5, min_ngram_size=3)), [3, 4])
+
+    def test_tokenize_chat_message(self):
+        self.assertEqual(
+            tokenize_chat_message("Don't do it!!! :_Hello::_bye:"),
+            ["don't", "do", "it", "!!!", ":_Hello:", ":_bye:"],
+        )
+        self.assertEqual(
+            tokenize_chat_message("草草草草草 テスト草wwww it’s OK?!"),
+            ["草草草", "テスト草", "www", "it’s", "ok", "?!"],
+        )
+        self.assertEqual(tokenize_chat_message("안녕하세요 ｶﾀｶﾅ 10"), ["안녕하세요", "ｶﾀｶﾅ", "10"])
+        self.assertEqual(tokenize_chat_message(""), [])
+
+    def test_rule_tokenizer(self):
+        chat = ["let's go!", "LET'S GO", "let's goooooo", "草", "草草", "nice :_clap:"] * 3
+        finder = KeyphraseFinder(chat, tokenizer="rule")
+        keyphrases = [keyphrase[0] for keyphrase in finder.ngram_keyphrase_analysis()]
+        self.assertIn("let's go", keyphrases)
+
+        with self.assertRaises(ValueError):
+            KeyphraseFinder(chat, tokenizer="invalid")
+
+    def test_word_lists(self):
+        finder = KeyphraseFinder([], tokenizer="rule")
+        another_finder = KeyphraseFinder([], tokenizer="rule")
+        self.assertIsInstance(finder.monogram_stop_words, frozenset)
+        self.assertIn("(", finder.monogram_stop_words)
+        self.assertIs(finder.monogram_stop_words, another_finder.monogram_stop_words)
+        self.assertIsNone(finder.stop_words)
+
+
+if __name__ == "__main__":
+    unittest.main()
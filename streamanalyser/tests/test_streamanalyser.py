@@ -4,6 +4,8 @@ import unittest
 import warnings
 import os
 import importlib
+import subprocess
+import tempfile
 
 import sys
 if __package__ is None:
@@ -408,6 +410,120 @@ class TestStreamAnalyser(unittest.TestCase):
                 os.path.exists(os.path.join(analyser.filehandler.cache_path, "testid1"))
             )
 
+class TestOfflineStreamAnalyser(unittest.TestCase):
+    def setUp(self):
+        warnings.simplefilter("ignore", category=ResourceWarning)
+        self.storage_path = tempfile.mkdtemp()
+        self.sample_raw_messages = [{
+            "message_id": str(i),
+            "message_type": "text_message",
+            "message": "msg" + str(i),
+            "time_in_seconds": i,
+            "author": {"id": str(i), "name": "name" + str(i), "images": []},
+        } for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_path, ignore_errors=True)
+
+    def test_offline(self):
+        with sa.StreamAnalyser(
+            "testid", storage_path=self.storage_path, disable_logs=True, offline=True
+        ) as analyser:
+            # should not create a collector until it's needed
+            self.assertIsNone(analyser._collector)
+            with self.assertRaises(sa.exceptions.OfflineModeError):
+                analyser.collect_data()
+
+            analyser.filehandler.cache_messages(self.sample_raw_messages)
+            analyser.filehandler.cache_metadata({"title": "test", "is-complete": False})
+            analyser.read_data()
+            analyser.refine_data()
+            analyser.fetch_missing_messages()
+
+            self.assertEqual([msg.text for msg in analyser.messages], ["msg0", "msg1", "msg2"])
+            self.assertFalse(analyser.metadata["is-complete"])
+            self.assertIsNone(analyser._collector)
+
+    def test_analysis_cache(self):
+        def create_analyser():
+            analyser = sa.StreamAnalyser(
+                "testid", storage_path=self.storage_path, disable_logs=True, offline=True
+            )
+            analyser.filehandler.logger.disabled = True
+            return analyser
+
+        with create_analyser() as analyser:
+            analyser.filehandler.cache_messages(self.sample_raw_messages)
+            analyser.filehandler.cache_metadata({"title": "test", "is-complete": True})
+            analyser.analyse()
+            self.assertIsNotNone(analyser.canalyser)
+            key = analyser._analysis_key()
+            self.assertIsNotNone(analyser.filehandler.read_analysis(key))
+            authors = analyser.authors
+
+            # analysis results should be legit cache files
+            _, unnecessary_files = analyser.filehandler.check_integrity()
+            self.assertEqual(unnecessary_files, [])
+
+        with create_analyser() as analyser:
+            analyser.analyse()
+            # should be loaded from the cache without reading messages
+            self.assertIsNone(analyser.canalyser)
+            lazy_messages = analyser.messages
+            self.assertFalse(lazy_messages.loaded)
+            self.assertEqual(len(analyser.messages), 3)
+            # authors should be loaded with the messages
+            self.assertEqual(analyser.authors, authors)
+            self.assertTrue(lazy_messages.loaded)
+            self.assertEqual([msg.text for msg in analyser.messages], ["msg0", "msg1", "msg2"])
+
+            # different options should not share the results
+            analyser.window = 10
+            self.assertNotEqual(analyser._analysis_key(), key)
+
+            # new messages should invalidate the results
+            analyser.filehandler.append_messages(self.sample_raw_messages[:1])
+            self.assertIsNone(analyser.filehandler.read_analysis(key))
+
+    def test_dump_load_highlight(self):
+        with sa.StreamAnalyser(
+            "testid", storage_path=self.storage_path, disable_logs=True, offline=True
+        ) as analyser:
+            analyser.messages = list(range(10))
+            highlight = sa.structures.Highlight(
+                "testid",
+                time=3,
+                duration=5,
+                messages=sa.structures.MessageSlice(analyser.messages, 2, 6),
+                keywords=["kw"],
+                kw_emotes=[sa.structures.Emote(
+                    "id", "name", True, [sa.structures.Icon("id", "url", 24, 24)]
+                )],
+                contexts={"funny", "cute"},
+                intensity=sa.structures.Intensity("high", 0.7, "color"),
+                fdelta=1.5,
+            )
+            loaded = analyser._load_highlight(
+                json.loads(json.dumps(analyser._dump_highlight(highlight)))
+            )
+            self.assertEqual(loaded, highlight)
+            self.assertEqual(list(loaded.messages), [2, 3, 4, 5])
+
+    def test_lazy_imports(self):
+        # heavy dependencies should only be imported when they're used
+        heavy_modules = [
+            "wordcloud", "matplotlib", "nltk", "chat_downloader", "yaml", "requests"
+        ]
+        output = subprocess.run(
+            [sys.executable, "-c", "import json, sys, streamanalyser; print(json.dumps(list(sys.modules)))"],
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        imported = {name.split(".")[0] for name in json.loads(output)}
+        self.assertEqual([name for name in heavy_modules if name in imported], [])
+
 sample_raw_messages = [
     {
         "author": {"id": "UCX07ffYvacTkgo89MjNpweg", "name": "RathalosRE"},
@@ -0,0 +1,55 @@
+import unittest
+
+from modules.tokenstore import TokenStore
+
+
+class TestTokenStore(unittest.TestCase):
+    def setUp(self):
+        self.ids = ["1", "2", "3"]
+        self.texts = ["lol lol", "草 テスト", ""]
+        self.tokenized = []
+
+    def tokenizer(self, text):
+        self.tokenized.append(text)
+        return text.split(" ")
+
+    def test_tokenize(self):
+        store = TokenStore("key")
+        self.assertFalse(store.dirty)
+        tokens = store.tokenize("words", self.ids, self.texts, self.tokenizer)
+        self.assertEqual(tokens, [["lol", "lol"], ["草", "テスト"], [""]])
+        self.assertEqual(self.tokenized, self.texts)
+        self.assertTrue(store.dirty)
+
+        # only new messages are tokenized
+        tokens = store.tokenize("words", ["3", "4", "1"], ["", "w", "lol lol"], self.tokenizer)
+        self.assertEqual(tokens, [[""], ["w"], ["lol", "lol"]])
+        self.assertEqual(self.tokenized, self.texts + ["w"])
+
+        # kinds are tokenized separately
+        tokens = store.tokenize("chars", self.ids[:1], self.texts[:1], list)
+        self.assertEqual(tokens, [["l", "o", "l", " ", "l", "o", "l"]])
+        self.assertEqual(store.vocabulary.count("l"), 1)
+
+    def test_arrays(self):
+        store = TokenStore("key")
+        store.tokenize("words", self.ids, self.texts, self.tokenizer)
+        arrays = store.to_arrays()
+
+        loaded = TokenStore.from_arrays(arrays, "key")
+        self.assertFalse(loaded.dirty)
+        tokens = loaded.tokenize("words", self.ids[::-1], self.texts[::-1], self.tokenizer)
+        self.assertEqual(tokens, [[""], ["草", "テスト"], ["lol", "lol"]])
+        self.assertEqual(self.tokenized, self.texts)
+        self.assertFalse(loaded.dirty)
+
+        # tokens of another message cache are discarded
+        loaded = TokenStore.from_arrays(arrays, "another key")
+        self.assertEqual(loaded.vocabulary, [])
+        loaded.tokenize("words", self.ids, self.texts, self.tokenizer)
+        self.assertEqual(self.tokenized, self.texts * 2)
+        self.assertEqual(TokenStore.from_arrays(None, "key").vocabulary, [])
+
+
+if __name__ == "__main__":
+    unittest.main()